@@ -2,13 +2,18 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_session import Session
 from config.settings import Config, DevelopmentConfig, ProductionConfig, TestingConfig
-from routes import auth_bp, uploads_bp, sheets_bp, api_bp, labels_bp
+from routes import auth_bp, uploads_bp, sheets_bp, api_bp, labels_bp, jobs_bp
 from models.database import init_database
+from auth.decorators import verify_session_auth
+from services.zip_cache import init_zip_cache, zip_cache_stats
+from utils.file_utils import SpooledUploadRequest
+from utils.TemplateLayout import compile_templates
 import os
 
 def create_app(config_name='development'):
     """Enhanced application factory with security"""
     app = Flask(__name__)
+    app.request_class = SpooledUploadRequest
     app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024 # 50MB limit
 
     @app.errorhandler(500)
@@ -31,6 +36,11 @@ def create_app(config_name='development'):
     @app.route('/health')
     def health_check():
         return {'status': 'ok'}, 200
+
+    @app.route('/health/cache')
+    @verify_session_auth
+    def cache_stats():
+        return {'zip_cache': zip_cache_stats()}, 200
     
     # Load configuration
     config_map = {
@@ -41,6 +51,11 @@ def create_app(config_name='development'):
     
     config_class = config_map.get(config_name, DevelopmentConfig)
     app.config.from_object(config_class)
+
+    # Validate and compile label templates once; a bad template stops startup here
+    app.config['LABEL_LAYOUTS'] = compile_templates(app.config['LABEL_TEMPLATES'])
+    if app.config['DEFAULT_TEMPLATE'] not in app.config['LABEL_LAYOUTS']:
+        raise ValueError(f"DEFAULT_TEMPLATE '{app.config['DEFAULT_TEMPLATE']}' is not in LABEL_TEMPLATES")
     
     # Initialize extensions
     CORS(app, **app.config['CORS_CONFIG'])
@@ -62,6 +77,7 @@ def create_app(config_name='development'):
     
     # Initialize database
     init_database(app)
+    init_zip_cache(app)
     
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -69,11 +85,11 @@ def create_app(config_name='development'):
     app.register_blueprint(sheets_bp, url_prefix='/')
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(labels_bp, url_prefix='/labels')
+    app.register_blueprint(jobs_bp, url_prefix='/')
     
     # Ensure folders exist
     folders = [
         app.config['UPLOAD_FOLDER'], 
-        app.config['SHEET_FOLDER']
     ]
     for folder in folders:
         os.makedirs(folder, exist_ok=True)
@@ -0,0 +1,84 @@
+"""
+Barcode drawing throughput in labels/sec, Code128 and QR: reportlab's
+widget paths (what draw_label_to_canvas used to do) vs BarcodeGenerator's
+direct paths.
+
+Usage (from backend/):
+    python -m benchmarks.bench_barcode_render
+"""
+import io
+import time
+from reportlab.graphics import renderPDF
+from reportlab.graphics.barcode import code128
+from reportlab.graphics.barcode.qr import QrCodeWidget
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+from config.settings import Config
+from utils.BarcodeGenerator import BarcodeGenerator, code128_path, code128_pattern, qr_path
+
+N_LABELS = 5000
+TEMPLATE_ID = 'standard_20'
+
+
+def draw_code128_widget(gen, c, x, y, value):
+    barcode = code128.Code128(value=value, barHeight=gen.barcode_height_inches, barWidth=gen.bar_width)
+    barcode.drawOn(c, x + (gen.label_width - barcode.width) / 2, y + gen.barcode_offset_y)
+
+
+def draw_code128_direct(gen, c, x, y, value):
+    gen._draw_code128(c, x, y + gen.barcode_offset_y, value)
+
+
+def draw_qr_widget(gen, c, x, y, value):
+    usable_width = gen.label_width - (2 * gen.padding_x)
+    available_height = gen.label_height - gen.barcode_offset_y - (0.05 * inch)
+    qr_size = min(available_height, usable_width)
+    qr = QrCodeWidget(value)
+    bounds = qr.getBounds()
+    d = Drawing(qr_size, qr_size, transform=[
+        qr_size / (bounds[2] - bounds[0]), 0, 0, qr_size / (bounds[3] - bounds[1]), 0, 0,
+    ])
+    d.add(qr)
+    renderPDF.draw(d, c, x + (gen.label_width - qr_size) / 2, y + gen.barcode_offset_y)
+
+
+def draw_qr_direct(gen, c, x, y, value):
+    gen._draw_qr(c, x, y + gen.barcode_offset_y, value)
+
+
+def labels_per_sec(draw, gen, values):
+    c = canvas.Canvas(io.BytesIO(), pagesize=LETTER)
+    start = time.perf_counter()
+    for i, value in enumerate(values):
+        draw(gen, c, 36, 36, value)
+        if i % 20 == 19:
+            c.showPage()
+    c.save()
+    return len(values) / (time.perf_counter() - start)
+
+
+def main():
+    template = Config.LABEL_TEMPLATES[TEMPLATE_ID]
+    unique = [f'SKU{i:07d}' for i in range(N_LABELS)]
+    repeated = [f'SKU{i % 50:07d}' for i in range(N_LABELS)]
+
+    gen = BarcodeGenerator(template, barcode_type='code128')
+    gen.calibrate(unique)
+
+    qr_gen = BarcodeGenerator(template, barcode_type='qr')
+
+    print(f'{N_LABELS} labels (canvas save included)')
+    for name, values in (('unique', unique), ('50 repeated', repeated)):
+        for cache in (code128_pattern, code128_path, qr_path):
+            cache.cache_clear()
+        rows = (
+            ('code128', labels_per_sec(draw_code128_widget, gen, values), labels_per_sec(draw_code128_direct, gen, values)),
+            ('qr', labels_per_sec(draw_qr_widget, qr_gen, values), labels_per_sec(draw_qr_direct, qr_gen, values)),
+        )
+        for kind, widget, direct in rows:
+            print(f'  {kind:<8}{name:<12} widget {widget:>8.0f}/s   direct {direct:>8.0f}/s   {direct / widget:.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare the read-only openpyxl column reader against pandas.read_excel
+on a wide and a tall workbook.
+
+Usage (from backend/):
+    python -m benchmarks.bench_excel_reader
+"""
+import io
+import time
+import openpyxl
+import pandas as pd
+from services.label_ingest import read_label_columns, extract_labels, read_preview_labels
+
+COLUMN_MAPPING = {
+    'barcode_column': 1,
+    'text_columns': [
+        {'column': 0, 'label': 'Location'},
+        {'column': 3, 'label': 'Unit'},
+    ],
+    'has_header_row': True,
+}
+
+SHAPES = {
+    'wide (5k x 120)': (5_000, 120),
+    'tall (50k x 6)': (50_000, 6),
+}
+
+
+def make_workbook(rows, cols):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append([f'Col{c}' for c in range(cols)])
+    for i in range(rows):
+        row = [f'Aisle-{i % 40:02d}', f'SKU{i:07d}', f'Widget {i}', 'EA']
+        row += [i * c for c in range(cols - len(row))]
+        ws.append(row[:cols])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def read_excel_full(data):
+    df = pd.read_excel(io.BytesIO(data), header=0, dtype=str)
+    df.columns = range(df.shape[1])
+    return extract_labels(df, COLUMN_MAPPING)
+
+
+def read_projected(data):
+    df = read_label_columns(io.BytesIO(data), COLUMN_MAPPING, is_excel=True)
+    return extract_labels(df, COLUMN_MAPPING)
+
+
+def preview_projected(data):
+    return read_preview_labels(io.BytesIO(data), COLUMN_MAPPING, limit=20, is_excel=True)
+
+
+def timed(fn, data):
+    start = time.perf_counter()
+    result = fn(data)
+    return time.perf_counter() - start, result
+
+
+def main():
+    print(f"{'workbook':>16}  {'read_excel':>10}  {'projected':>10}  {'speedup':>8}  {'preview':>8}")
+    for name, (rows, cols) in SHAPES.items():
+        data = make_workbook(rows, cols)
+        full_s, full = timed(read_excel_full, data)
+        proj_s, proj = timed(read_projected, data)
+        preview_s, _ = timed(preview_projected, data)
+        assert full == proj, "readers disagree"
+        print(f"{name:>16}  {full_s:>9.2f}s  {proj_s:>9.2f}s  {full_s / proj_s:>7.1f}x  {preview_s:>7.3f}s")
+
+
+if __name__ == '__main__':
+    main()
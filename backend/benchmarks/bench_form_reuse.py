@@ -0,0 +1,46 @@
+"""
+PDF size and render time for duplicate-heavy jobs with and without form
+XObject reuse, rendering 5000 labels as one combined document.
+
+Usage (from backend/):
+    python -m benchmarks.bench_form_reuse
+"""
+import time
+from config.settings import Config
+from utils.BarcodeGenerator import BarcodeGenerator
+from utils.PDFSheetGenerator import PDFSheetGenerator
+
+N_LABELS = 5000
+TEMPLATE_ID = 'standard_20'
+DISTINCT_VALUES = (N_LABELS, 1000, 500, 250, 100, 50, 10)
+
+
+def make_labels(distinct):
+    return [(f'SKU{i % distinct:07d}', [('Location', f'Aisle-{i % 40:02d}')]) for i in range(N_LABELS)]
+
+
+def render(labels, barcode_type, reuse):
+    BarcodeGenerator.REUSE_FORMS = reuse
+    try:
+        gen = PDFSheetGenerator(Config.LABEL_TEMPLATES[TEMPLATE_ID])
+        start = time.perf_counter()
+        document, _ = gen.generate_pdf_document(labels, barcode_type=barcode_type)
+        return len(document), time.perf_counter() - start
+    finally:
+        BarcodeGenerator.REUSE_FORMS = True
+
+
+def main():
+    print(f'{N_LABELS} labels, combined document ({TEMPLATE_ID})')
+    print(f'{"type":<9}{"distinct":>9}{"inline bytes":>14}{"forms bytes":>13}{"inline s":>10}{"forms s":>9}')
+    for barcode_type in ('qr',):
+        for distinct in DISTINCT_VALUES:
+            labels = make_labels(distinct)
+            render(labels, barcode_type, True)  # warm the encoder caches for both runs
+            inline_bytes, inline_s = render(labels, barcode_type, False)
+            forms_bytes, forms_s = render(labels, barcode_type, True)
+            print(f'{barcode_type:<9}{distinct:>9}{inline_bytes:>14,}{forms_bytes:>13,}{inline_s:>10.2f}{forms_s:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Memory held by 10k labels as a list of tuples vs a LabelBatch.
+
+Usage (from backend/):
+    python -m benchmarks.bench_label_batch
+"""
+import gc
+import time
+import tracemalloc
+from utils.LabelBatch import LabelBatch
+
+N_LABELS = 10_000
+
+
+def make_labels(n):
+    # Distinct str objects per cell, as a per-row parse would produce
+    return [
+        (f'SKU{i:07d}', [('Location', f'Aisle-{i % 40:02d}'), ('Unit', ''.join(['E', 'A']))])
+        for i in range(n)
+    ]
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current, elapsed
+
+
+def main():
+    labels, list_bytes, _ = measure(lambda: make_labels(N_LABELS))
+    batch, batch_bytes, _ = measure(lambda: LabelBatch.from_labels(make_labels(N_LABELS)))
+
+    start = time.perf_counter()
+    for _ in labels:
+        pass
+    iter_list = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in batch:
+        pass
+    iter_batch = time.perf_counter() - start
+
+    print(f'{N_LABELS} labels')
+    print(f'  list of tuples: {list_bytes / N_LABELS:7.1f} B/label  ({list_bytes / 1e6:.2f} MB)')
+    print(f'  LabelBatch:     {batch_bytes / N_LABELS:7.1f} B/label  ({batch_bytes / 1e6:.2f} MB)')
+    print(f'  reduction:      {list_bytes / batch_bytes:.1f}x')
+    print(f'  full iteration: list {iter_list * 1000:.1f}ms, batch {iter_batch * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Render-time scaling across worker processes for a 250-sheet job, in both
+per-sheet and combined output modes.
+
+Usage (from backend/):
+    python -m benchmarks.bench_parallel_render
+"""
+import os
+import time
+from config.settings import Config
+from utils.PDFSheetGenerator import PDFSheetGenerator
+
+SHEETS = 250
+TEMPLATE_ID = 'standard_20'
+WORKER_COUNTS = (1, 2, 4, 6)
+
+
+def make_labels(n):
+    return [(f'SKU{i:07d}', [('Location', f'Aisle-{i % 40:02d}'), ('Unit', 'EA')]) for i in range(n)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    template = Config.LABEL_TEMPLATES[TEMPLATE_ID]
+    labels = make_labels(SHEETS * template['rows'] * template['columns'])
+    print(f'{SHEETS} sheets, {len(labels)} labels, {os.cpu_count()} CPU(s)')
+    print(f'{"workers":>8}{"per_sheet s":>13}{"combined s":>12}{"speedup":>9}')
+
+    baseline = None
+    for workers in WORKER_COUNTS:
+        gen = PDFSheetGenerator(template, workers=workers)
+        per_sheet = timed(lambda: list(gen.generate_pdf_sheets(labels)))
+        combined = timed(lambda: gen.generate_pdf_document(labels))
+        baseline = baseline or per_sheet
+        print(f'{workers:>8}{per_sheet:>13.2f}{combined:>12.2f}{baseline / per_sheet:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
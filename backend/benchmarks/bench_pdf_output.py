@@ -0,0 +1,58 @@
+"""
+Per-sheet PDFs vs one multi-page PDF for a 250-sheet job: total bytes,
+render time, ZIP time and single-sheet extraction time.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pdf_output
+"""
+import time
+import zipfile
+from config.settings import Config
+from services.storage_service import create_zip_from_sheets, create_zip_from_document
+from utils.PDFSheetGenerator import PDFSheetGenerator
+from utils.pdf_pages import extract_pages
+
+SHEETS = 250
+TEMPLATE_ID = 'standard_20'
+
+
+def make_labels(n):
+    return [(f'SKU{i:07d}', [('Location', f'Aisle-{i % 40:02d}'), ('Unit', 'EA')]) for i in range(n)]
+
+
+def main():
+    template = Config.LABEL_TEMPLATES[TEMPLATE_ID]
+    labels = make_labels(SHEETS * template['rows'] * template['columns'])
+    gen = PDFSheetGenerator(template)
+
+    start = time.perf_counter()
+    sheets = list(gen.generate_pdf_sheets(labels))
+    per_render = time.perf_counter() - start
+    per_bytes = sum(len(pdf) for pdf in sheets)
+    start = time.perf_counter()
+    per_zip = create_zip_from_sheets(sheets)
+    per_zip_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    document, page_index = gen.generate_pdf_document(labels)
+    doc_render = time.perf_counter() - start
+    doc_bytes = len(document)
+    start = time.perf_counter()
+    doc_zip = create_zip_from_document(document, page_index)
+    doc_zip_time = time.perf_counter() - start
+
+    with zipfile.ZipFile(doc_zip) as zf:
+        combined = zf.read('sheets.pdf')
+    start = time.perf_counter()
+    extract_pages(combined, [SHEETS // 2], page_index)
+    extract_time = time.perf_counter() - start
+
+    print(f'{SHEETS} sheets, {len(labels)} labels ({TEMPLATE_ID})')
+    print(f'{"mode":<10}{"PDF bytes":>12}{"ZIP bytes":>12}{"render s":>10}{"zip s":>8}')
+    print(f'{"per_sheet":<10}{per_bytes:>12,}{len(per_zip.getvalue()):>12,}{per_render:>10.2f}{per_zip_time:>8.2f}')
+    print(f'{"combined":<10}{doc_bytes:>12,}{len(doc_zip.getvalue()):>12,}{doc_render:>10.2f}{doc_zip_time:>8.2f}')
+    print(f'single-sheet extraction from combined PDF: {extract_time * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
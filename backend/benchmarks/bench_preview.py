@@ -0,0 +1,55 @@
+"""
+Preview latency on a tiny file vs a ~50MB file.
+
+Usage (from backend/):
+    python -m benchmarks.bench_preview
+"""
+import io
+import time
+from app import create_app
+from services.label_service import generate_label_preview
+
+COLUMN_MAPPING = {
+    'barcode_column': 1,
+    'text_columns': [{'column': 0, 'label': 'Location'}, {'column': 3, 'label': 'Unit'}],
+    'has_header_row': True,
+}
+
+
+class InMemoryUpload(io.BytesIO):
+    """Minimal FileStorage stand-in for the service layer."""
+
+    def save(self, filepath):
+        with open(filepath, 'wb') as out:
+            out.write(self.getvalue())
+
+
+def make_csv(target_bytes):
+    header = b'Location,Barcode,Name,Unit,Qty,Supplier,Notes\n'
+    row_template = 'Aisle-{0:02d},SKU{1:07d},Widget {1},EA,{2},Acme Corp,Shelf {3}\n'
+    out = [header]
+    size = len(header)
+    i = 0
+    while size < target_bytes:
+        row = row_template.format(i % 40, i, i % 17, i % 9).encode()
+        out.append(row)
+        size += len(row)
+        i += 1
+    return b''.join(out)
+
+
+def main():
+    app = create_app('testing')
+    app.config['MAX_LABELS'] = 10_000_000
+    with app.app_context():
+        for label, target in (('1KB', 1024), ('50MB', 50 * 1024 * 1024)):
+            data = make_csv(target)
+            start = time.perf_counter()
+            result = generate_label_preview(InMemoryUpload(data), 'bench', 'bench.csv',
+                                            template_id='standard_20', column_mapping=COLUMN_MAPPING)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>5}: {elapsed:.3f}s  ({result['label_count']} labels, {result['total_sheets']} sheets)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Sheets per second and bytes per sheet for PNG/TIFF output at each
+supported DPI and raster mode, against the PDF path for the same job.
+
+Usage (from backend/):
+    python -m benchmarks.bench_raster_output
+"""
+import time
+from config.settings import Config
+from utils.PDFSheetGenerator import PDFSheetGenerator
+from utils.RasterSheetGenerator import IMAGE_FORMATS, RASTER_MODES, SUPPORTED_DPIS, RasterSheetGenerator
+
+SHEETS = 20
+TEMPLATE_ID = 'standard_20'
+BARCODE_TYPES = ('code128', 'qr')
+
+
+def make_labels(n):
+    return [(f'SKU{i:07d}', [('Location', f'Aisle-{i % 40:02d}'), ('Unit', 'EA')]) for i in range(n)]
+
+
+def measure(render):
+    render()  # warm the barcode and text caches
+    start = time.perf_counter()
+    sheets = list(render())
+    elapsed = time.perf_counter() - start
+    return len(sheets) / elapsed, sum(map(len, sheets)) // len(sheets)
+
+
+def main():
+    template = Config.LABEL_TEMPLATES[TEMPLATE_ID]
+    labels = make_labels(SHEETS * template['rows'] * template['columns'])
+    print(f'{TEMPLATE_ID}, {SHEETS} sheets per job')
+    print(f'{"type":<9}{"output":<18}{"sheets/s":>10}{"bytes/sheet":>13}')
+    for barcode_type in BARCODE_TYPES:
+        pdf = PDFSheetGenerator(template)
+        rate, size = measure(lambda: list(pdf.generate_pdf_sheets(labels, barcode_type=barcode_type)))
+        print(f'{barcode_type:<9}{"pdf":<18}{rate:>10.1f}{size:>13,}')
+        for dpi in SUPPORTED_DPIS:
+            for mode in RASTER_MODES:
+                gen = RasterSheetGenerator(template, dpi=dpi, mode=mode)
+                for image_format in IMAGE_FORMATS:
+                    rate, size = measure(lambda: list(gen.generate_sheets(
+                        labels, barcode_type=barcode_type, image_format=image_format)))
+                    print(f'{barcode_type:<9}{f"{image_format} {dpi} {mode}":<18}{rate:>10.1f}{size:>13,}')
+
+
+if __name__ == '__main__':
+    main()
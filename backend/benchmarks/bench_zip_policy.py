@@ -0,0 +1,78 @@
+"""
+Bytes and seconds per ZIP packaging policy on real template outputs, for
+per-sheet and combined jobs of 100 sheets. 'legacy' is the previous
+packaging: compressed PDF pages re-deflated at level 9.
+
+Usage (from backend/):
+    python -m benchmarks.bench_zip_policy
+"""
+import io
+import time
+import zipfile
+from config.settings import Config
+from services.storage_service import (
+    ZIP_POLICIES,
+    create_zip_from_document,
+    create_zip_from_sheets,
+    pdf_page_compression,
+    sheet_arcname,
+)
+from utils.PDFSheetGenerator import PDFSheetGenerator
+
+SHEETS = 100
+TEMPLATE_IDS = ('standard_20', '5160', '5163', '94233')
+BARCODE_TYPES = ('code128', 'qr')
+
+
+def make_labels(n):
+    return [(f'SKU{i:07d}', [('Location', f'Aisle-{i % 40:02d}'), ('Unit', 'EA')]) for i in range(n)]
+
+
+def legacy_zip(sheets):
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as zipf:
+        for sheet_number, pdf_bytes in enumerate(sheets, start=1):
+            zipf.writestr(sheet_arcname(sheet_number), pdf_bytes)
+    return zip_buffer
+
+
+def run(template, labels, barcode_type, policy):
+    """(render s, zip s, ZIP bytes) for per-sheet output, then for combined."""
+    page_compression = policy == 'legacy' or pdf_page_compression(policy)
+    gen = PDFSheetGenerator(template, page_compression=page_compression)
+
+    start = time.perf_counter()
+    sheets = list(gen.generate_pdf_sheets(labels, barcode_type=barcode_type))
+    render_s = time.perf_counter() - start
+    start = time.perf_counter()
+    zip_buffer = legacy_zip(sheets) if policy == 'legacy' else create_zip_from_sheets(sheets, policy)
+    per_sheet = (render_s, time.perf_counter() - start, len(zip_buffer.getvalue()))
+
+    start = time.perf_counter()
+    document, page_index = gen.generate_pdf_document(labels, barcode_type=barcode_type)
+    render_s = time.perf_counter() - start
+    start = time.perf_counter()
+    zip_buffer = create_zip_from_document(document, page_index, 'max' if policy == 'legacy' else policy)
+    combined = (render_s, time.perf_counter() - start, len(zip_buffer.getvalue()))
+    return per_sheet, combined
+
+
+def main():
+    print(f'{SHEETS} sheets per job')
+    print(f'{"template":<12}{"type":<9}{"policy":<10}'
+          f'{"sheets bytes":>13}{"render s":>10}{"zip s":>8}'
+          f'{"combined bytes":>16}{"render s":>10}{"zip s":>8}')
+    for template_id in TEMPLATE_IDS:
+        template = Config.LABEL_TEMPLATES[template_id]
+        labels = make_labels(SHEETS * template['rows'] * template['columns'])
+        for barcode_type in BARCODE_TYPES:
+            run(template, labels, barcode_type, 'store')  # warm the barcode caches
+            for policy in ('legacy',) + ZIP_POLICIES:
+                (s_render, s_zip, s_bytes), (c_render, c_zip, c_bytes) = run(template, labels, barcode_type, policy)
+                print(f'{template_id:<12}{barcode_type:<9}{policy:<10}'
+                      f'{s_bytes:>13,}{s_render:>10.2f}{s_zip:>8.3f}'
+                      f'{c_bytes:>16,}{c_render:>10.2f}{c_zip:>8.3f}')
+
+
+if __name__ == '__main__':
+    main()
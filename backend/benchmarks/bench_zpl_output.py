@@ -0,0 +1,50 @@
+"""
+Labels per second and bytes per label for ZPL output against per-sheet
+PDF output, on the same labels and template, before and after packaging.
+
+Usage (from backend/):
+    python -m benchmarks.bench_zpl_output
+"""
+import time
+from config.settings import Config
+from services.storage_service import create_zip_from_sheets, create_zip_from_zpl
+from utils.PDFSheetGenerator import PDFSheetGenerator
+from utils.ZPLGenerator import ZPLGenerator
+
+N_LABELS = 5000
+TEMPLATE_ID = 'standard_20'
+
+
+def make_labels(n):
+    return [(f'SKU{i:07d}', [('Location', f'Aisle-{i % 40:02d}'), ('Unit', 'EA')]) for i in range(n)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    template = Config.LABEL_TEMPLATES[TEMPLATE_ID]
+    labels = make_labels(N_LABELS)
+    pdf_gen = PDFSheetGenerator(template)
+    zpl_gen = ZPLGenerator(template, dpi=Config.ZPL_DPI)
+
+    print(f'{N_LABELS} labels ({TEMPLATE_ID}), ZPL at {Config.ZPL_DPI} dpi')
+    print(f'{"format":<8}{"type":<9}{"labels/s":>11}{"bytes":>12}{"zip bytes":>12}{"bytes/label":>13}')
+    for barcode_type in ('code128', 'qr'):
+        list(pdf_gen.generate_pdf_sheets(labels, barcode_type=barcode_type))  # warm the barcode caches
+        sheets, pdf_s = timed(lambda: list(pdf_gen.generate_pdf_sheets(labels, barcode_type=barcode_type)))
+        pdf_bytes = sum(len(pdf) for pdf in sheets)
+        pdf_zip = len(create_zip_from_sheets(sheets, Config.ZIP_POLICY).getvalue())
+        zpl, zpl_s = timed(lambda: zpl_gen.generate_zpl(labels, barcode_type=barcode_type))
+        zpl_zip = len(create_zip_from_zpl(zpl, Config.ZIP_POLICY).getvalue())
+
+        for fmt, seconds, size, zip_size in (('pdf', pdf_s, pdf_bytes, pdf_zip), ('zpl', zpl_s, len(zpl), zpl_zip)):
+            print(f'{fmt:<8}{barcode_type:<9}{N_LABELS / seconds:>11,.0f}{size:>12,}{zip_size:>12,}'
+                  f'{zip_size / N_LABELS:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
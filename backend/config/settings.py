@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,7 +18,6 @@ class Config:
     SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
     UPLOAD_FOLDER = 'uploads'
-    SHEET_FOLDER = 'sheets'
     
     # Session configuration
     SESSION_TYPE = 'filesystem'
@@ -43,6 +43,60 @@ class Config:
     ALLOWED_EXTENSIONS = {'.csv', '.xlsx', '.xls'}
     MAX_LABELS = 10000
     MAX_CONCURRENT_WORKERS = 6
+
+    # Uploads are parsed from memory; larger ones spill to UPLOAD_FOLDER
+    UPLOAD_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+    # CSVs above this size are parsed and rendered a few pages at a time
+    STREAMING_THRESHOLD_BYTES = 1 * 1024 * 1024
+    STREAMING_PAGES_IN_FLIGHT = 4
+
+    # Previews of files above this size parse one sheet and estimate the total
+    PREVIEW_FULL_SCAN_BYTES = 1 * 1024 * 1024
+
+    # 'per_sheet': one PDF per sheet in the ZIP; 'combined': one multi-page
+    # PDF plus a page index, with single sheets split out on download
+    SHEET_OUTPUT_MODE = 'per_sheet'
+
+    # Jobs with at least this many sheets render across a process pool of
+    # up to MAX_CONCURRENT_WORKERS (never more than the host's cores)
+    PARALLEL_RENDER_MIN_SHEETS = 20
+
+    # How sheet PDFs are packaged: 'store' (no ZIP compression), 'fast'
+    # (deflate level 1), 'max' (uncompressed PDF pages, deflate level 9) or
+    # 'adaptive' (store unless deflating the first sheet saves 10%)
+    ZIP_POLICY = 'adaptive'
+
+    # Printer resolution ZPL output (output_format=zpl) is laid out for
+    ZPL_DPI = 203
+
+    # PNG/TIFF sheets (output_format=png|tiff): resolution unless the
+    # request names one of 203/300/600, and '1' (bilevel) or 'L' (grayscale)
+    RASTER_DPI = 300
+    RASTER_MODE = '1'
+
+    # Re-uploads of a file with the same template, barcode type, mapping and
+    # output settings reuse the stored ZIP of the user's earlier job
+    JOB_RESULT_CACHE = True
+
+    # /upload queues label jobs: 'local' runs them on a thread pool inside
+    # the web process; 'redis' queues them for worker.py processes, which
+    # must be deployed alongside the web service (see README)
+    JOB_QUEUE_BACKEND = os.getenv('JOB_QUEUE_BACKEND', 'local')
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+    LOCAL_JOB_WORKERS = 2
+    # /upload/batch: files per batch, and total bytes an archive may expand to
+    BATCH_MAX_FILES = 40
+    BATCH_MAX_BYTES = 100 * 1024 * 1024
+
+    # Idle seconds between keep-alive comments on /jobs/<id>/events
+    JOB_EVENTS_HEARTBEAT_SECONDS = 15
+
+    # Job ZIPs cached for downloads in front of Redis: per process in
+    # memory, and on disk in a directory the host's processes share
+    ZIP_MEMORY_CACHE_MAX_BYTES = int(os.getenv('ZIP_MEMORY_CACHE_MAX_BYTES', 64_000_000))
+    ZIP_DISK_CACHE_MAX_BYTES = int(os.getenv('ZIP_DISK_CACHE_MAX_BYTES', 1_000_000_000))
+    ZIP_DISK_CACHE_DIR = os.getenv('ZIP_DISK_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'label-zip-cache'))
     
     # Rate limiting settings
     RATELIMIT_STORAGE_URL = os.getenv('REDIS_URL', 'memory://')
@@ -171,8 +225,14 @@ class TestingConfig(Config):
     SESSION_TYPE = 'filesystem'
     SESSION_FILE_DIR = '/tmp/test_flask_sessions'
     UPLOAD_FOLDER = '/tmp/test_uploads'
-    SHEET_FOLDER = '/tmp/test_sheets'
     SUPABASE_URL = 'https://placeholder.supabase.co'
     SUPABASE_ANON_KEY = 'test-anon-key'
     SUPABASE_SERVICE_KEY = 'test-service-key'
     RATELIMIT_STORAGE_URL = 'memory://'
+    # Jobs run inline in the request, so tests see them finished
+    JOB_QUEUE_BACKEND = 'local'
+    LOCAL_JOB_WORKERS = 0
+    # conftest points the disk tier at each test's tmp_path
+    ZIP_DISK_CACHE_DIR = '/tmp/test_zip_cache'
+    ZIP_MEMORY_CACHE_MAX_BYTES = 8_000_000
+    ZIP_DISK_CACHE_MAX_BYTES = 32_000_000
@@ -3,5 +3,6 @@ from .uploads import uploads_bp
 from .sheets import sheets_bp
 from .api import api_bp
 from .labels import labels_bp
+from .jobs import jobs_bp
 
-__all__ = ['auth_bp', 'uploads_bp', 'sheets_bp', 'api_bp', 'labels_bp']
\ No newline at end of file
+__all__ = ['auth_bp', 'uploads_bp', 'sheets_bp', 'api_bp', 'labels_bp', 'jobs_bp']
\ No newline at end of file
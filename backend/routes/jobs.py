@@ -0,0 +1,76 @@
+import json
+from flask import current_app, Blueprint, Response, request, jsonify, stream_with_context
+from auth.decorators import verify_session_auth
+from services.job_progress import TERMINAL_STAGES
+from services.job_queue import get_job, get_job_backend
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def job_status(job):
+    """Public view of a job: never the owner or the queued arguments."""
+    return {
+        'job_id': job['id'],
+        'kind': job.get('kind', 'file'),
+        'status': job['status'],
+        'filename': job['filename'],
+        'result': job['result'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+    }
+
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+@verify_session_auth
+def get_job_status(job_id):
+    job = get_job(job_id, request.user_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_status(job))
+
+
+def _sse(event):
+    if event is None:
+        return ': keep-alive\n\n'
+    return f"id: {event['seq']}\nevent: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _job_stream(job_id, user_id, events, after):
+    for event in events:
+        yield _sse(event)
+        if event is None:
+            continue
+        if event['stage'] in TERMINAL_STAGES:
+            return
+        after = event['seq']
+    # The broker no longer holds this job's events; a finished job still
+    # ends its stream with the outcome from the job record
+    job = get_job(job_id, user_id)
+    if job is not None and job['status'] in TERMINAL_STAGES:
+        yield _sse({'seq': after + 1, 'stage': job['status'], 'result': job['result'], 'error': job['error']})
+
+
+@jobs_bp.route('/jobs/<job_id>/events', methods=['GET'])
+@verify_session_auth
+def stream_job_events(job_id):
+    """
+    Server-Sent Events for one job: every progress event from 'queued'
+    through 'succeeded' or 'failed', which ends the stream. A reconnecting
+    EventSource sends Last-Event-ID and resumes after it. A job whose
+    events have been dropped gets only its outcome, or an empty stream
+    while it is still running, rather than keep-alives forever.
+    """
+    if get_job(job_id, request.user_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    try:
+        after = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        after = 0
+    broker = get_job_backend().broker
+    events = broker.subscribe(job_id, after=after, heartbeat=current_app.config['JOB_EVENTS_HEARTBEAT_SECONDS'])
+    return Response(
+        stream_with_context(_job_stream(job_id, request.user_id, events, after)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
@@ -1,4 +1,4 @@
-from flask import current_app, Blueprint, request, jsonify, send_file
+from flask import current_app, Blueprint, Response, request, jsonify, send_file, stream_with_context
 from auth.decorators import verify_session_auth
 from services.sheet_service import (
     get_user_sheets,
@@ -6,11 +6,21 @@ from services.sheet_service import (
     extract_single_sheet,
     extract_selected_sheets,
     delete_user_sheet,
+    SheetFormatError,
 )
 
 sheets_bp = Blueprint('sheets', __name__)
 
 
+def _stream_attachment(chunks, size, mimetype, filename):
+    """Chunked passthrough of a download, with Content-Length when the size is known."""
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    if size is not None:
+        response.content_length = size
+    return response
+
+
 @sheets_bp.route('/my-sheets', methods=['GET'])
 @verify_session_auth
 def get_sheets():
@@ -26,8 +36,8 @@ def get_sheets():
 @verify_session_auth
 def download_sheet(user_sheet_id):
     try:
-        zip_buffer, filename = create_sheet_download(user_sheet_id, request.user_id)
-        return send_file(zip_buffer, mimetype='application/zip', as_attachment=True, download_name=filename)
+        chunks, size, filename = create_sheet_download(user_sheet_id, request.user_id)
+        return _stream_attachment(chunks, size, 'application/zip', filename)
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
     except PermissionError as e:
@@ -41,8 +51,10 @@ def download_sheet(user_sheet_id):
 @verify_session_auth
 def download_single_sheet(user_sheet_id, sheet_number):
     try:
-        pdf_buffer, filename = extract_single_sheet(user_sheet_id, request.user_id, sheet_number)
-        return send_file(pdf_buffer, mimetype='application/pdf', as_attachment=True, download_name=filename)
+        sheet_buffer, filename, mimetype = extract_single_sheet(user_sheet_id, request.user_id, sheet_number)
+        return send_file(sheet_buffer, mimetype=mimetype, as_attachment=True, download_name=filename)
+    except SheetFormatError as e:
+        return jsonify({'error': str(e)}), 400
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
     except PermissionError as e:
@@ -1,13 +1,94 @@
 import json
 from flask import current_app, Blueprint, request, jsonify
 from auth.decorators import verify_session_auth
-from services.label_service import process_label_file, generate_label_preview
+from services.label_service import generate_label_preview
+from services.job_queue import enqueue_label_batch, enqueue_label_job
+from utils.file_utils import read_upload_archive
 from utils.security import validate_file_security, rate_limit, sanitize_input
 import logging
 
 uploads_bp = Blueprint('uploads', __name__)
 logger = logging.getLogger(__name__)
 
+
+def _validate_template_id(form):
+    template_id = form.get('template_id', current_app.config['DEFAULT_TEMPLATE'])
+    templates = current_app.config['LABEL_TEMPLATES']
+    if template_id not in templates:
+        valid = ', '.join(templates.keys())
+        raise ValueError(f"Invalid template_id '{template_id}'. Valid templates: {valid}")
+    return template_id
+
+
+def _validate_barcode_type(form):
+    barcode_type = form.get('barcode_type', 'code128')
+    if barcode_type not in ('code128', 'qr'):
+        raise ValueError(f"Invalid barcode_type '{barcode_type}'. Valid types: code128, qr")
+    return barcode_type
+
+
+def _column_mapping(mapping):
+    """The services' 0-based column mapping from a user-facing (1-based) one."""
+    barcode_col = mapping.get('barcode_column') if isinstance(mapping, dict) else None
+    if barcode_col is None or not isinstance(barcode_col, int) or barcode_col < 1 or barcode_col > 100:
+        raise ValueError('barcode_column must be an integer between 1 and 100')
+
+    # Convert 1-based (user-facing) to 0-based (pandas iloc)
+    return {
+        'barcode_column': barcode_col - 1,
+        'text_columns': [
+            {'column': tc['column'] - 1, 'label': str(tc.get('label', f'Column {tc["column"]}'))[:50]}
+            for tc in mapping.get('text_columns', [])
+            if isinstance(tc.get('column'), int) and 1 <= tc['column'] <= 100
+        ],
+        'has_header_row': bool(mapping.get('has_header_row', False))
+    }
+
+
+def _form_column_mapping(form):
+    """column_mapping from the form, or None for the default layout."""
+    column_mapping_raw = form.get('column_mapping')
+    if not column_mapping_raw:
+        return None
+    try:
+        mapping = json.loads(column_mapping_raw)
+    except json.JSONDecodeError:
+        raise ValueError('Invalid column_mapping JSON')
+    return _column_mapping(mapping)
+
+
+def _job_options(form):
+    """Template, barcode and output settings shared by /upload and /upload/batch."""
+    template_id = _validate_template_id(form)
+    barcode_type = _validate_barcode_type(form)
+
+    # 'pdf' label sheets, 'zpl' for Zebra thermal printers, or 'png'/'tiff'
+    # sheet images for printers without PDF support
+    output_format = form.get('output_format', 'pdf')
+    if output_format not in ('pdf', 'zpl', 'png', 'tiff'):
+        raise ValueError(f"Invalid output_format '{output_format}'. Valid formats: pdf, zpl, png, tiff")
+
+    # Printer resolution for zpl/png/tiff output
+    dpi = form.get('dpi')
+    if dpi is not None:
+        if dpi not in ('203', '300', '600'):
+            raise ValueError(f"Invalid dpi '{dpi}'. Valid values: 203, 300, 600")
+        dpi = int(dpi)
+
+    return {'template_id': template_id, 'barcode_type': barcode_type, 'output_format': output_format, 'dpi': dpi}
+
+
+def _job_response(job):
+    # Rendering runs on a job worker; the client polls /jobs/<job_id>
+    # or follows its progress on /jobs/<job_id>/events
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': f"/jobs/{job['id']}",
+        'events_url': f"/jobs/{job['id']}/events",
+    }), 202
+
+
 @uploads_bp.route('/upload', methods=['POST'])
 @rate_limit("5 per hour")    
 @rate_limit("15 per day")     
@@ -22,14 +103,7 @@ def upload_file():
         file = request.files['file']
         user_id = request.user_id
         
-        file_size_bytes = len(file.read()) 
-        file.seek(0)  # Reset file pointer
-        if file_size_bytes > current_app.config['MAX_FILE_SIZE']:  
-            max_mb = current_app.config['MAX_FILE_SIZE'] // (1024 * 1024)
-            logger.warning(f"File size exceeded the maximum {max_mb}MB.")
-            return jsonify({'error': f'File too large. Maximum {max_mb}MB.'}), 400
-        
-        # Validate file
+        # Validate file (size, magic bytes and content come from one scan of the spooled upload)
         is_valid, result = validate_file_security(file)
         if not is_valid:
             logger.warning("File security validation failed: %s", result)
@@ -37,46 +111,12 @@ def upload_file():
         
         secure_filename_result = sanitize_input(result) 
 
-        # Validate template_id if provided
-        template_id = request.form.get('template_id', current_app.config['DEFAULT_TEMPLATE'])
-        templates = current_app.config['LABEL_TEMPLATES']
-        if template_id not in templates:
-            valid = ', '.join(templates.keys())
-            return jsonify({'error': f"Invalid template_id '{template_id}'. Valid templates: {valid}"}), 400
-
-        # Parse column_mapping from request
-        column_mapping = None
-        column_mapping_raw = request.form.get('column_mapping')
-        if column_mapping_raw:
-            try:
-                mapping = json.loads(column_mapping_raw)
-            except json.JSONDecodeError:
-                return jsonify({'error': 'Invalid column_mapping JSON'}), 400
-
-            barcode_col = mapping.get('barcode_column')
-            if barcode_col is None or not isinstance(barcode_col, int) or barcode_col < 1 or barcode_col > 100:
-                return jsonify({'error': 'barcode_column must be an integer between 1 and 100'}), 400
-
-            # Convert 1-based (user-facing) to 0-based (pandas iloc)
-            column_mapping = {
-                'barcode_column': barcode_col - 1,
-                'text_columns': [
-                    {'column': tc['column'] - 1, 'label': str(tc.get('label', f'Column {tc["column"]}'))[:50]}
-                    for tc in mapping.get('text_columns', [])
-                    if isinstance(tc.get('column'), int) and 1 <= tc['column'] <= 100
-                ],
-                'has_header_row': bool(mapping.get('has_header_row', False))
-            }
-
-        # Extract and validate barcode type
-        barcode_type = request.form.get('barcode_type', 'code128')
-        if barcode_type not in ('code128', 'qr'):
-            return jsonify({'error': f"Invalid barcode_type '{barcode_type}'. Valid types: code128, qr"}), 400
-
-        # Process labels
-        result = process_label_file(file, user_id, secure_filename_result, template_id=template_id, column_mapping=column_mapping, barcode_type=barcode_type)
+        options = _job_options(request.form)
+        column_mapping = _form_column_mapping(request.form)
 
-        return jsonify(result)
+        # The body is copied into the job payload, which the Redis backend stores until a worker takes it
+        job = enqueue_label_job(file, user_id, secure_filename_result, column_mapping=column_mapping, **options)
+        return _job_response(job)
     
     except ValueError as e:
         logger.warning("Upload validation error for user %s", request.user_id)
@@ -86,6 +126,77 @@ def upload_file():
         return jsonify({'error': 'An error occurred processing your file'}), 500
 
 
+@uploads_bp.route('/upload/batch', methods=['POST'])
+@rate_limit("10 per hour")
+@rate_limit("30 per day")
+@verify_session_auth
+def upload_batch():
+    """
+    Many spreadsheets in one request: repeated 'files' fields, or one ZIP
+    as 'archive'. 'column_mappings' (a JSON object) gives a file its own
+    mapping by filename; the rest use 'column_mapping'. Template, barcode
+    and output settings apply to every file. Queued as one job whose
+    result lists every file's outcome.
+    """
+    try:
+        uploads = request.files.getlist('files')
+        archive = request.files.get('archive')
+        if archive and uploads:
+            return jsonify({'error': 'Send either files or an archive, not both'}), 400
+
+        max_files = current_app.config['BATCH_MAX_FILES']
+        if archive:
+            if not archive.filename.lower().endswith('.zip'):
+                return jsonify({'error': 'Archive must be a .zip file'}), 400
+            uploads = read_upload_archive(
+                archive.stream, max_files, current_app.config['MAX_FILE_SIZE'], current_app.config['BATCH_MAX_BYTES'],
+            )
+        if not uploads:
+            return jsonify({'error': 'No files provided'}), 400
+        if len(uploads) > max_files:
+            return jsonify({'error': f'Too many files. Maximum: {max_files}'}), 400
+
+        options = _job_options(request.form)
+        default_mapping = _form_column_mapping(request.form)
+        try:
+            mappings = json.loads(request.form.get('column_mappings') or '{}')
+        except json.JSONDecodeError:
+            return jsonify({'error': 'Invalid column_mappings JSON'}), 400
+        if not isinstance(mappings, dict):
+            return jsonify({'error': 'column_mappings must map filenames to column mappings'}), 400
+
+        files = []
+        for upload in uploads:
+            is_valid, result = validate_file_security(upload)
+            if not is_valid:
+                return jsonify({'error': f'{upload.filename}: {result}'}), 400
+            filename = sanitize_input(result)
+            if any(args['filename'] == filename for _, args in files):
+                return jsonify({'error': f'Duplicate filename: {filename}'}), 400
+            # Keyed by the name as uploaded or as sanitised; an explicit {} is
+            # still this file's mapping (and rejected), not the default
+            if upload.filename in mappings:
+                column_mapping = _column_mapping(mappings.pop(upload.filename))
+            elif filename in mappings:
+                column_mapping = _column_mapping(mappings.pop(filename))
+            else:
+                column_mapping = default_mapping
+            files.append((upload, {'filename': filename, 'column_mapping': column_mapping, **options}))
+        if mappings:
+            return jsonify({'error': f"column_mappings names unknown files: {', '.join(sorted(mappings))}"}), 400
+
+        batch_name = sanitize_input(archive.filename) if archive else f'{len(files)} files'
+        job = enqueue_label_batch(files, request.user_id, batch_name)
+        return _job_response(job)
+
+    except ValueError as e:
+        logger.warning("Batch upload validation error for user %s", request.user_id)
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error queueing batch upload for user %s", request.user_id)
+        return jsonify({'error': 'An error occurred processing your files'}), 500
+
+
 @uploads_bp.route('/preview', methods=['POST'])
 @rate_limit("10 per hour")
 @verify_session_auth
@@ -97,50 +208,15 @@ def preview_labels():
         file = request.files['file']
         user_id = request.user_id
 
-        file_size_bytes = len(file.read())
-        file.seek(0)
-        if file_size_bytes > current_app.config['MAX_FILE_SIZE']:
-            max_mb = current_app.config['MAX_FILE_SIZE'] // (1024 * 1024)
-            logger.warning(f"File size exceeded the maximum {max_mb}MB.")
-            return jsonify({'error': f'File too large. Maximum {max_mb}MB.'}), 400
-
         is_valid, result = validate_file_security(file)
         if not is_valid:
             return jsonify({'error': result}), 400
 
         secure_filename_result = sanitize_input(result)
 
-        template_id = request.form.get('template_id', current_app.config['DEFAULT_TEMPLATE'])
-        templates = current_app.config['LABEL_TEMPLATES']
-        if template_id not in templates:
-            valid = ', '.join(templates.keys())
-            return jsonify({'error': f"Invalid template_id '{template_id}'. Valid templates: {valid}"}), 400
-
-        column_mapping = None
-        column_mapping_raw = request.form.get('column_mapping')
-        if column_mapping_raw:
-            try:
-                mapping = json.loads(column_mapping_raw)
-            except json.JSONDecodeError:
-                return jsonify({'error': 'Invalid column_mapping JSON'}), 400
-
-            barcode_col = mapping.get('barcode_column')
-            if barcode_col is None or not isinstance(barcode_col, int) or barcode_col < 1 or barcode_col > 100:
-                return jsonify({'error': 'barcode_column must be an integer between 1 and 100'}), 400
-
-            column_mapping = {
-                'barcode_column': barcode_col - 1,
-                'text_columns': [
-                    {'column': tc['column'] - 1, 'label': str(tc.get('label', f'Column {tc["column"]}'))[:50]}
-                    for tc in mapping.get('text_columns', [])
-                    if isinstance(tc.get('column'), int) and 1 <= tc['column'] <= 100
-                ],
-                'has_header_row': bool(mapping.get('has_header_row', False))
-            }
-
-        barcode_type = request.form.get('barcode_type', 'code128')
-        if barcode_type not in ('code128', 'qr'):
-            return jsonify({'error': f"Invalid barcode_type '{barcode_type}'. Valid types: code128, qr"}), 400
+        template_id = _validate_template_id(request.form)
+        column_mapping = _form_column_mapping(request.form)
+        barcode_type = _validate_barcode_type(request.form)
 
         result = generate_label_preview(
             file, user_id, secure_filename_result,
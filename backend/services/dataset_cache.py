@@ -0,0 +1,188 @@
+import hashlib
+import json
+import struct
+import sys
+import threading
+import time
+import zlib
+import logging
+from array import array
+from collections import OrderedDict
+from services.redis_client import get_redis
+from utils.LabelBatch import LabelBatch, StringColumn
+
+logger = logging.getLogger(__name__)
+
+DATASET_CACHE_TTL = 600
+DATASET_CACHE_MAX_ENTRY_BYTES = 4_000_000
+LOCAL_CACHE_MAX_BYTES = 64_000_000
+
+_MAGIC = b'LBD2'
+_HEADER = struct.Struct('<4sII')  # magic, labels, text fields
+
+
+def normalized_mapping_json(column_mapping):
+    """Canonical JSON for a column mapping: only the keys parsing uses, in a fixed order."""
+    mapping = {
+        'barcode_column': column_mapping['barcode_column'],
+        'text_columns': [[tc['column'], tc['label']] for tc in column_mapping.get('text_columns', [])],
+        'has_header_row': bool(column_mapping.get('has_header_row')),
+    }
+    return json.dumps(mapping, sort_keys=True, separators=(',', ':'))
+
+
+def dataset_cache_key(file_hash, column_mapping):
+    """Cache key for a parsed file under a given (normalized) column mapping."""
+    mapping_json = normalized_mapping_json(column_mapping)
+    return 'labels:' + hashlib.sha256(f'{file_hash}:{mapping_json}'.encode()).hexdigest()
+
+
+def _le(arr):
+    # Arrays are stored little-endian regardless of host byte order
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr
+
+
+def _take_array(typecode, data, pos, count):
+    arr = array(typecode)
+    end = pos + count * arr.itemsize
+    arr.frombytes(data[pos:end])
+    return _le(arr), end
+
+
+def encode_labels(labels):
+    """
+    Serialize a LabelBatch (or label list) column by column: field label
+    lengths, per-column UTF-8 byte lengths, per-column char offsets, then
+    the field labels and each column's joined text, zlib'd. Decoding hands
+    the joined strings and offsets straight back to StringColumn.
+    """
+    batch = LabelBatch.from_labels(labels)
+    columns = (batch.barcodes,) + batch.text_columns
+
+    field_strings = [label.encode() for label in batch.field_labels]
+    column_data = [col.data.encode() for col in columns]
+    field_lengths = array('I', (len(f) for f in field_strings))
+    data_lengths = array('I', (len(d) for d in column_data))
+
+    payload = [
+        _HEADER.pack(_MAGIC, len(batch), len(batch.field_labels)),
+        _le(field_lengths).tobytes(),
+        _le(data_lengths).tobytes(),
+    ]
+    # Copy before any byteswap so the live batch is never touched
+    payload.extend(_le(array('I', col.offsets)).tobytes() for col in columns)
+    payload.extend(field_strings)
+    payload.extend(column_data)
+    return zlib.compress(b''.join(payload), 1)
+
+
+def decode_labels(blob):
+    """Inverse of encode_labels; returns a LabelBatch."""
+    data = memoryview(zlib.decompress(blob))
+    magic, n_labels, n_fields = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC:
+        raise ValueError('Unrecognized label dataset format')
+
+    field_lengths, pos = _take_array('I', data, _HEADER.size, n_fields)
+    data_lengths, pos = _take_array('I', data, pos, n_fields + 1)
+    offsets = []
+    for _ in range(n_fields + 1):
+        col_offsets, pos = _take_array('I', data, pos, n_labels + 1)
+        offsets.append(col_offsets)
+
+    field_labels = []
+    for length in field_lengths:
+        field_labels.append(str(data[pos:pos + length], 'utf-8'))
+        pos += length
+
+    columns = []
+    for length, col_offsets in zip(data_lengths, offsets):
+        columns.append(StringColumn.from_parts(str(data[pos:pos + length], 'utf-8'), col_offsets))
+        pos += length
+
+    return LabelBatch(columns[0], field_labels, columns[1:])
+
+
+class _LocalCache:
+    """Byte-bounded LRU with per-entry expiry; used when Redis is unavailable."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, blob = entry
+            if expires_at < time.monotonic():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return blob
+
+    def set(self, key, blob, ttl):
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (time.monotonic() + ttl, blob)
+            self.size += len(blob)
+            while self.size > self.max_bytes and self._entries:
+                self._pop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _pop(self, key):
+        _, blob = self._entries.pop(key)
+        self.size -= len(blob)
+
+
+_local = _LocalCache(LOCAL_CACHE_MAX_BYTES)
+
+
+def cache_labels(key, labels):
+    """Store a parsed label batch. Best-effort; oversized datasets are skipped."""
+    try:
+        blob = encode_labels(labels)
+    except Exception as e:
+        logger.warning("Label dataset encode failed: %s", e)
+        return
+    if len(blob) > DATASET_CACHE_MAX_ENTRY_BYTES:
+        return
+
+    r = get_redis()
+    if r:
+        try:
+            r.setex(key, DATASET_CACHE_TTL, blob)
+            return
+        except Exception as e:
+            logger.warning("Redis cache_labels failed: %s", e)
+    _local.set(key, blob, DATASET_CACHE_TTL)
+
+
+def get_cached_labels(key):
+    """Return a cached LabelBatch or None."""
+    blob = None
+    r = get_redis()
+    if r:
+        try:
+            blob = r.get(key)
+        except Exception as e:
+            logger.warning("Redis get_cached_labels failed: %s", e)
+    if blob is None:
+        blob = _local.get(key)
+    if blob is None:
+        return None
+    try:
+        return decode_labels(blob)
+    except Exception as e:
+        logger.warning("Label dataset decode failed: %s", e)
+        return None
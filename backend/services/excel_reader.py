@@ -0,0 +1,91 @@
+import datetime
+import openpyxl
+import pandas as pd
+
+# Legacy BIFF (.xls) workbooks are OLE containers openpyxl cannot open
+_OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+
+def is_legacy_xls(source):
+    """True when a path or seekable buffer holds an OLE (.xls) workbook."""
+    if not hasattr(source, 'read'):
+        with open(source, 'rb') as f:
+            return f.read(len(_OLE_SIGNATURE)) == _OLE_SIGNATURE
+    source.seek(0)
+    header = source.read(len(_OLE_SIGNATURE))
+    source.seek(0)
+    return header == _OLE_SIGNATURE
+
+
+def _cell_to_str(value):
+    """Stringify a cell the way pandas.read_excel(dtype=str) does; blanks become None."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.time):
+        return value.isoformat()
+    return str(value)
+
+
+def _iter_rows(source, columns):
+    """
+    Yield {column: str} dicts per sheet row of the first worksheet, read
+    with openpyxl's read-only (streaming) mode and cut off after the last
+    wanted column. Rows missing from the sheet come back blank, so row
+    positions match the sheet.
+    """
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        for values in wb.worksheets[0].iter_rows(values_only=True, max_col=max(columns) + 1):
+            yield {c: _cell_to_str(values[c]) for c in columns if c < len(values)}
+    finally:
+        wb.close()
+
+
+def iter_excel_chunks(source, columns, has_header_row=False, chunk_rows=1000, max_rows=None):
+    """
+    Stream the first worksheet of an .xlsx, yielding DataFrames of up to
+    chunk_rows rows holding only `columns` (positional indices) as strings.
+    Cells past the last wanted column are never read, only wanted cells
+    are converted, and iteration stops after max_rows data rows.
+    """
+    columns = sorted(set(columns))
+    if not columns:
+        return
+
+    rows = _iter_rows(source, columns)
+    try:
+        if has_header_row:
+            next(rows, None)
+
+        buffers = {c: [] for c in columns}
+        seen = 0
+        for row in rows:
+            if max_rows is not None and seen >= max_rows:
+                break
+            seen += 1
+            for c in columns:
+                buffers[c].append(row.get(c))
+            if len(buffers[columns[0]]) >= chunk_rows:
+                yield pd.DataFrame(buffers, dtype=object)
+                buffers = {c: [] for c in columns}
+
+        if buffers[columns[0]]:
+            yield pd.DataFrame(buffers, dtype=object)
+    finally:
+        rows.close()
+
+
+def read_excel_columns(source, columns, has_header_row=False, nrows=None):
+    """Read `columns` of the first worksheet into one DataFrame of strings."""
+    frames = list(iter_excel_chunks(source, columns, has_header_row, chunk_rows=50_000, max_rows=nrows))
+    if not frames:
+        return pd.DataFrame({c: [] for c in sorted(set(columns))}, dtype=object)
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
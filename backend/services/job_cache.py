@@ -0,0 +1,64 @@
+import hashlib
+import json
+import logging
+from models.database import get_supabase_admin
+from services.dataset_cache import normalized_mapping_json
+
+logger = logging.getLogger(__name__)
+
+
+def job_fingerprint(file_hash, template_id, barcode_type, column_mapping, render_options):
+    """
+    Content address of a job's ZIP: the uploaded file's sha256, the
+    template, barcode type and normalized column mapping, plus every other
+    setting that changes the output bytes (render_options: output format,
+    dpi, ZIP policy, sheet output mode, raster mode).
+    """
+    parts = json.dumps(
+        [file_hash, template_id, barcode_type, json.loads(normalized_mapping_json(column_mapping)), render_options],
+        sort_keys=True, separators=(',', ':'),
+    )
+    return hashlib.sha256(parts.encode()).hexdigest()
+
+
+def find_job_result(user_id, fingerprint):
+    """
+    The user's most recent finished job with this fingerprint, as
+    {'storage_path', 'zip_size', 'zip_index', 'label_count', 'sheet_count'},
+    or None.
+    The fingerprint is only written once a job's ZIP is uploaded, so a
+    match always names a complete object. Best-effort — never raises.
+    """
+    try:
+        response = get_supabase_admin().table('user_sheets').select(
+            'label_count, sheet_count, total_size_bytes, sheet_files(storage_path, sheet_number, zip_index)'
+        ).eq('user_id', user_id).eq('job_fingerprint', fingerprint).order(
+            'created_at', desc=True
+        ).limit(1).execute()
+    except Exception as e:
+        logger.warning("Job result lookup failed (non-fatal): %s", e)
+        return None
+
+    for sheet in response.data or []:
+        zip_file = next((f for f in sheet.get('sheet_files') or [] if f.get('sheet_number') == 0), None)
+        if zip_file:
+            return {
+                'storage_path': zip_file['storage_path'],
+                'zip_size': sheet['total_size_bytes'],
+                'zip_index': zip_file.get('zip_index'),
+                'label_count': sheet['label_count'],
+                'sheet_count': sheet['sheet_count'],
+            }
+    return None
+
+
+def count_storage_references(storage_path, excluding_user_sheet_id=None):
+    """
+    Number of sheet_files rows pointing at storage_path, optionally not
+    counting one user sheet's. A storage object is only removed once this
+    reaches zero, since reused job results share one object.
+    """
+    query = get_supabase_admin().table('sheet_files').select('user_sheet_id').eq('storage_path', storage_path)
+    if excluding_user_sheet_id is not None:
+        query = query.neq('user_sheet_id', excluding_user_sheet_id)
+    return len(query.execute().data or [])
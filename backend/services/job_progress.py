@@ -0,0 +1,146 @@
+import json
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# A job's stream ends with one of these
+TERMINAL_STAGES = ('succeeded', 'failed')
+EVENTS_TTL = 24 * 3600
+# Jobs whose events the in-process broker keeps, oldest dropped first
+LOCAL_MAX_JOBS = 1000
+
+
+def _events_key(job_id):
+    return f"job:{job_id}:events"
+
+
+def _channel(job_id):
+    return f"job:{job_id}:progress"
+
+
+class LocalProgressBroker:
+    """
+    Per-job event lists in this process, with a condition for subscribers
+    to wait on; pairs with LocalJobBackend. Late subscribers replay the
+    whole list, so a stream opened after a fast job still sees every event.
+    """
+
+    def __init__(self, max_jobs=LOCAL_MAX_JOBS):
+        self.max_jobs = max_jobs
+        self._events = OrderedDict()
+        self._cond = threading.Condition()
+
+    def publish(self, job_id, stage, data):
+        with self._cond:
+            events = self._events.setdefault(job_id, [])
+            self._events.move_to_end(job_id)
+            events.append({'seq': len(events) + 1, 'stage': stage, **data})
+            while len(self._events) > self.max_jobs:
+                self._events.popitem(last=False)
+            self._cond.notify_all()
+
+    def subscribe(self, job_id, after=0, heartbeat=15):
+        """
+        Yield job_id's events with seq > after as they are published, and
+        None whenever heartbeat seconds pass without one. Ends after a
+        terminal event, or as soon as this process holds no events for the
+        job: it was never published here, or was evicted as one of the
+        oldest, and nothing more will arrive.
+        """
+        while True:
+            with self._cond:
+                events = self._events.get(job_id)
+                if events is not None and len(events) <= after:
+                    self._cond.wait(heartbeat)
+                    events = self._events.get(job_id)
+                if events is None:
+                    return
+                new = events[after:]
+            if not new:
+                yield None
+                continue
+            for event in new:
+                yield event
+                if event['stage'] in TERMINAL_STAGES:
+                    return
+            after = new[-1]['seq']
+
+
+class RedisProgressBroker:
+    """
+    Events appended to job:<id>:events and announced on a pub/sub channel;
+    pairs with RedisJobBackend, so the web process streams what worker
+    processes publish. The list lets late subscribers replay history.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def publish(self, job_id, stage, data):
+        event = {'stage': stage, **data}
+        seq = self.redis.rpush(_events_key(job_id), json.dumps(event))
+        self.redis.expire(_events_key(job_id), EVENTS_TTL)
+        self.redis.publish(_channel(job_id), json.dumps({'seq': seq, **event}))
+
+    def subscribe(self, job_id, after=0, heartbeat=15):
+        """As LocalProgressBroker.subscribe; ends once the job's event list has expired."""
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        # Subscribe before reading history so nothing falls between the two
+        pubsub.subscribe(_channel(job_id))
+        try:
+            history = self.redis.lrange(_events_key(job_id), after, -1)
+            pending = [{'seq': after + i, **json.loads(raw)} for i, raw in enumerate(history, start=1)]
+            while True:
+                for event in pending:
+                    if event['seq'] <= after:
+                        continue  # announced again after the history read
+                    after = event['seq']
+                    yield event
+                    if event['stage'] in TERMINAL_STAGES:
+                        return
+                if not self.redis.exists(_events_key(job_id)):
+                    return
+                message = pubsub.get_message(timeout=heartbeat)
+                if message is None:
+                    pending = []
+                    yield None
+                else:
+                    pending = [json.loads(message['data'])]
+        finally:
+            pubsub.close()
+
+
+class JobProgress:
+    """
+    Progress callback process_label_file reports through: progress(stage,
+    **data) publishes one event for the job. Publishing is best-effort and
+    never fails the job. Stages that report a percentage are throttled to
+    one event per whole percent (per file, for batches).
+    """
+
+    def __init__(self, broker, job_id):
+        self.broker = broker
+        self.job_id = job_id
+        self._last_percent = {}
+
+    def __call__(self, stage, **data):
+        percent = data.get('percent')
+        if percent is not None:
+            percent = data['percent'] = int(percent)
+            key = (stage, data.get('file'))
+            if self._last_percent.get(key) == percent:
+                return
+            self._last_percent[key] = percent
+        try:
+            self.broker.publish(self.job_id, stage, data)
+        except Exception as e:
+            logger.warning("Progress publish failed for job %s (non-fatal): %s", self.job_id, e)
+
+
+def report_sheets(sheets, sheet_count, progress):
+    """Pass sheets through, reporting 'rendered' as each one comes out of the renderer."""
+    for sheet_number, sheet in enumerate(sheets, start=1):
+        progress('rendered', sheet=sheet_number, sheets=sheet_count, percent=100 * sheet_number / sheet_count)
+        yield sheet
@@ -0,0 +1,393 @@
+import io
+import json
+import time
+import uuid
+import zipfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from flask import current_app
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from services.job_progress import TERMINAL_STAGES, JobProgress, LocalProgressBroker, RedisProgressBroker
+from services.redis_client import get_blocking_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+JOB_TTL = 24 * 3600
+QUEUE_KEY = 'jobs:pending'
+# Jobs a worker has taken and not finished; see RedisJobBackend.reap_orphans
+PROCESSING_KEY = 'jobs:processing'
+WORKER_POLL_SECONDS = 5
+# A running job's lease lasts this long and is renewed every third of it
+JOB_LEASE_SECONDS = 60
+# Seconds a taken job may go without a lease before it is reaped
+ORPHAN_GRACE_SECONDS = 10
+# Seconds a worker waits before retrying after Redis errors
+WORKER_RETRY_SECONDS = 2
+
+_backend_lock = threading.Lock()
+
+
+def _job_key(job_id):
+    return f"job:{job_id}"
+
+
+def _file_key(job_id):
+    return f"job:{job_id}:file"
+
+
+def _lease_key(job_id):
+    return f"job:{job_id}:lease"
+
+
+def _orphan_key(job_id):
+    return f"job:{job_id}:orphan"
+
+
+def new_job(user_id, filename, kind='file'):
+    now = time.time()
+    return {
+        'id': uuid.uuid4().hex,
+        'kind': kind,
+        'user_id': user_id,
+        'filename': filename,
+        'status': 'queued',
+        'result': None,
+        'error': None,
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+def run_job(backend, job_id, content, args):
+    """
+    Run one queued upload through process_label_file (or a batch through
+    process_label_batch), recording the outcome on the job. ValueErrors
+    are the user's to see, as /upload used to return them; anything else
+    is logged and reported generically. A batch fails only when none of
+    its files could be processed.
+    """
+    from services.label_service import process_label_batch, process_label_file
+
+    job = backend.update(job_id, status='running')
+    if job is None:
+        logger.warning("Job %s expired before it ran", job_id)
+        return
+    progress = JobProgress(backend.broker, job_id)
+    progress('running')
+    try:
+        if job.get('kind') == 'batch':
+            items = _unpack_batch(content, args['files'])
+            result = process_label_batch(items, job['user_id'], progress=progress)
+            if not result['succeeded']:
+                _finish(backend, progress, job_id, status='failed', result=result,
+                        error='None of the files could be processed')
+                return
+        else:
+            result = process_label_file(
+                io.BytesIO(content), job['user_id'], job['filename'], progress=progress, **args,
+            )
+    except ValueError as e:
+        logger.warning("Job %s failed validation for user %s", job_id, job['user_id'])
+        _finish(backend, progress, job_id, status='failed', error=str(e))
+    except Exception:
+        logger.exception("Job %s failed for user %s", job_id, job['user_id'])
+        _finish(backend, progress, job_id, status='failed', error='An error occurred processing your file')
+    else:
+        _finish(backend, progress, job_id, status='succeeded', result=result)
+
+
+def _pack_batch(contents):
+    """One stored ZIP of a batch's files, so a batch queues as a single blob like a file does."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_STORED) as zf:
+        for index, content in enumerate(contents):
+            zf.writestr(f'{index:03d}', content)
+    return buf.getvalue()
+
+
+def _unpack_batch(content, files):
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        return [{**args, 'file': io.BytesIO(zf.read(f'{index:03d}'))} for index, args in enumerate(files)]
+
+
+def _finish(backend, progress, job_id, **fields):
+    # The record is final before the terminal event ends anyone's stream
+    backend.update(job_id, **fields)
+    progress(fields['status'], **{k: v for k, v in fields.items() if k != 'status'})
+
+
+class LocalJobBackend:
+    """
+    Jobs kept in a dict and run on a thread pool inside this process; for
+    development and tests. With no workers, jobs run inline on submit.
+    """
+
+    def __init__(self, app, workers):
+        self.app = app
+        self.broker = LocalProgressBroker()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='label-job') if workers else None
+
+    def submit(self, job, content, args):
+        self.save(job)
+        JobProgress(self.broker, job['id'])('queued')
+        if self._pool is None:
+            run_job(self, job['id'], content, args)
+        else:
+            self._pool.submit(self._run, job['id'], content, args)
+        return job
+
+    def _run(self, job_id, content, args):
+        with self.app.app_context():
+            run_job(self, job_id, content, args)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def save(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(fields, updated_at=time.time())
+            return dict(job)
+
+
+class RedisJobBackend:
+    """
+    Jobs as JSON under job:<id>, the upload under job:<id>:file and the
+    pending queue as a Redis list, so any number of worker processes
+    (see worker.py) can take jobs off it. Everything expires after JOB_TTL.
+
+    Taking a job moves it to PROCESSING_KEY under a lease the worker keeps
+    renewing while it runs (see lease), so a job whose worker died is
+    found by reap_orphans instead of staying 'running' forever.
+    blocking_redis does the blocking pop; its socket timeout must outlast
+    the wait.
+    """
+
+    def __init__(self, redis, blocking_redis=None):
+        self.redis = redis
+        self.blocking_redis = blocking_redis or redis
+        self.broker = RedisProgressBroker(redis)
+        self._taken = {}
+
+    def submit(self, job, content, args):
+        pipe = self.redis.pipeline()
+        pipe.setex(_job_key(job['id']), JOB_TTL, json.dumps(job))
+        pipe.setex(_file_key(job['id']), JOB_TTL, content)
+        pipe.execute()
+        # Announced before a worker can pick it up, so events stay in order
+        JobProgress(self.broker, job['id'])('queued')
+        self.redis.lpush(QUEUE_KEY, json.dumps({'id': job['id'], 'args': args}))
+        return job
+
+    def next_job(self, timeout=WORKER_POLL_SECONDS):
+        """
+        (job_id, content, args) of the oldest queued job, or None after
+        timeout seconds. The job stays in PROCESSING_KEY, leased to this
+        worker, until the lease context around running it exits.
+        """
+        raw = self.blocking_redis.brpoplpush(QUEUE_KEY, PROCESSING_KEY, timeout=timeout)
+        if raw is None:
+            return None
+        message = json.loads(raw)
+        job_id = message['id']
+        self._taken[job_id] = raw
+        pipe = self.redis.pipeline()
+        pipe.setex(_lease_key(job_id), JOB_LEASE_SECONDS, b'1')
+        pipe.get(_file_key(job_id))
+        pipe.delete(_file_key(job_id))
+        _, content, _ = pipe.execute()
+        if content is None:
+            logger.warning("Upload for job %s expired before it ran", job_id)
+            self._fail(job_id, 'Upload expired before processing')
+            self._release(job_id)
+            return None
+        return job_id, content, message['args']
+
+    @contextmanager
+    def lease(self, job_id, interval=JOB_LEASE_SECONDS / 3):
+        """
+        Keep renewing job_id's lease while the block runs, then release the
+        job. If Redis drops out mid-job the job stays taken, unreleased, so
+        reap_orphans settles it once its lease has lapsed.
+        """
+        done = threading.Event()
+
+        def renew():
+            while not done.wait(interval):
+                try:
+                    self.redis.expire(_lease_key(job_id), JOB_LEASE_SECONDS)
+                except Exception as e:
+                    logger.warning("Lease renewal for job %s failed: %s", job_id, e)
+
+        renewer = threading.Thread(target=renew, name=f'lease-{job_id}', daemon=True)
+        renewer.start()
+        lost_redis = False
+        try:
+            yield
+        except (RedisConnectionError, RedisTimeoutError):
+            lost_redis = True
+            raise
+        finally:
+            done.set()
+            renewer.join()
+            if lost_redis:
+                self._taken.pop(job_id, None)
+            else:
+                try:
+                    self._release(job_id)
+                except Exception as e:
+                    # The reaper clears it later; the job record is already final
+                    logger.warning("Releasing job %s failed: %s", job_id, e)
+
+    def _release(self, job_id):
+        raw = self._taken.pop(job_id)
+        pipe = self.redis.pipeline()
+        pipe.lrem(PROCESSING_KEY, 1, raw)
+        pipe.delete(_lease_key(job_id), _orphan_key(job_id))
+        pipe.execute()
+
+    def _fail(self, job_id, error):
+        self.update(job_id, status='failed', error=error)
+        JobProgress(self.broker, job_id)('failed', error=error)
+
+    def reap_orphans(self, now=None):
+        """
+        Fail taken jobs whose lease has been gone for ORPHAN_GRACE_SECONDS:
+        their worker died mid-job. Their upload was consumed when taken,
+        so they cannot be re-run. The grace covers the moment between a
+        worker taking a job and setting its lease; the first time a job is
+        seen without one is recorded in Redis so every worker agrees.
+        Returns the ids reaped.
+        """
+        now = time.time() if now is None else now
+        reaped = []
+        for raw in self.redis.lrange(PROCESSING_KEY, 0, -1):
+            job_id = json.loads(raw)['id']
+            if self.redis.exists(_lease_key(job_id)):
+                continue
+            self.redis.set(_orphan_key(job_id), str(now), nx=True, ex=JOB_TTL)
+            first_seen = float(self.redis.get(_orphan_key(job_id)) or now)
+            # Only the worker whose LREM removes it reports the failure
+            if now - first_seen < ORPHAN_GRACE_SECONDS or not self.redis.lrem(PROCESSING_KEY, 1, raw):
+                continue
+            self.redis.delete(_orphan_key(job_id))
+            job = self.get(job_id)
+            if job is not None and job['status'] not in TERMINAL_STAGES:
+                logger.warning("Job %s lost its worker; marking it failed", job_id)
+                self._fail(job_id, 'The job stopped unexpectedly; please upload the file again')
+                reaped.append(job_id)
+        return reaped
+
+    def get(self, job_id):
+        raw = self.redis.get(_job_key(job_id))
+        return json.loads(raw) if raw else None
+
+    def save(self, job):
+        self.redis.setex(_job_key(job['id']), JOB_TTL, json.dumps(job))
+
+    def update(self, job_id, **fields):
+        # Each job is only ever written by the one worker running it
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.update(fields, updated_at=time.time())
+        self.save(job)
+        return job
+
+
+def _create_backend(app):
+    # Redis is opt-in: queued jobs only run if worker.py is deployed too
+    choice = app.config['JOB_QUEUE_BACKEND']
+    if choice not in ('redis', 'local'):
+        raise ValueError(f'Unknown JOB_QUEUE_BACKEND: {choice}')
+    if choice == 'redis':
+        r = get_redis()
+        if not r:
+            raise RuntimeError('JOB_QUEUE_BACKEND is redis but Redis is unavailable')
+        logger.info("Label jobs queued in Redis")
+        return RedisJobBackend(r, get_blocking_redis(WORKER_POLL_SECONDS))
+    logger.info("Label jobs run in-process on %d threads", app.config['LOCAL_JOB_WORKERS'])
+    return LocalJobBackend(app, app.config['LOCAL_JOB_WORKERS'])
+
+
+def get_job_backend(app=None):
+    """The app's job backend, created on first use."""
+    app = app or current_app._get_current_object()
+    with _backend_lock:
+        backend = app.extensions.get('job_backend')
+        if backend is None:
+            backend = app.extensions['job_backend'] = _create_backend(app)
+    return backend
+
+
+def _read_upload(file):
+    stream = getattr(file, 'stream', file)
+    stream.seek(0)
+    return stream.read()
+
+
+def enqueue_label_job(file, user_id, filename, **args):
+    """
+    Queue process_label_file(file, user_id, filename, **args) and return
+    the new job. The upload is copied out of the request, which closes its
+    stream once the response is sent.
+    """
+    job = new_job(user_id, filename)
+    return get_job_backend().submit(job, _read_upload(file), args)
+
+
+def enqueue_label_batch(files, user_id, filename):
+    """
+    Queue process_label_batch over files, a list of (file, args) with args
+    holding 'filename' and the process_label_file keyword arguments, as
+    one job.
+    """
+    content = _pack_batch(_read_upload(file) for file, _ in files)
+    job = new_job(user_id, filename, kind='batch')
+    return get_job_backend().submit(job, content, {'files': [args for _, args in files]})
+
+
+def get_job(job_id, user_id):
+    """The user's job, or None if it does not exist, has expired or is someone else's."""
+    job = get_job_backend().get(job_id)
+    if job is None or job['user_id'] != user_id:
+        return None
+    return job
+
+
+def run_worker(app, stop=None):
+    """Worker process loop: run queued jobs from Redis until stop is set."""
+    with app.app_context():
+        backend = get_job_backend(app)
+        if not isinstance(backend, RedisJobBackend):
+            raise RuntimeError('Job workers need Redis; the local backend runs jobs inside the web process')
+        logger.info("Job worker started")
+        while stop is None or not stop.is_set():
+            try:
+                backend.reap_orphans()
+                item = backend.next_job()
+            except (RedisConnectionError, RedisTimeoutError) as e:
+                logger.warning("Job worker lost Redis, retrying in %ds: %s", WORKER_RETRY_SECONDS, e)
+                time.sleep(WORKER_RETRY_SECONDS)
+                continue
+            if item is None:
+                continue
+            try:
+                with backend.lease(item[0]):
+                    run_job(backend, *item)
+            except (RedisConnectionError, RedisTimeoutError) as e:
+                logger.warning("Job worker lost Redis running job %s, leaving it to the reaper: %s", item[0], e)
+                time.sleep(WORKER_RETRY_SECONDS)
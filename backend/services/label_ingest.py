@@ -0,0 +1,153 @@
+import pandas as pd
+import logging
+from services.excel_reader import is_legacy_xls, iter_excel_chunks, read_excel_columns
+from utils.LabelBatch import LabelBatch, StringColumn
+
+logger = logging.getLogger(__name__)
+
+MAX_FIELD_LENGTH = 100
+
+
+def _mapped_columns(column_mapping):
+    """Positional indices referenced by a column mapping (barcode first)."""
+    cols = [column_mapping['barcode_column']]
+    cols.extend(tc['column'] for tc in column_mapping.get('text_columns', []))
+    return cols
+
+
+def _rewind(source):
+    """Seek buffers back to the start so each pass reads the whole file."""
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+
+def _csv_usecols(filepath, column_mapping):
+    """Mapped column indices that actually exist in the CSV, sorted."""
+    wanted = sorted(set(_mapped_columns(column_mapping)))
+    # Peek the first row to learn the width — usecols rejects unknown indices
+    _rewind(filepath)
+    width = pd.read_csv(filepath, header=None, nrows=1, dtype=str).shape[1]
+    _rewind(filepath)
+    return [c for c in wanted if c < width]
+
+
+def read_label_columns(filepath, column_mapping, is_excel=False, nrows=None):
+    """
+    Read only the mapped columns of a CSV/Excel file (path or seekable
+    buffer), as strings.
+    Returned frame is keyed by positional column index so mappings can be
+    applied regardless of header names. Mapped columns beyond the file's
+    width are simply absent. nrows caps the number of data rows parsed.
+    """
+    header_arg = 0 if column_mapping.get('has_header_row') else None
+
+    if is_excel:
+        wanted = sorted(set(_mapped_columns(column_mapping)))
+        if not is_legacy_xls(filepath):
+            return read_excel_columns(filepath, wanted, bool(column_mapping.get('has_header_row')), nrows=nrows)
+        df = pd.read_excel(filepath, header=header_arg, dtype=str, nrows=nrows)
+        df.columns = range(df.shape[1])
+        return df[[c for c in wanted if c < df.shape[1]]]
+
+    usecols = _csv_usecols(filepath, column_mapping)
+    if not usecols:
+        return pd.DataFrame()
+
+    df = pd.read_csv(filepath, header=header_arg, usecols=usecols, dtype=str, nrows=nrows)
+    # usecols keeps file order, which is the sorted order of the indices
+    df.columns = usecols
+    return df
+
+
+def _iter_frames(filepath, column_mapping, chunk_rows, is_excel=False):
+    if is_excel and not is_legacy_xls(filepath):
+        return iter_excel_chunks(
+            filepath, _mapped_columns(column_mapping),
+            has_header_row=bool(column_mapping.get('has_header_row')), chunk_rows=chunk_rows,
+        )
+    if is_excel:
+        # Legacy .xls has no streaming reader; parse once and yield it whole
+        return iter([read_label_columns(filepath, column_mapping, is_excel=True)])
+    return _iter_csv_chunks(filepath, column_mapping, chunk_rows)
+
+
+def _iter_csv_chunks(filepath, column_mapping, chunk_rows):
+    header_arg = 0 if column_mapping.get('has_header_row') else None
+    usecols = _csv_usecols(filepath, column_mapping)
+    if not usecols:
+        return
+    reader = pd.read_csv(filepath, header=header_arg, usecols=usecols, dtype=str, chunksize=chunk_rows)
+    with reader:
+        for df in reader:
+            df.columns = usecols
+            yield df
+
+
+def scan_label_stats(filepath, column_mapping, chunk_rows, is_excel=False):
+    """
+    Cheap first pass that reads only the barcode column.
+    Returns (valid label count, longest barcode length) so the renderer can
+    be calibrated before any label is drawn.
+    """
+    barcode_col = column_mapping['barcode_column']
+    barcode_only = {'barcode_column': barcode_col, 'has_header_row': column_mapping.get('has_header_row')}
+
+    count = 0
+    longest = 0
+    for df in _iter_frames(filepath, barcode_only, chunk_rows, is_excel=is_excel):
+        if barcode_col not in df.columns:
+            continue
+        barcodes = _clean_column(df[barcode_col]).dropna()
+        if len(barcodes):
+            count += len(barcodes)
+            longest = max(longest, int(barcodes.str.len().max()))
+    return count, longest
+
+
+def iter_label_chunks(filepath, column_mapping, chunk_rows, is_excel=False):
+    """Yield LabelBatches from a file, parsing at most chunk_rows rows at a time."""
+    for df in _iter_frames(filepath, column_mapping, chunk_rows, is_excel=is_excel):
+        labels = extract_labels(df, column_mapping)
+        if labels:
+            yield labels
+
+
+def read_preview_labels(filepath, column_mapping, limit, is_excel=False):
+    """First `limit` labels of a file, parsing only as many rows as needed."""
+    chunks = []
+    found = 0
+    for chunk in iter_label_chunks(filepath, column_mapping, chunk_rows=limit, is_excel=is_excel):
+        chunks.append(chunk)
+        found += len(chunk)
+        if found >= limit:
+            break
+    return LabelBatch.concat(chunks)[:limit]
+
+
+def _clean_column(series):
+    """Strip, truncate and null out empty / 'nan' cells across a whole column."""
+    cleaned = series.str.strip().str.slice(0, MAX_FIELD_LENGTH)
+    return cleaned.where(cleaned.notna() & (cleaned != '') & (cleaned != 'nan'))
+
+
+def extract_labels(df, column_mapping):
+    """
+    Build a LabelBatch from a frame returned by read_label_columns. Rows
+    without a usable barcode are dropped; empty text cells are omitted from
+    that row's text lines.
+    """
+    barcode_col = column_mapping['barcode_column']
+    if barcode_col not in df.columns:
+        return LabelBatch([])
+
+    barcodes = _clean_column(df[barcode_col])
+    valid = barcodes.notna()
+
+    field_labels = []
+    text_columns = []
+    for tc in column_mapping.get('text_columns', []):
+        if tc['column'] in df.columns:
+            field_labels.append(tc['label'])
+            text_columns.append(StringColumn.from_series(_clean_column(df[tc['column']])[valid]))
+
+    return LabelBatch(StringColumn.from_series(barcodes[valid]), field_labels, text_columns)
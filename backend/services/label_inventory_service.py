@@ -3,6 +3,7 @@ import logging
 from flask import current_app
 from models.database import get_supabase_admin
 from utils.PDFSheetGenerator import PDFSheetGenerator
+from utils.LabelBatch import LabelBatch
 
 logger = logging.getLogger(__name__)
 
@@ -63,13 +64,15 @@ def generate_reprint_pdf(label_id, user_id):
     if row['user_id'] != user_id:
         raise PermissionError('Access denied')
 
-    label = (
-        row['barcode_value'],
-        [(tf['label'], tf['value']) for tf in (row['text_fields'] or [])],
+    text_fields = row['text_fields'] or []
+    label = LabelBatch(
+        [row['barcode_value']],
+        [tf['label'] for tf in text_fields],
+        [[tf['value']] for tf in text_fields],
     )
 
-    template = current_app.config['LABEL_TEMPLATES'].get(row['template_id'])
-    sheet_gen = PDFSheetGenerator(current_app.config['SHEET_FOLDER'], template)
-    pdf_bytes = sheet_gen.generate_preview_sheet([label], barcode_type=row['barcode_type'])
+    template = current_app.config['LABEL_LAYOUTS'].get(row['template_id'])
+    sheet_gen = PDFSheetGenerator(template)
+    pdf_bytes = sheet_gen.generate_preview_sheet(label, barcode_type=row['barcode_type'])
 
     return pdf_bytes
@@ -1,13 +1,36 @@
 import base64
-import pandas as pd
-import uuid
+import queue
+import threading
 import time
 import os
 from flask import current_app
-from services.storage_service import create_zip_from_sheets, upload_zip_to_storage
-from services.redis_client import cache_zip
+from services.storage_service import (
+    create_zip_from_sheets,
+    create_zip_from_document,
+    create_zip_from_zpl,
+    pdf_page_compression,
+    zip_entry_index,
+    storage_object_exists,
+    upload_zip_to_storage,
+)
+from services.zip_cache import cache_zip
+from services.excel_reader import is_legacy_xls
+from services.dataset_cache import dataset_cache_key, get_cached_labels, cache_labels
+from services.job_cache import job_fingerprint, find_job_result
+from services.job_progress import report_sheets
+from services.label_ingest import (
+    read_label_columns,
+    extract_labels,
+    scan_label_stats,
+    iter_label_chunks,
+    read_preview_labels,
+)
 from utils.PDFSheetGenerator import PDFSheetGenerator
+from utils.RasterSheetGenerator import RasterSheetGenerator
+from utils.ZPLGenerator import ZPLGenerator
+from utils.LabelBatch import LabelBatch
 from models.database import get_supabase_admin
+from utils.security import get_upload_scan
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,12 +51,63 @@ def _bulk_insert_label_items(records):
         logger.error("label_items bulk insert failed (non-fatal): %s", e)
 
 
-def process_label_file(file, user_id, secure_filename, template_id=None, column_mapping=None, barcode_type='code128'):
+def _no_progress(stage, **data):
+    pass
 
-    logger.info("Starting process_label_file for user %s", user_id)
 
-    if not column_mapping:
-        column_mapping = {
+def _store_label_items(label_chunks, user_sheet_id, user_id, labels_per_sheet, barcode_type, template_id,
+                       label_count=None, progress=_no_progress):
+    """
+    Build and insert label_items records one insert chunk at a time, so only
+    _LABEL_INSERT_CHUNK record dicts exist at once. Best-effort — never raises.
+    """
+    idx = 0
+    try:
+        for labels in label_chunks:
+            labels = LabelBatch.from_labels(labels)
+            for start in range(0, len(labels), _LABEL_INSERT_CHUNK):
+                label_records = []
+                for barcode_value, text_lines in labels[start:start + _LABEL_INSERT_CHUNK]:
+                    label_records.append({
+                        'user_sheet_id': user_sheet_id,
+                        'user_id': user_id,
+                        'label_index': idx,
+                        'sheet_number': (idx // labels_per_sheet) + 1,
+                        'position_on_sheet': idx % labels_per_sheet,
+                        'barcode_value': barcode_value,
+                        'text_fields': [{'label': l, 'value': v} for l, v in text_lines],
+                        'barcode_type': barcode_type,
+                        'template_id': template_id,
+                    })
+                    idx += 1
+                _bulk_insert_label_items(label_records)
+                if label_count:
+                    progress('metadata', labels=idx, total_labels=label_count, percent=100 * idx / label_count)
+    except Exception as e:
+        logger.error("label_items extraction failed (non-fatal): %s", e)
+
+
+def _render_workers(sheet_count):
+    """Render processes for a job: 1 for small jobs, else capped by config and cores."""
+    if sheet_count < current_app.config['PARALLEL_RENDER_MIN_SHEETS']:
+        return 1
+    return max(1, min(current_app.config['MAX_CONCURRENT_WORKERS'], os.cpu_count() or 1))
+
+
+class _LabelJob:
+    """
+    One file's way through the pipeline. parse_label_job fills in what the
+    file and settings say, render_label_job adds the ZIP, and
+    publish_label_job stores it and returns the result. Batches run the
+    three stages for different files at once.
+    """
+
+    def __init__(self, file, user_id, secure_filename, template_id, column_mapping, barcode_type,
+                 output_format, dpi, progress):
+        self.user_id = user_id
+        self.secure_filename = secure_filename
+        self.template_id = template_id or current_app.config['DEFAULT_TEMPLATE']
+        self.column_mapping = column_mapping or {
             'barcode_column': 1,
             'text_columns': [
                 {'column': 0, 'label': 'Location'},
@@ -41,145 +115,343 @@ def process_label_file(file, user_id, secure_filename, template_id=None, column_
             ],
             'has_header_row': False
         }
-
-    ext = os.path.splitext(secure_filename)[1]
-    saved_name = f"{uuid.uuid4().hex}{ext}"
-    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], saved_name)
-    file.save(filepath)
-    logger.info("File saved to %s", filepath)
-
-    try:
-        header_arg = 0 if column_mapping.get('has_header_row') else None
-        if secure_filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(filepath, header=header_arg)
-        else:
-            df = pd.read_csv(filepath, header=header_arg)
+        self.barcode_type = barcode_type
+        self.output_format = output_format
+        self.dpi = dpi
+        self.progress = progress
+        # Parse straight from the spooled request stream — no copy to UPLOAD_FOLDER
+        self.source = getattr(file, 'stream', file)
+        self.labels = None
+        self.longest_value = None
+        self.zip_buffer = None
+        self.zip_index = None
+        self.reused = None
+        self.start_time = None
+
+
+def parse_label_job(file, user_id, secure_filename, template_id=None, column_mapping=None, barcode_type='code128',
+                    output_format='pdf', dpi=None, progress=_no_progress):
+    """Parse (or scan) the file, validate its size and look for a reusable earlier result."""
+    logger.info("Starting process_label_file for user %s", user_id)
+    job = _LabelJob(file, user_id, secure_filename, template_id, column_mapping, barcode_type,
+                    output_format, dpi, progress)
+    source, column_mapping = job.source, job.column_mapping
+    upload_scan = get_upload_scan(source)
+
+    job.template = current_app.config['LABEL_LAYOUTS'].get(job.template_id)
+    job.zip_policy = current_app.config['ZIP_POLICY']
+    job.labels_per_sheet = job.template.labels_per_sheet
+
+    # A file that was just previewed with the same mapping skips parsing
+    cache_key = dataset_cache_key(upload_scan.sha256, column_mapping)
+    job.labels = get_cached_labels(cache_key)
+
+    # Large CSVs stream: a barcode-only scan for count and calibration,
+    # then labels are parsed and rendered a few pages at a time.
+    is_excel = secure_filename.endswith(('.xlsx', '.xls'))
+    job.streaming = (job.labels is None and not is_excel
+                     and upload_scan.size > current_app.config['STREAMING_THRESHOLD_BYTES'])
+    job.chunk_rows = job.labels_per_sheet * current_app.config['STREAMING_PAGES_IN_FLIGHT']
+
+    if job.labels is not None:
+        logger.info("Parsed dataset cache hit, skipping parse")
+        job.label_count = len(job.labels)
+    elif job.streaming:
+        job.label_count, job.longest_value = scan_label_stats(source, column_mapping, job.chunk_rows)
+        logger.info("Streaming mode, scanned %d labels", job.label_count)
+    else:
+        df = read_label_columns(source, column_mapping, is_excel=is_excel)
         logger.info("File parsed, shape: %s", df.shape)
-
-        barcode_col = column_mapping['barcode_column']
-        text_cols = column_mapping.get('text_columns', [])
-
-        labels = []
-        for _, row in df.iterrows():
-            if barcode_col >= len(row):
-                continue
-            barcode_value = str(row.iloc[barcode_col]).strip()[:100]
-            if not barcode_value or barcode_value == 'nan':
-                continue
-            text_lines = []
-            for tc in text_cols:
-                col_idx = tc['column']
-                if col_idx < len(row):
-                    val = str(row.iloc[col_idx]).strip()[:100]
-                    if val and val != 'nan':
-                        text_lines.append((tc['label'], val))
-            labels.append((barcode_value, text_lines))
-
-        if not labels:
-            raise ValueError('No valid data found in file')
-
-        label_count = len(labels)
-        if label_count > current_app.config['MAX_LABELS']:
-            raise ValueError(f'Too many labels. Maximum: {current_app.config["MAX_LABELS"]}')
-
-        logger.info("Processing %d labels...", label_count)
-        start_time = time.time()
-
-        effective_template_id = template_id or current_app.config['DEFAULT_TEMPLATE']
-        template = current_app.config['LABEL_TEMPLATES'].get(effective_template_id)
-        sheet_gen = PDFSheetGenerator(current_app.config['SHEET_FOLDER'], template)
-        sheets = sheet_gen.generate_pdf_sheets(labels, barcode_type=barcode_type)
-
-        logger.info("PDF generation: %.2fs", time.time() - start_time)
-
-        zip_start = time.time()
-        zip_buffer = create_zip_from_sheets(current_app.config['SHEET_FOLDER'], sheets)
-
-        user_sheet_data = {
-            'user_id': user_id,
-            'original_filename': secure_filename,
-            'label_count': label_count,
-            'sheet_count': len(sheets),
-            'total_size_bytes': 0,
-        }
-        sheet_response = get_supabase_admin().table('user_sheets').insert(user_sheet_data).execute()
-
-        if not sheet_response.data:
-            raise Exception("Failed to create user_sheets record")
-
-        user_sheet_id = sheet_response.data[0]['id']
-
-        upload_result = upload_zip_to_storage(user_id, user_sheet_id, zip_buffer, secure_filename)
-
-        if not upload_result['success']:
-            get_supabase_admin().table('user_sheets').delete().eq('id', user_sheet_id).execute()
-            raise Exception(f'ZIP upload failed: {upload_result.get("error", "Unknown error")}')
-
-        get_supabase_admin().table('user_sheets').update({
-            'total_size_bytes': upload_result['zip_size'],
-            'template_id': effective_template_id,
-            'barcode_type': barcode_type,
-        }).eq('id', user_sheet_id).execute()
-
-        logger.info("ZIP & upload: %.2fs", time.time() - zip_start)
-
-        sheet_file_data = {
-            'user_sheet_id': user_sheet_id,
-            'filename': f'sheets_{user_sheet_id}.zip',
-            'storage_path': upload_result['storage_path'],
-            'file_size_bytes': upload_result['zip_size'],
-            'sheet_number': 0,
-        }
-        get_supabase_admin().table('sheet_files').insert(sheet_file_data).execute()
-
-        # Cache ZIP for instant download (best-effort)
-        try:
-            cache_zip(user_sheet_id, zip_buffer.getvalue())
-        except Exception as e:
-            logger.warning("Redis cache write failed (non-fatal): %s", e)
-
-        # Store label metadata for search/reprint (best-effort)
-        labels_per_sheet = sheet_gen.rows * sheet_gen.columns
-        label_records = [
-            {
-                'user_sheet_id': user_sheet_id,
-                'user_id': user_id,
-                'label_index': idx,
-                'sheet_number': (idx // labels_per_sheet) + 1,
-                'position_on_sheet': idx % labels_per_sheet,
-                'barcode_value': barcode_value,
-                'text_fields': [{'label': l, 'value': v} for l, v in text_lines],
-                'barcode_type': barcode_type,
-                'template_id': effective_template_id,
-            }
-            for idx, (barcode_value, text_lines) in enumerate(labels)
-        ]
-        _bulk_insert_label_items(label_records)
-
-        os.remove(filepath)
-        for sheet in sheets:
-            sheet_path = os.path.join(current_app.config['SHEET_FOLDER'], sheet)
-            if os.path.exists(sheet_path):
-                os.remove(sheet_path)
-
-        logger.info("Total processing time: %.2fs", time.time() - start_time)
-
-        return {
-            'success': True,
-            'user_sheet_id': user_sheet_id,
-            'storage_path': upload_result['storage_path'],
-            'zip_size': upload_result['zip_size'],
-            'template_used': effective_template_id,
-            'label_count': label_count,
-            'sheet_count': len(sheets),
-            'message': f'Successfully processed {label_count} labels and uploaded as ZIP'
-        }
-
+        job.labels = extract_labels(df, column_mapping)
+        job.label_count = len(job.labels)
+
+    if not job.label_count:
+        raise ValueError('No valid data found in file')
+
+    if job.label_count > current_app.config['MAX_LABELS']:
+        raise ValueError(f'Too many labels. Maximum: {current_app.config["MAX_LABELS"]}')
+
+    progress('parsed', rows=job.label_count)
+    logger.info("Processing %d labels...", job.label_count)
+    job.start_time = time.time()
+
+    job.sheet_count = -(-job.label_count // job.labels_per_sheet)
+    if output_format == 'zpl':
+        job.dpi = dpi or current_app.config['ZPL_DPI']
+    elif output_format in ('png', 'tiff'):
+        job.dpi = dpi or current_app.config['RASTER_DPI']
+
+    # The same file, mapping and settings as an earlier job of this user's
+    # produce the same ZIP: point a new record at the stored one instead
+    job.fingerprint = job_fingerprint(upload_scan.sha256, job.template_id, barcode_type, column_mapping, {
+        'output_format': output_format,
+        'dpi': job.dpi,
+        'zip_policy': job.zip_policy,
+        'sheet_output_mode': current_app.config['SHEET_OUTPUT_MODE'],
+        'raster_mode': current_app.config['RASTER_MODE'],
+    })
+    if current_app.config['JOB_RESULT_CACHE']:
+        job.reused = find_job_result(user_id, job.fingerprint)
+    if job.reused:
+        logger.info("Job result cache hit, reusing %s", job.reused['storage_path'])
+        progress('reused', sheets=job.reused['sheet_count'])
+    return job
+
+
+def _label_chunks(job):
+    """The job's labels again, re-read from the file when it was streamed."""
+    if job.streaming:
+        return iter_label_chunks(job.source, job.column_mapping, job.chunk_rows)
+    return [job.labels]
+
+
+def render_label_job(job):
+    """Render the job's sheets straight into its ZIP; nothing for a reused result."""
+    if job.reused:
+        return job
+    labels, streaming, barcode_type, progress = job.labels, job.streaming, job.barcode_type, job.progress
+    sheet_count = job.sheet_count
+
+    # Sheets are rendered into memory and written straight into the ZIP;
+    # nothing touches disk, so concurrent jobs cannot collide on filenames.
+    # Per-sheet output reports each sheet as the ZIP pulls it from the
+    # renderer; single-document output once it is complete.
+    if job.output_format == 'zpl':
+        zpl_gen = ZPLGenerator(job.template, dpi=job.dpi)
+        if streaming:
+            zpl = zpl_gen.generate_zpl_streaming(_label_chunks(job), job.longest_value, barcode_type=barcode_type)
+        else:
+            zpl = zpl_gen.generate_zpl(labels, barcode_type=barcode_type)
+        progress('rendered', sheet=sheet_count, sheets=sheet_count, percent=100)
+        job.zip_buffer = create_zip_from_zpl(zpl, job.zip_policy)
+    elif job.output_format in ('png', 'tiff'):
+        raster_gen = RasterSheetGenerator(job.template, dpi=job.dpi, mode=current_app.config['RASTER_MODE'])
+        if streaming:
+            sheet_images = raster_gen.generate_sheets_streaming(
+                _label_chunks(job), job.longest_value, barcode_type=barcode_type, image_format=job.output_format,
+            )
+        else:
+            sheet_images = raster_gen.generate_sheets(labels, barcode_type=barcode_type, image_format=job.output_format)
+        sheet_images = report_sheets(sheet_images, sheet_count, progress)
+        job.zip_buffer = create_zip_from_sheets(sheet_images, job.zip_policy, extension=job.output_format)
+    else:
+        sheet_gen = PDFSheetGenerator(job.template, page_compression=pdf_page_compression(job.zip_policy))
+        sheet_gen.workers = _render_workers(sheet_count)
+        if current_app.config['SHEET_OUTPUT_MODE'] == 'combined':
+            if streaming:
+                document, page_index = sheet_gen.generate_pdf_document_streaming(
+                    _label_chunks(job), job.longest_value, barcode_type=barcode_type,
+                )
+            else:
+                document, page_index = sheet_gen.generate_pdf_document(labels, barcode_type=barcode_type)
+            progress('rendered', sheet=sheet_count, sheets=sheet_count, percent=100)
+            job.zip_buffer = create_zip_from_document(document, page_index, job.zip_policy)
+        else:
+            if streaming:
+                sheet_pdfs = sheet_gen.generate_pdf_sheets_streaming(
+                    _label_chunks(job), job.longest_value, barcode_type=barcode_type,
+                )
+            else:
+                sheet_pdfs = sheet_gen.generate_pdf_sheets(labels, barcode_type=barcode_type)
+            job.zip_buffer = create_zip_from_sheets(report_sheets(sheet_pdfs, sheet_count, progress), job.zip_policy)
+
+    job.zip_index = zip_entry_index(job.zip_buffer)
+    progress('zipped', bytes=job.zip_buffer.getbuffer().nbytes)
+    logger.info("Render & ZIP: %.2fs", time.time() - job.start_time)
+    return job
+
+
+def _attach_zip(job, user_sheet_id):
+    """Upload the job's ZIP (or point at the reused one) and record it against user_sheet_id."""
+    if job.reused:
+        upload_result = {'success': True, 'storage_path': job.reused['storage_path'], 'zip_size': job.reused['zip_size']}
+        job.zip_index = job.reused['zip_index']
+    else:
+        upload_result = upload_zip_to_storage(job.user_id, user_sheet_id, job.zip_buffer, job.secure_filename,
+                                              progress=job.progress)
+
+    if not upload_result['success']:
+        get_supabase_admin().table('user_sheets').delete().eq('id', user_sheet_id).execute()
+        raise Exception(f'ZIP upload failed: {upload_result.get("error", "Unknown error")}')
+
+    get_supabase_admin().table('user_sheets').update({
+        'total_size_bytes': upload_result['zip_size'],
+        'template_id': job.template_id,
+        'barcode_type': job.barcode_type,
+        'job_fingerprint': job.fingerprint,
+        # Sheet downloads need the layout of the stored ZIP, see sheet_service
+        'output_format': job.output_format,
+    }).eq('id', user_sheet_id).execute()
+
+    sheet_file_data = {
+        'user_sheet_id': user_sheet_id,
+        'filename': f'sheets_{user_sheet_id}.zip',
+        'storage_path': upload_result['storage_path'],
+        'file_size_bytes': upload_result['zip_size'],
+        'sheet_number': 0,
+        # Entry offsets for Range reads of single sheets, see sheet_service
+        'zip_index': job.zip_index,
+    }
+    get_supabase_admin().table('sheet_files').insert(sheet_file_data).execute()
+    return upload_result
+
+
+def _reused_zip_exists(storage_path):
+    try:
+        return storage_object_exists(storage_path)
+    except Exception as e:
+        logger.warning("Reused ZIP check failed, rendering instead: %s", e)
+        return False
+
+
+def publish_label_job(job):
+    """Create the user_sheets record, upload the ZIP (or point at the reused one) and store label metadata."""
+    upload_start = time.time()
+    user_id, progress = job.user_id, job.progress
+
+    user_sheet_data = {
+        'user_id': user_id,
+        'original_filename': job.secure_filename,
+        'label_count': job.label_count,
+        'sheet_count': job.sheet_count,
+        'total_size_bytes': 0,
+    }
+    sheet_response = get_supabase_admin().table('user_sheets').insert(user_sheet_data).execute()
+
+    if not sheet_response.data:
+        raise Exception("Failed to create user_sheets record")
+
+    user_sheet_id = sheet_response.data[0]['id']
+
+    upload_result = _attach_zip(job, user_sheet_id)
+    # Deleting the reused job's sheet removes the ZIP unless our reference
+    # already counts; now that it does, the object must still be there, or
+    # it went before we got to it and this job renders its own
+    if job.reused and not _reused_zip_exists(upload_result['storage_path']):
+        logger.warning("Reused ZIP %s is gone, rendering job again", upload_result['storage_path'])
+        get_supabase_admin().table('sheet_files').delete().eq('user_sheet_id', user_sheet_id).execute()
+        job.reused = None
+        render_label_job(job)
+        upload_result = _attach_zip(job, user_sheet_id)
+
+    logger.info("Upload: %.2fs", time.time() - upload_start)
+
+    # Cache ZIP for instant download (best-effort)
+    try:
+        if job.zip_buffer is not None:
+            cache_zip(user_sheet_id, job.zip_buffer.getvalue())
     except Exception as e:
-        logger.error("Processing failed, cleaning up temp files.")
-        if os.path.exists(filepath):
-            os.remove(filepath)
-        raise
+        logger.warning("ZIP cache write failed (non-fatal): %s", e)
+
+    # Store label metadata for search/reprint (best-effort)
+    _store_label_items(
+        _label_chunks(job), user_sheet_id, user_id, job.labels_per_sheet,
+        barcode_type=job.barcode_type, template_id=job.template_id,
+        label_count=job.label_count, progress=progress,
+    )
+
+    logger.info("Total processing time: %.2fs", time.time() - job.start_time)
+
+    return {
+        'success': True,
+        'user_sheet_id': user_sheet_id,
+        'storage_path': upload_result['storage_path'],
+        'zip_size': upload_result['zip_size'],
+        'template_used': job.template_id,
+        'label_count': job.label_count,
+        'sheet_count': job.sheet_count,
+        'output_format': job.output_format,
+        'reused_result': bool(job.reused),
+        'message': f'Successfully processed {job.label_count} labels and uploaded as ZIP'
+    }
+
+
+def process_label_file(file, user_id, secure_filename, template_id=None, column_mapping=None, barcode_type='code128',
+                       output_format='pdf', dpi=None, progress=_no_progress):
+    # progress(stage, **data) hears about each stage as the job moves
+    # through it; see services.job_progress
+    job = parse_label_job(file, user_id, secure_filename, template_id=template_id, column_mapping=column_mapping,
+                          barcode_type=barcode_type, output_format=output_format, dpi=dpi, progress=progress)
+    return publish_label_job(render_label_job(job))
+
+
+_PIPELINE_DONE = object()
+
+
+def _file_error(e):
+    """What a batch reports for a failed file: ValueErrors are the user's to see."""
+    return str(e) if isinstance(e, ValueError) else 'An error occurred processing your file'
+
+
+def process_label_batch(items, user_id, progress=_no_progress):
+    """
+    Run several files as a three-stage pipeline: while file N renders,
+    file N+1 is parsed and file N-1 is uploaded and stored. Stages hand
+    jobs on through one-slot queues, so at most one file per stage is in
+    memory. items are dicts of process_label_file keyword arguments plus
+    'file' and 'filename'. Every file gets its own user_sheets record; one
+    that fails is reported without stopping the rest.
+    Returns {'files': [...], 'succeeded': n, 'failed': m}, files in order.
+    """
+    app = current_app._get_current_object()
+    results = [None] * len(items)
+    parsed = queue.Queue(maxsize=1)
+    rendered = queue.Queue(maxsize=1)
+
+    def file_progress(index, filename):
+        return lambda stage, **data: progress(stage, file=index, filename=filename, **data)
+
+    def finish(index, result):
+        results[index] = result
+        progress('file_done', file=index, filename=items[index]['filename'], success=result['success'],
+                 percent=100 * sum(r is not None for r in results) / len(items))
+
+    def fail(index, e):
+        if not isinstance(e, ValueError):
+            logger.exception("Batch file %s failed for user %s", items[index]['filename'], user_id)
+        finish(index, {'success': False, 'filename': items[index]['filename'], 'error': _file_error(e)})
+
+    def parse_stage():
+        with app.app_context():
+            for index, item in enumerate(items):
+                args = {k: v for k, v in item.items() if k not in ('file', 'filename')}
+                try:
+                    job = parse_label_job(item['file'], user_id, item['filename'],
+                                          progress=file_progress(index, item['filename']), **args)
+                except Exception as e:
+                    fail(index, e)
+                    continue
+                parsed.put((index, job))
+            parsed.put(_PIPELINE_DONE)
+
+    def publish_stage():
+        with app.app_context():
+            while (entry := rendered.get()) is not _PIPELINE_DONE:
+                index, job = entry
+                try:
+                    finish(index, {**publish_label_job(job), 'filename': job.secure_filename})
+                except Exception as e:
+                    fail(index, e)
+
+    parser = threading.Thread(target=parse_stage, name='batch-parse')
+    publisher = threading.Thread(target=publish_stage, name='batch-publish')
+    parser.start()
+    publisher.start()
+    try:
+        # Rendering is CPU-bound and stays on the calling thread
+        while (entry := parsed.get()) is not _PIPELINE_DONE:
+            index, job = entry
+            try:
+                rendered.put((index, render_label_job(job)))
+            except Exception as e:
+                fail(index, e)
+    finally:
+        rendered.put(_PIPELINE_DONE)
+        parser.join()
+        publisher.join()
+
+    succeeded = sum(1 for r in results if r['success'])
+    return {'files': results, 'succeeded': succeeded, 'failed': len(results) - succeeded}
 
 
 def generate_label_preview(file, user_id, secure_filename, template_id=None, column_mapping=None, barcode_type='code128'):
@@ -195,64 +467,51 @@ def generate_label_preview(file, user_id, secure_filename, template_id=None, col
             'has_header_row': False
         }
 
-    ext = os.path.splitext(secure_filename)[1]
-    saved_name = f"{uuid.uuid4().hex}{ext}"
-    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], saved_name)
-    file.save(filepath)
+    source = getattr(file, 'stream', file)
+    upload_scan = get_upload_scan(source)
 
-    try:
-        header_arg = 0 if column_mapping.get('has_header_row') else None
-        if secure_filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(filepath, header=header_arg)
-        else:
-            df = pd.read_csv(filepath, header=header_arg)
-
-        barcode_col = column_mapping['barcode_column']
-        text_cols = column_mapping.get('text_columns', [])
-
-        labels = []
-        for _, row in df.iterrows():
-            if barcode_col >= len(row):
-                continue
-            barcode_value = str(row.iloc[barcode_col]).strip()[:100]
-            if not barcode_value or barcode_value == 'nan':
-                continue
-            text_lines = []
-            for tc in text_cols:
-                col_idx = tc['column']
-                if col_idx < len(row):
-                    val = str(row.iloc[col_idx]).strip()[:100]
-                    if val and val != 'nan':
-                        text_lines.append((tc['label'], val))
-            labels.append((barcode_value, text_lines))
-
-        if not labels:
-            raise ValueError('No valid data found in file')
+    template = current_app.config['LABEL_LAYOUTS'].get(template_id) if template_id else None
+    sheet_gen = PDFSheetGenerator(template)
+    labels_per_sheet = sheet_gen.layout.labels_per_sheet
+    is_excel = secure_filename.endswith(('.xlsx', '.xls'))
+
+    cache_key = dataset_cache_key(upload_scan.sha256, column_mapping)
+    labels = get_cached_labels(cache_key)
 
+    longest_value = None
+    if labels is not None:
+        label_count = len(labels)
+    elif (upload_scan.size > current_app.config['PREVIEW_FULL_SCAN_BYTES']
+          and not (is_excel and is_legacy_xls(source))):
+        # Large files: a barcode-only scan gives the exact count /upload will
+        # check and the longest value to calibrate with, so only the first
+        # sheet's worth of rows is parsed in full.
+        chunk_rows = labels_per_sheet * current_app.config['STREAMING_PAGES_IN_FLIGHT']
+        label_count, longest_value = scan_label_stats(source, column_mapping, chunk_rows, is_excel=is_excel)
+        labels = read_preview_labels(source, column_mapping, labels_per_sheet, is_excel=is_excel)
+        logger.info("Preview fast path: %d labels scanned", label_count)
+    else:
+        df = read_label_columns(source, column_mapping, is_excel=is_excel)
+        labels = extract_labels(df, column_mapping)
         label_count = len(labels)
-        if label_count > current_app.config['MAX_LABELS']:
-            raise ValueError(f'Too many labels. Maximum: {current_app.config["MAX_LABELS"]}')
+        # Keep the parsed dataset for the /upload that usually follows
+        cache_labels(cache_key, labels)
 
-        template = current_app.config['LABEL_TEMPLATES'].get(template_id) if template_id else None
-        sheet_gen = PDFSheetGenerator(current_app.config['SHEET_FOLDER'], template)
-        pdf_bytes = sheet_gen.generate_preview_sheet(labels, barcode_type=barcode_type)
+    if not labels:
+        raise ValueError('No valid data found in file')
 
-        os.remove(filepath)
+    if label_count > current_app.config['MAX_LABELS']:
+        raise ValueError(f'Too many labels. Maximum: {current_app.config["MAX_LABELS"]}')
 
-        labels_per_sheet = sheet_gen.rows * sheet_gen.columns
-        total_sheets = (label_count + labels_per_sheet - 1) // labels_per_sheet
+    pdf_bytes = sheet_gen.generate_preview_sheet(labels, barcode_type=barcode_type, longest_value=longest_value)
 
-        logger.info("Preview generated for user %s: %d labels, %d sheets", user_id, label_count, total_sheets)
+    total_sheets = (label_count + labels_per_sheet - 1) // labels_per_sheet
 
-        return {
-            'preview_pdf': base64.b64encode(pdf_bytes).decode('utf-8'),
-            'label_count': label_count,
-            'total_sheets': total_sheets,
-            'labels_on_first_sheet': min(label_count, labels_per_sheet),
-        }
+    logger.info("Preview generated for user %s: %d labels, %d sheets", user_id, label_count, total_sheets)
 
-    except Exception as e:
-        logger.error("Preview generation failed, cleaning up temp files.")
-        if os.path.exists(filepath):
-            os.remove(filepath)
-        raise
+    return {
+        'preview_pdf': base64.b64encode(pdf_bytes).decode('utf-8'),
+        'label_count': label_count,
+        'total_sheets': total_sheets,
+        'labels_on_first_sheet': min(label_count, labels_per_sheet),
+    }
@@ -33,6 +33,25 @@ def get_redis():
     return _client
 
 
+_blocking_client = None
+
+
+def get_blocking_redis(wait_seconds):
+    """
+    A separate client for blocking commands that wait up to wait_seconds
+    (the job queue's pop). The shared client's 2s socket timeout would cut
+    such a wait short with a TimeoutError. None if Redis is unavailable.
+    """
+    global _blocking_client
+    if _blocking_client is None and get_redis() is not None:
+        import redis
+        _blocking_client = redis.from_url(
+            os.getenv('REDIS_URL'), socket_connect_timeout=2, socket_timeout=wait_seconds + 5,
+            decode_responses=False,
+        )
+    return _blocking_client
+
+
 def cache_zip(user_sheet_id: str, zip_bytes: bytes) -> None:
     """Write ZIP bytes to cache. Silently skips if Redis is down or ZIP is too large."""
     if len(zip_bytes) > ZIP_CACHE_MAX_BYTES:
@@ -58,6 +77,39 @@ def get_cached_zip(user_sheet_id: str):
         return None
 
 
+def stream_cached_zip(user_sheet_id: str, chunk_size: int):
+    """
+    (size, iterator of chunks) of a cached ZIP, read with GETRANGE a chunk
+    at a time so the whole ZIP is never held in memory, or None on a miss.
+    A hit refreshes the entry's TTL so it outlives the download.
+    """
+    r = get_redis()
+    if not r:
+        return None
+    key = f"zip:{user_sheet_id}"
+    try:
+        pipe = r.pipeline()
+        pipe.strlen(key)
+        pipe.expire(key, ZIP_CACHE_TTL)
+        size, _ = pipe.execute()
+    except Exception as e:
+        logger.warning("Redis stream_cached_zip failed: %s", e)
+        return None
+    if not size:
+        return None
+
+    def chunks():
+        for start in range(0, size, chunk_size):
+            chunk = r.getrange(key, start, min(start + chunk_size, size) - 1)
+            if not chunk:
+                # Evicted mid-download; cutting the response short lets the
+                # client see the Content-Length mismatch
+                raise RuntimeError(f'Cached ZIP {user_sheet_id} vanished during download')
+            yield chunk
+
+    return size, chunks()
+
+
 def invalidate_zip(user_sheet_id: str) -> None:
     """Remove a ZIP entry from cache (call on delete)."""
     r = get_redis()
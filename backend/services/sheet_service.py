@@ -1,11 +1,30 @@
 import io
+import json
 import zipfile
 import logging
+import httpx
 from models.database import get_supabase_admin
-from services.redis_client import cache_zip, get_cached_zip, invalidate_zip
+from services.zip_cache import cache_zip, cache_zip_through, get_cached_zip, invalidate_zip, stream_cached_zip
+from services.job_cache import count_storage_references
+from services.storage_service import (
+    COMBINED_PDF_NAME,
+    PAGE_INDEX_NAME,
+    download_storage_range,
+    inflate_zip_entry,
+    sheet_arcname,
+    stream_storage_object,
+)
+from utils.pdf_pages import extract_pages
 
 logger = logging.getLogger(__name__)
 
+# Indexed entries closer together than this are fetched in one Range request
+RANGE_MERGE_GAP = 64 * 1024
+# Bytes held per download while streaming a ZIP to the client
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+# Content type of a single sheet download, by the job's output format
+SHEET_MIMETYPES = {'pdf': 'application/pdf', 'png': 'image/png', 'tiff': 'image/tiff'}
+
 
 def get_user_sheets(user_id):
     supabase_admin = get_supabase_admin()
@@ -17,15 +36,17 @@ def get_user_sheets(user_id):
     return sheets_response.data
 
 
-def _fetch_zip(user_sheet_id, user_id):
+class SheetFormatError(ValueError):
+    """The job's output format has no separate sheets to download."""
+
+
+def _sheet_files(user_sheet_id, user_id):
     """
-    Auth check then return (BytesIO of ZIP, original_filename, sheet_count).
-    Checks Redis first; falls back to Supabase and re-caches on miss.
+    Auth check then return (sheet_files rows, original_filename, sheet_count,
+    output_format). Jobs stored before the format was recorded are PDF.
     """
-    supabase_admin = get_supabase_admin()
-
-    files_response = supabase_admin.table('sheet_files').select(
-        "*, user_sheets!inner(user_id, original_filename, sheet_count)"
+    files_response = get_supabase_admin().table('sheet_files').select(
+        "*, user_sheets!inner(user_id, original_filename, sheet_count, output_format)"
     ).eq('user_sheet_id', user_sheet_id).execute()
 
     if not files_response.data:
@@ -35,80 +56,207 @@ def _fetch_zip(user_sheet_id, user_id):
     if sheet_meta['user_id'] != user_id:
         raise PermissionError('Access denied')
 
-    original_filename = sheet_meta['original_filename']
-    sheet_count = sheet_meta['sheet_count']
+    output_format = sheet_meta.get('output_format') or 'pdf'
+    return files_response.data, sheet_meta['original_filename'], sheet_meta['sheet_count'], output_format
+
+
+def _require_sheets(output_format):
+    # A ZPL job is one label stream (labels.zpl) with no per-sheet entries
+    if output_format == 'zpl':
+        raise SheetFormatError('ZPL jobs have no separate sheets; download the whole job instead')
+
+
+def _zip_row(files):
+    return next((f for f in files if f.get('sheet_number') == 0), None)
+
 
-    # Redis cache hit
+def _fetch_zip(user_sheet_id, files):
+    """
+    BytesIO of the sheet's whole ZIP. Checks the ZIP cache first; falls
+    back to Supabase and re-caches on miss.
+    """
+    supabase_admin = get_supabase_admin()
+
+    # ZIP cache hit
     cached = get_cached_zip(user_sheet_id)
     if cached:
         logger.info("ZIP cache hit for %s", user_sheet_id)
-        return io.BytesIO(cached), original_filename, sheet_count
+        return io.BytesIO(cached)
 
     # Cache miss — fetch from Supabase
-    zip_file = next((f for f in files_response.data if f.get('sheet_number') == 0), None)
+    zip_file = _zip_row(files)
 
     if zip_file and zip_file['filename'].endswith('.zip'):
         zip_data = supabase_admin.storage.from_('label-sheets').download(zip_file['storage_path'])
         if not zip_data:
             raise ValueError('Failed to download ZIP file')
     else:
-        # Legacy: rebuild ZIP from individual PDF files
-        buf = io.BytesIO()
-        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for file_data in files_response.data:
-                if file_data.get('sheet_number', 1) > 0:
-                    file_response = supabase_admin.storage.from_('label-sheets').download(
-                        file_data['storage_path']
-                    )
-                    if file_response:
-                        zf.writestr(file_data['filename'], file_response)
-        buf.seek(0)
-        zip_data = buf.getvalue()
+        zip_data = _rebuild_legacy_zip(files)
 
     # Read-through: re-cache so subsequent requests are fast
     cache_zip(user_sheet_id, zip_data)
 
-    return io.BytesIO(zip_data), original_filename, sheet_count
+    return io.BytesIO(zip_data)
+
+
+def _rebuild_legacy_zip(files):
+    """Legacy: rebuild ZIP from individual PDF files"""
+    supabase_admin = get_supabase_admin()
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for file_data in files:
+            if file_data.get('sheet_number', 1) > 0:
+                file_response = supabase_admin.storage.from_('label-sheets').download(
+                    file_data['storage_path']
+                )
+                if file_response:
+                    zf.writestr(file_data['filename'], file_response)
+    return buf.getvalue()
+
+
+def _stream_zip(user_sheet_id, files):
+    """
+    (size, iterator of chunks) of the sheet's whole ZIP, never held in
+    memory whole unless a cache tier already holds it: read from the ZIP
+    cache a chunk at a time, or streamed from storage (and cached on the
+    way past) on a miss.
+    """
+    cached = stream_cached_zip(user_sheet_id, DOWNLOAD_CHUNK_SIZE)
+    if cached:
+        logger.info("ZIP cache hit for %s", user_sheet_id)
+        return cached
+
+    zip_file = _zip_row(files)
+    if zip_file and zip_file['filename'].endswith('.zip'):
+        try:
+            size, chunks = stream_storage_object(zip_file['storage_path'], DOWNLOAD_CHUNK_SIZE)
+        except httpx.HTTPStatusError as e:
+            logger.warning("Storage download of %s failed: %s", zip_file['storage_path'], e)
+            raise ValueError('Failed to download ZIP file')
+        return size, cache_zip_through(user_sheet_id, size, chunks)
+
+    zip_data = _rebuild_legacy_zip(files)
+    cache_zip(user_sheet_id, zip_data)
+    view = memoryview(zip_data)
+    return len(zip_data), (bytes(view[i:i + DOWNLOAD_CHUNK_SIZE]) for i in range(0, len(zip_data), DOWNLOAD_CHUNK_SIZE))
+
+
+def _coalesce(entries):
+    """Group (name, entry) pairs sorted by offset into spans worth one Range request each."""
+    spans = []
+    for name, entry in sorted(entries, key=lambda item: item[1][0]):
+        if spans and entry[0] - spans[-1]['end'] <= RANGE_MERGE_GAP:
+            span = spans[-1]
+        else:
+            span = {'start': entry[0], 'end': entry[0], 'entries': []}
+            spans.append(span)
+        span['end'] = max(span['end'], entry[0] + entry[1])
+        span['entries'].append((name, entry))
+    return spans
+
+
+def _read_sheets_ranged(files, sheet_numbers, extension='pdf'):
+    """
+    {sheet_number: sheet bytes} read straight out of the stored ZIP with
+    Range requests, using the entry offsets recorded at upload (zip_index),
+    so sheet 3 of a 500-sheet job costs its own kilobytes. None when that is
+    not possible: no index (older uploads), a combined-PDF ZIP, or a failed
+    request. The caller then falls back to the whole ZIP.
+    """
+    zip_file = _zip_row(files)
+    index = zip_file.get('zip_index') if zip_file else None
+    if not index:
+        return None
+    wanted = [(n, sheet_arcname(n, extension)) for n in sheet_numbers]
+    if any(name not in index for _, name in wanted):
+        return None
+
+    contents = {}
+    try:
+        for span in _coalesce({(name, tuple(index[name])) for _, name in wanted}):
+            if span['end'] == span['start']:
+                raw = b''
+            else:
+                raw = download_storage_range(zip_file['storage_path'], span['start'], span['end'] - 1)
+            if len(raw) != span['end'] - span['start']:
+                raise ValueError('Short range read')
+            for name, entry in span['entries']:
+                offset = entry[0] - span['start']
+                contents[name] = inflate_zip_entry(raw[offset:offset + entry[1]], entry)
+    except Exception as e:
+        logger.warning("Range read of %s failed, fetching whole ZIP: %s", zip_file['storage_path'], e)
+        return None
+    return {n: contents[name] for n, name in wanted}
+
+
+def _read_sheet(zf, sheet_number, extension='pdf'):
+    """
+    Bytes of one sheet from either ZIP layout: a file per sheet (PDF or
+    image, per extension), or a combined PDF split using its page index.
+    None if the sheet is missing.
+    """
+    names = zf.namelist()
+    target = sheet_arcname(sheet_number, extension)
+    if target in names:
+        return zf.read(target)
+    if extension != 'pdf' or COMBINED_PDF_NAME not in names:
+        return None
+    page_index = json.loads(zf.read(PAGE_INDEX_NAME))['pages'] if PAGE_INDEX_NAME in names else None
+    if page_index is not None and sheet_number > len(page_index):
+        return None
+    return extract_pages(zf.read(COMBINED_PDF_NAME), [sheet_number], page_index)
 
 
 def create_sheet_download(user_sheet_id, user_id):
-    zip_buffer, original_filename, _ = _fetch_zip(user_sheet_id, user_id)
-    return zip_buffer, f"{original_filename}_labels.zip"
+    """(iterator of ZIP chunks, size or None, download filename) for streaming to the client."""
+    files, original_filename, _, _ = _sheet_files(user_sheet_id, user_id)
+    size, chunks = _stream_zip(user_sheet_id, files)
+    return chunks, size, f"{original_filename}_labels.zip"
 
 
 def extract_single_sheet(user_sheet_id, user_id, sheet_number):
-    zip_buffer, original_filename, sheet_count = _fetch_zip(user_sheet_id, user_id)
+    """(buffer, download filename, mimetype) of one sheet in the job's output format."""
+    files, original_filename, sheet_count, output_format = _sheet_files(user_sheet_id, user_id)
+    _require_sheets(output_format)
 
     if sheet_number < 1 or sheet_number > sheet_count:
         raise ValueError(f'Sheet {sheet_number} does not exist (total: {sheet_count})')
 
-    with zipfile.ZipFile(zip_buffer, 'r') as zf:
-        target = f"sheet_{sheet_number:03d}.pdf"
-        if target not in zf.namelist():
-            raise ValueError(f'Sheet {sheet_number} not found in archive')
-        pdf_bytes = zf.read(target)
+    sheets = _read_sheets_ranged(files, [sheet_number], output_format)
+    if sheets is not None:
+        sheet_bytes = sheets[sheet_number]
+    else:
+        with zipfile.ZipFile(_fetch_zip(user_sheet_id, files), 'r') as zf:
+            sheet_bytes = _read_sheet(zf, sheet_number, output_format)
+    if sheet_bytes is None:
+        raise ValueError(f'Sheet {sheet_number} not found in archive')
 
     base_name = original_filename.rsplit('.', 1)[0]
-    return io.BytesIO(pdf_bytes), f"{base_name}_sheet_{sheet_number}.pdf"
+    filename = f"{base_name}_sheet_{sheet_number}.{output_format}"
+    return io.BytesIO(sheet_bytes), filename, SHEET_MIMETYPES[output_format]
 
 
 def extract_selected_sheets(user_sheet_id, user_id, sheet_numbers):
     if not sheet_numbers:
         raise ValueError('No sheet numbers provided')
 
-    zip_buffer, original_filename, sheet_count = _fetch_zip(user_sheet_id, user_id)
+    files, original_filename, sheet_count, output_format = _sheet_files(user_sheet_id, user_id)
+    _require_sheets(output_format)
 
     invalid = [n for n in sheet_numbers if n < 1 or n > sheet_count]
     if invalid:
         raise ValueError(f'Invalid sheet numbers: {invalid}')
 
+    sheets = _read_sheets_ranged(files, sorted(set(sheet_numbers)), output_format)
+    if sheets is None:
+        with zipfile.ZipFile(_fetch_zip(user_sheet_id, files), 'r') as src_zf:
+            sheets = {n: _read_sheet(src_zf, n, output_format) for n in sorted(set(sheet_numbers))}
+
     out_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'r') as src_zf:
-        with zipfile.ZipFile(out_buffer, 'w', zipfile.ZIP_DEFLATED) as out_zf:
-            for n in sorted(sheet_numbers):
-                target = f"sheet_{n:03d}.pdf"
-                if target in src_zf.namelist():
-                    out_zf.writestr(target, src_zf.read(target))
+    with zipfile.ZipFile(out_buffer, 'w', zipfile.ZIP_DEFLATED) as out_zf:
+        for n, sheet_bytes in sheets.items():
+            if sheet_bytes is not None:
+                out_zf.writestr(sheet_arcname(n, output_format), sheet_bytes)
 
     out_buffer.seek(0)
     base_name = original_filename.rsplit('.', 1)[0]
@@ -132,13 +280,18 @@ def delete_user_sheet(user_sheet_id, user_id):
         "storage_path"
     ).eq('user_sheet_id', user_sheet_id).execute()
 
+    # Drop the record first so a concurrent delete of another sheet sharing
+    # the same stored ZIP already sees this reference gone
+    supabase_admin.table('user_sheets').delete().eq('id', user_sheet_id).execute()
+
     for file_data in files_response.data:
         try:
+            # Reused job results share one object; keep it while referenced
+            if count_storage_references(file_data['storage_path'], excluding_user_sheet_id=user_sheet_id):
+                continue
             supabase_admin.storage.from_('label-sheets').remove([file_data['storage_path']])
         except Exception as e:
             logger.warning("Failed to delete file %s: %s", file_data['storage_path'], e)
 
-    supabase_admin.table('user_sheets').delete().eq('id', user_sheet_id).execute()
-
     # Evict from cache
     invalidate_zip(user_sheet_id)
@@ -1,7 +1,13 @@
 import os
 import base64
 import io
+import json
+import struct
 import zipfile
+import zlib
+from urllib.parse import quote
+import httpx
+from flask import current_app
 from tusclient import client
 from supabase import create_client, Client
 from dotenv import load_dotenv
@@ -25,20 +31,183 @@ def create_tus_client():
         }
     )
 
-def create_zip_from_sheets(sheet_folder, sheets):
+COMBINED_PDF_NAME = 'sheets.pdf'
+PAGE_INDEX_NAME = 'sheets_index.json'
+ZPL_NAME = 'labels.zpl'
+
+
+def sheet_arcname(sheet_number, extension='pdf'):
+    return f"sheet_{sheet_number:03d}.{extension}"
+
+
+# ZIP packaging policies, see Config.ZIP_POLICY
+ZIP_POLICIES = ('store', 'fast', 'max', 'adaptive')
+# Adaptive packaging deflates only if the first entry shrinks by this fraction
+ADAPTIVE_MIN_SAVING = 0.1
+ADAPTIVE_SAMPLE_BYTES = 256 * 1024
+
+
+def pdf_page_compression(policy):
+    """
+    Whether PDFs packaged under policy should compress their own pages.
+    'max' leaves pages uncompressed so the ZIP's deflate sees plain
+    content streams once, instead of deflating already-deflated data.
+    """
+    _check_policy(policy)
+    return policy != 'max'
+
+
+def _check_policy(policy):
+    if policy not in ZIP_POLICIES:
+        raise ValueError(f'Unknown ZIP policy: {policy}')
+
+
+def _entry_compression(policy, sample):
+    """(compress_type, compresslevel) for every entry, given the first entry's bytes."""
+    _check_policy(policy)
+    if policy == 'store':
+        return zipfile.ZIP_STORED, None
+    if policy == 'max':
+        return zipfile.ZIP_DEFLATED, 9
+    if policy == 'adaptive':
+        sample = sample[:ADAPTIVE_SAMPLE_BYTES]
+        saving = 1 - len(zlib.compress(sample, 1)) / max(len(sample), 1)
+        if saving < ADAPTIVE_MIN_SAVING:
+            return zipfile.ZIP_STORED, None
+    return zipfile.ZIP_DEFLATED, 1
+
+
+def create_zip_from_sheets(sheet_pdfs, policy='fast', extension='pdf'):
+    """
+    ZIP holding one entry per sheet PDF (or PNG/TIFF image, per extension).
+    sheet_pdfs may be a lazy iterator of bytes; each sheet is compressed as
+    soon as it is rendered, with the method picked once from the first sheet.
+    """
     zip_buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as zipf:
-        for i, sheet_filename in enumerate(sheets):
-            sheet_path = os.path.join(sheet_folder, sheet_filename)
-            # Add to ZIP with a clean name
-            arcname = f"sheet_{i+1:03d}.pdf"
-            zipf.write(sheet_path, arcname=arcname)
-    
+
+    with zipfile.ZipFile(zip_buffer, 'w') as zipf:
+        compression = None
+        for sheet_number, pdf_bytes in enumerate(sheet_pdfs, start=1):
+            if compression is None:
+                compression = _entry_compression(policy, pdf_bytes)
+            zipf.writestr(sheet_arcname(sheet_number, extension), pdf_bytes, *compression)
+
+    zip_buffer.seek(0)
+    return zip_buffer
+
+
+def create_zip_from_document(document, page_index, policy='fast'):
+    """ZIP holding one multi-page sheets PDF (bytes) and its page index."""
+    zip_buffer = io.BytesIO()
+
+    with zipfile.ZipFile(zip_buffer, 'w') as zipf:
+        zipf.writestr(COMBINED_PDF_NAME, document, *_entry_compression(policy, document))
+        zipf.writestr(PAGE_INDEX_NAME, json.dumps({'pages': page_index}), zipfile.ZIP_DEFLATED)
+
+    zip_buffer.seek(0)
+    return zip_buffer
+
+def create_zip_from_zpl(zpl, policy='fast'):
+    """ZIP holding the ZPL stream (bytes) for a thermal printer job."""
+    zip_buffer = io.BytesIO()
+
+    with zipfile.ZipFile(zip_buffer, 'w') as zipf:
+        zipf.writestr(ZPL_NAME, zpl, *_entry_compression(policy, zpl))
+
     zip_buffer.seek(0)
     return zip_buffer
 
-def upload_zip_to_storage(user_id, user_sheet_id, zip_buffer, original_filename):
+# Fixed part of a ZIP local file header; the name and extra field follow
+ZIP_LOCAL_HEADER_SIZE = 30
+
+
+def zip_entry_index(zip_buffer):
+    """
+    {arcname: [data_offset, compress_size, file_size, compress_type, crc]}
+    for every entry of an in-memory ZIP, read from its central directory
+    and local headers. Stored with the ZIP's sheet_files row, it lets one
+    entry be fetched later with a single Range request.
+    """
+    index = {}
+    with zip_buffer.getbuffer() as data, zipfile.ZipFile(zip_buffer) as zf:
+        for info in zf.infolist():
+            # The local extra field may differ from the central directory's
+            name_len, extra_len = struct.unpack_from('<HH', data, info.header_offset + 26)
+            data_offset = info.header_offset + ZIP_LOCAL_HEADER_SIZE + name_len + extra_len
+            index[info.filename] = [data_offset, info.compress_size, info.file_size, info.compress_type, info.CRC]
+    zip_buffer.seek(0)
+    return index
+
+
+def inflate_zip_entry(raw, entry):
+    """An entry's bytes from its raw (compressed) data and zip_entry_index entry, CRC-checked."""
+    _, _, file_size, compress_type, crc = entry
+    if compress_type == zipfile.ZIP_STORED:
+        data = bytes(raw)
+    elif compress_type == zipfile.ZIP_DEFLATED:
+        data = zlib.decompress(raw, -zlib.MAX_WBITS)
+    else:
+        raise ValueError(f'Unsupported ZIP compression method: {compress_type}')
+    if len(data) != file_size or zlib.crc32(data) != crc:
+        raise ValueError('ZIP entry is corrupt')
+    return data
+
+
+_http = httpx.Client(timeout=30)
+
+
+def _storage_request(storage_path, bucket, headers=None):
+    key = current_app.config['SUPABASE_SERVICE_KEY']
+    return _http.build_request(
+        'GET',
+        f"{current_app.config['SUPABASE_URL']}/storage/v1/object/{bucket}/{quote(storage_path)}",
+        headers={'authorization': f'Bearer {key}', 'apikey': key, **(headers or {})},
+    )
+
+
+def download_storage_range(storage_path, start, end, bucket='label-sheets'):
+    """Bytes start..end (inclusive) of a stored object, fetched with an HTTP Range request."""
+    response = _http.send(_storage_request(storage_path, bucket, {'range': f'bytes={start}-{end}'}))
+    response.raise_for_status()
+    if response.status_code != 206:
+        # Range ignored: the whole object came back
+        return response.content[start:end + 1]
+    return response.content
+
+
+def storage_object_exists(storage_path, bucket='label-sheets'):
+    """Whether a stored object can still be read, checked with a one-byte Range request."""
+    return _http.send(_storage_request(storage_path, bucket, {'range': 'bytes=0-0'})).is_success
+
+
+def stream_storage_object(storage_path, chunk_size, bucket='label-sheets'):
+    """
+    (size or None, iterator of chunks) of a stored object, streamed over
+    HTTP with at most one chunk in memory. Status errors are raised here,
+    before anything is yielded; the connection closes when the iterator
+    is exhausted or closed.
+    """
+    response = _http.send(_storage_request(storage_path, bucket), stream=True)
+    try:
+        response.raise_for_status()
+    except httpx.HTTPStatusError:
+        response.close()
+        raise
+    size = response.headers.get('content-length')
+
+    def chunks():
+        try:
+            yield from response.iter_bytes(chunk_size)
+        finally:
+            response.close()
+
+    return (int(size) if size is not None else None), chunks()
+
+
+TUS_CHUNK_SIZE = 6 * 1024 * 1024
+
+
+def upload_zip_to_storage(user_id, user_sheet_id, zip_buffer, original_filename, progress=None):
     try:
         tus_client = create_tus_client()
         
@@ -56,14 +225,23 @@ def upload_zip_to_storage(user_id, user_sheet_id, zip_buffer, original_filename)
         # Upload via TUS
         uploader = tus_client.uploader(
             file_stream=zip_buffer, 
-            chunk_size=6*1024*1024,
+            chunk_size=TUS_CHUNK_SIZE,
             metadata={
                 'bucketName': 'label-sheets',
                 'objectName': storage_path,
                 'contentType': 'application/zip'
             }
         )
-        uploader.upload()
+        if progress is None:
+            uploader.upload()
+        else:
+            # Chunk by chunk, reporting the server's offset after each
+            while True:
+                uploader.upload(stop_at=min((uploader.offset or 0) + TUS_CHUNK_SIZE, zip_size))
+                progress('uploaded', bytes=uploader.offset, total_bytes=zip_size,
+                         percent=100 * uploader.offset / zip_size if zip_size else 100)
+                if uploader.offset >= zip_size:
+                    break
         
         print(f"ZIP uploaded successfully: {zip_filename}")
         
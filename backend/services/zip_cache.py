@@ -0,0 +1,514 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import logging
+from array import array
+from collections import OrderedDict
+from services.redis_client import (
+    ZIP_CACHE_MAX_BYTES,
+    cache_zip as redis_cache_zip,
+    get_cached_zip as redis_get_cached_zip,
+    invalidate_zip as redis_invalidate_zip,
+    stream_cached_zip as redis_stream_cached_zip,
+)
+
+logger = logging.getLogger(__name__)
+
+# Count-min sketch shape; counters halve every SKETCH_SAMPLE_FACTOR * width records
+SKETCH_WIDTH = 4096
+SKETCH_DEPTH = 4
+SKETCH_SAMPLE_FACTOR = 10
+_COUNTER_MAX = 15
+
+# Keys (user sheet ids) the disk tier uses as file names as they are
+_SAFE_KEY = re.compile(r'[A-Za-z0-9_-]{1,128}')
+
+
+class FrequencySketch:
+    """
+    Approximate recent access counts per key: a count-min sketch whose
+    counters all halve every sample_size records (TinyLFU's aging), so a
+    ZIP downloaded all day outweighs one fetched once, in a few KB.
+    """
+
+    def __init__(self, width=SKETCH_WIDTH, depth=SKETCH_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.sample_size = SKETCH_SAMPLE_FACTOR * width
+        self._counts = array('B', bytes(width * depth))
+        self._records = 0
+        self._lock = threading.Lock()
+
+    def _slots(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        return [row * self.width + int.from_bytes(digest[4 * row:4 * row + 4], 'little') % self.width
+                for row in range(self.depth)]
+
+    def record(self, key):
+        with self._lock:
+            for slot in self._slots(key):
+                if self._counts[slot] < _COUNTER_MAX:
+                    self._counts[slot] += 1
+            self._records += 1
+            if self._records >= self.sample_size:
+                self._counts = array('B', (count >> 1 for count in self._counts))
+                self._records //= 2
+
+    def estimate(self, key):
+        with self._lock:
+            return min(self._counts[slot] for slot in self._slots(key))
+
+
+class _LRUTier:
+    """
+    Byte-bounded LRU index with frequency-aware admission: an entry that
+    would push others out only gets in if none of them has been wanted
+    more often than it, so a one-off huge ZIP cannot flush the hot ones.
+    Subclasses hold the bytes; methods named _x expect the lock held.
+    """
+    name = None
+
+    def __init__(self, max_bytes, sketch):
+        self.max_bytes = max_bytes
+        self.sketch = sketch
+        self.size = 0
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.rejections = 0
+
+    def _victims(self, key, size):
+        """Keys to evict so size more bytes fit, or None if key should not be admitted."""
+        if size > self.max_bytes:
+            return None
+        victims, freed = [], 0
+        needed = self.size - self._entries.get(key, 0) + size - self.max_bytes
+        for victim, victim_size in self._entries.items():
+            if freed >= needed:
+                break
+            if victim != key:
+                victims.append(victim)
+                freed += victim_size
+        frequency = self.sketch.estimate(key)
+        if any(self.sketch.estimate(victim) > frequency for victim in victims):
+            return None
+        return victims
+
+    def _admit(self, key, size):
+        """Make room for key and return True, or count a rejection and return False."""
+        victims = self._victims(key, size)
+        if victims is None:
+            self.rejections += 1
+            return False
+        for victim in victims:
+            self._drop(victim)
+            self.evictions += 1
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = size
+        self.size += size
+        return True
+
+    def _lookup(self, key):
+        """Count a hit (refreshing key's recency) or a miss."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def _drop(self, key):
+        self.size -= self._entries.pop(key)
+        self._discard(key)
+
+    def admits(self, key, size):
+        with self._lock:
+            return self._victims(key, size) is not None
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'rejections': self.rejections,
+                'entries': len(self._entries), 'bytes': self.size, 'max_bytes': self.max_bytes,
+            }
+
+
+class MemoryTier(_LRUTier):
+    """ZIP bytes held in this process."""
+    name = 'memory'
+
+    def __init__(self, max_bytes, sketch):
+        super().__init__(max_bytes, sketch)
+        self._data = {}
+
+    def get(self, key):
+        with self._lock:
+            return self._data[key] if self._lookup(key) else None
+
+    def put(self, key, data):
+        with self._lock:
+            if not self._admit(key, len(data)):
+                return False
+            self._data[key] = bytes(data)
+            return True
+
+    def _discard(self, key):
+        self._data.pop(key, None)
+
+
+class DiskTier(_LRUTier):
+    """
+    ZIPs as <key>.zip files under directory, which every process on the
+    host may share. The index is the directory itself, least recently
+    modified first: it is re-scanned before each admission so the byte
+    budget covers what all processes have written, and a hit touches the
+    file so the others see it as recently used.
+    """
+    name = 'disk'
+
+    def __init__(self, directory, max_bytes, sketch):
+        super().__init__(max_bytes, sketch)
+        self.directory = directory
+        self._loaded = False
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.zip')
+
+    def _scan(self):
+        """Rebuild the index from the directory; False if it cannot be read."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            found = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.zip') and _SAFE_KEY.fullmatch(entry.name[:-4]):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        except OSError as e:
+            logger.warning("ZIP disk cache unavailable (non-fatal): %s", e)
+            return False
+        found.sort()
+        self._entries = OrderedDict((key, size) for _, key, size in found)
+        self.size = sum(self._entries.values())
+        return True
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if self._scan():
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def admits(self, key, size):
+        if not _SAFE_KEY.fullmatch(key):
+            return False
+        with self._lock:
+            self._load()
+            return self._victims(key, size) is not None
+
+    def size_of(self, key):
+        """Size of a cached ZIP without counting a lookup, or None."""
+        with self._lock:
+            self._load()
+            return self._entries.get(key)
+
+    def open(self, key):
+        """(size, open file) of a cached ZIP, or None. Evicting it later does not disturb the reader."""
+        with self._lock:
+            self._load()
+            if not self._lookup(key):
+                return None
+            try:
+                f = open(self._path(key), 'rb')
+            except OSError:
+                # Removed underneath us (another process's eviction)
+                self.size -= self._entries.pop(key)
+                self.hits -= 1
+                self.misses += 1
+                return None
+        try:
+            os.utime(f.fileno())
+        except OSError:
+            pass
+        return os.fstat(f.fileno()).st_size, f
+
+    def get(self, key):
+        opened = self.open(key)
+        if opened is None:
+            return None
+        with opened[1] as f:
+            return f.read()
+
+    def put(self, key, data):
+        return _exhaust(self.write_through(key, len(data), [data]))
+
+    def write_through(self, key, size, chunks):
+        """
+        Pass chunks through, spooling them to a temporary file that joins
+        the tier once all size bytes have gone past, so a ZIP is cached on
+        disk without being held in memory. Returns (as StopIteration's
+        value) whether it was admitted.
+        """
+        if not self.admits(key, size):
+            with self._lock:
+                self.rejections += 1
+            yield from chunks
+            return False
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+            f = os.fdopen(fd, 'wb')
+        except OSError as e:
+            logger.warning("ZIP disk cache write failed (non-fatal): %s", e)
+            if tmp_path:
+                os.unlink(tmp_path)
+            yield from chunks
+            return False
+        written = 0
+        try:
+            with f:
+                for chunk in chunks:
+                    yield chunk
+                    f.write(chunk)
+                    written += len(chunk)
+            if written != size:
+                return False
+            with self._lock:
+                # Other processes may have filled the directory since we looked
+                self._loaded = True
+                if not self._scan() or not self._admit(key, size):
+                    return False
+                os.replace(tmp_path, self._path(key))
+                return True
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _discard(self, key):
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+
+def _exhaust(generator):
+    """Run a generator to the end and return its return value."""
+    try:
+        while True:
+            next(generator)
+    except StopIteration as stop:
+        return stop.value
+
+
+class RedisTier:
+    """The shared Redis ZIP cache behind the local tiers; it keeps its own TTL and size cap."""
+    name = 'redis'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.rejections = 0
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        data = redis_get_cached_zip(key)
+        self._count(data is not None)
+        return data
+
+    def stream(self, key, chunk_size):
+        cached = redis_stream_cached_zip(key, chunk_size)
+        self._count(cached is not None)
+        return cached
+
+    def put(self, key, data):
+        if len(data) > ZIP_CACHE_MAX_BYTES:
+            with self._lock:
+                self.rejections += 1
+            return False
+        redis_cache_zip(key, data)
+        return True
+
+    def invalidate(self, key):
+        redis_invalidate_zip(key)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': 0, 'rejections': self.rejections}
+
+
+class ZipCache:
+    """
+    Job ZIPs cached by user sheet id in tiers: an in-process LRU, a local
+    disk LRU, then Redis, with storage behind them all. A lookup checks
+    the tiers in order and copies a hit into the tiers above it that will
+    admit it; writes go to every tier, or only to Redis when local_writes
+    is off (a job worker, which never serves the downloads). All of it is
+    best-effort.
+    """
+
+    def __init__(self, memory, disk, redis, sketch, local_writes=True):
+        self.memory = memory
+        self.disk = disk
+        self.redis = redis
+        self.sketch = sketch
+        self.local_writes = local_writes
+
+    def get(self, key):
+        """Whole ZIP bytes, or None."""
+        self.sketch.record(key)
+        data = self.memory.get(key)
+        if data is not None:
+            return data
+        data = self.disk.get(key)
+        if data is not None:
+            self.memory.put(key, data)
+            return data
+        data = self.redis.get(key)
+        if data is not None:
+            self.memory.put(key, data)
+            self.disk.put(key, data)
+        return data
+
+    def stream(self, key, chunk_size):
+        """(size, iterator of chunks of at most chunk_size), or None on a miss in every tier."""
+        self.sketch.record(key)
+        data = self.memory.get(key)
+        if data is not None:
+            return len(data), _slices(data, chunk_size)
+        size = self.disk.size_of(key)
+        if size is not None and self.memory.admits(key, size):
+            # Hot enough for memory: promote it whole (bounded by the tier)
+            data = self.disk.get(key)
+            if data is not None:
+                self.memory.put(key, data)
+                return len(data), _slices(data, chunk_size)
+        opened = self.disk.open(key)
+        if opened is not None:
+            size, f = opened
+            return size, _file_chunks(f, chunk_size)
+        cached = self.redis.stream(key, chunk_size)
+        if cached is not None:
+            size, chunks = cached
+            return size, self.cache_through(key, size, chunks, tiers=(self.memory, self.disk))
+        return None
+
+    def cache_through(self, key, size, chunks, tiers=None):
+        """
+        Pass a ZIP's chunks through on their way to a client, caching it
+        once it has all gone past: spooled to the disk tier, and collected
+        for the memory and Redis tiers only when small enough for Redis,
+        so the memory this costs stays bounded by ZIP_CACHE_MAX_BYTES.
+        """
+        tiers = tiers or (self.memory, self.disk, self.redis)
+        collect = size is not None and size <= ZIP_CACHE_MAX_BYTES
+        if self.disk in tiers and size is not None:
+            chunks = self.disk.write_through(key, size, chunks)
+        parts = []
+        for chunk in chunks:
+            if collect:
+                parts.append(chunk)
+            yield chunk
+        if collect:
+            data = b''.join(parts)
+            if len(data) == size:
+                for tier in tiers:
+                    if tier is not self.disk:
+                        tier.put(key, data)
+
+    def put(self, key, data):
+        self.sketch.record(key)
+        tiers = (self.memory, self.disk, self.redis) if self.local_writes else (self.redis,)
+        for tier in tiers:
+            try:
+                tier.put(key, data)
+            except Exception as e:
+                logger.warning("ZIP %s cache write failed (non-fatal): %s", tier.name, e)
+
+    def invalidate(self, key):
+        for tier in (self.memory, self.disk, self.redis):
+            try:
+                tier.invalidate(key)
+            except Exception as e:
+                logger.warning("ZIP %s cache invalidate failed (non-fatal): %s", tier.name, e)
+
+    def stats(self):
+        return {tier.name: tier.stats() for tier in (self.memory, self.disk, self.redis)}
+
+
+def _slices(data, chunk_size):
+    view = memoryview(data)
+    for start in range(0, len(data), chunk_size):
+        yield bytes(view[start:start + chunk_size])
+
+
+def _file_chunks(f, chunk_size):
+    with f:
+        yield from iter(lambda: f.read(chunk_size), b'')
+
+
+def create_zip_cache(disk_dir, memory_max_bytes, disk_max_bytes, local_writes=True):
+    sketch = FrequencySketch()
+    return ZipCache(
+        MemoryTier(memory_max_bytes, sketch),
+        DiskTier(disk_dir, disk_max_bytes, sketch),
+        RedisTier(),
+        sketch,
+        local_writes=local_writes,
+    )
+
+
+_cache = None
+
+
+def init_zip_cache(app, local_writes=True):
+    """Build the process's ZIP cache from the app config (ZIP_*_CACHE_*)."""
+    global _cache
+    _cache = create_zip_cache(
+        app.config['ZIP_DISK_CACHE_DIR'],
+        app.config['ZIP_MEMORY_CACHE_MAX_BYTES'],
+        app.config['ZIP_DISK_CACHE_MAX_BYTES'],
+        local_writes=local_writes,
+    )
+
+
+def cache_zip(user_sheet_id, zip_bytes):
+    """Cache a job's ZIP in every tier that admits it."""
+    _cache.put(user_sheet_id, zip_bytes)
+
+
+def get_cached_zip(user_sheet_id):
+    """Cached ZIP bytes from the nearest tier holding them, or None."""
+    return _cache.get(user_sheet_id)
+
+
+def stream_cached_zip(user_sheet_id, chunk_size):
+    """(size, iterator of chunks) of a cached ZIP, or None."""
+    return _cache.stream(user_sheet_id, chunk_size)
+
+
+def cache_zip_through(user_sheet_id, size, chunks):
+    """Chunks passed through unchanged, caching the ZIP once they have all gone by."""
+    return _cache.cache_through(user_sheet_id, size, chunks)
+
+
+def invalidate_zip(user_sheet_id):
+    """Remove a ZIP from every tier (call on delete)."""
+    _cache.invalidate(user_sheet_id)
+
+
+def zip_cache_stats():
+    """Per-tier hit, miss, eviction and rejection counters."""
+    return _cache.stats()
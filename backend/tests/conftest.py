@@ -1,6 +1,8 @@
 import io
 import os
+import threading
 import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from collections import defaultdict
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock
@@ -11,7 +13,6 @@ def app():
     from app import create_app
     flask_app = create_app('testing')
     os.makedirs(flask_app.config['UPLOAD_FOLDER'], exist_ok=True)
-    os.makedirs(flask_app.config['SHEET_FOLDER'], exist_ok=True)
     os.makedirs(flask_app.config['SESSION_FILE_DIR'], exist_ok=True)
     yield flask_app
 
@@ -61,6 +62,56 @@ def mock_storage(mocker):
     )
 
 
+class StorageServer:
+    """Local stand-in for the storage object endpoint that honours Range, recording bytes served."""
+
+    def __init__(self, objects=None):
+        storage = self
+        self.objects = objects or {}
+        self.ranges = []
+        self.bytes_served = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('/storage/v1/object/label-sheets/', 1)[1]
+                data = storage.objects.get(path)
+                if data is None:
+                    self.send_error(404)
+                    return
+                start, end = 0, len(data) - 1
+                range_header = self.headers.get('Range')
+                if range_header:
+                    first, last = range_header.split('=', 1)[1].split('-')
+                    start, end = int(first), min(int(last), len(data) - 1)
+                    storage.ranges.append((start, end))
+                body = data[start:end + 1]
+                storage.bytes_served += len(body)
+                self.send_response(206 if range_header else 200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def storage_server(app):
+    """StorageServer that app's storage requests go to; put objects in .objects."""
+    server = StorageServer()
+    app.config['SUPABASE_URL'] = server.url
+    yield server
+    server.close()
+
+
 @pytest.fixture
 def sample_csv():
     content = b"Location,Barcode,Name,Unit\nAisle-01,SKU001,Widget A,EA\nAisle-02,SKU002,Widget B,EA\nAisle-03,SKU003,Widget C,PK\n"
@@ -73,3 +124,25 @@ def reset_rate_limits():
     sec.rate_limit_storage = defaultdict(list)
     yield
     sec.rate_limit_storage = defaultdict(list)
+
+
+@pytest.fixture(autouse=True)
+def reset_dataset_cache():
+    import services.dataset_cache as dc
+    dc._local.clear()
+    yield
+    dc._local.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_zip_cache(tmp_path, monkeypatch):
+    import services.zip_cache as zc
+    original = zc._cache
+    from config.settings import TestingConfig
+    # Apps created later in the test rebuild the cache in the same place
+    monkeypatch.setattr(TestingConfig, 'ZIP_DISK_CACHE_DIR', str(tmp_path / 'zip-cache'))
+    zc._cache = zc.create_zip_cache(
+        TestingConfig.ZIP_DISK_CACHE_DIR, TestingConfig.ZIP_MEMORY_CACHE_MAX_BYTES, TestingConfig.ZIP_DISK_CACHE_MAX_BYTES,
+    )
+    yield
+    zc._cache = original
@@ -0,0 +1,202 @@
+import io
+import json
+import pytest
+
+VALID_COLUMN_MAPPING = json.dumps({
+    'barcode_column': 2,
+    'text_columns': [{'column': 1, 'label': 'Location'}],
+    'has_header_row': True,
+})
+
+
+def upload(client, content=b"Location,Barcode\nAisle-01,SKU001\n"):
+    return client.post(
+        '/upload',
+        data={'file': (io.BytesIO(content), 'test.csv'), 'column_mapping': VALID_COLUMN_MAPPING},
+        content_type='multipart/form-data',
+    )
+
+
+@pytest.mark.integration
+def test_job_status_reports_validation_failure(auth_session, mock_supabase, mock_storage):
+    response = upload(auth_session, b"Location,Barcode\n")
+    assert response.status_code == 202
+    job = auth_session.get(response.get_json()['status_url']).get_json()
+    assert job['status'] == 'failed'
+    assert job['error'] == 'No valid data found in file'
+    assert job['result'] is None
+    mock_storage.assert_not_called()
+
+
+@pytest.mark.integration
+def test_job_status_hides_unexpected_errors(auth_session, mock_supabase, mock_storage):
+    mock_storage.side_effect = RuntimeError('tus exploded')
+    job = auth_session.get(upload(auth_session).get_json()['status_url']).get_json()
+    assert job['status'] == 'failed'
+    assert job['error'] == 'An error occurred processing your file'
+
+
+@pytest.mark.integration
+def test_job_status_is_private_to_its_owner(auth_session, mock_supabase, mock_storage):
+    status_url = upload(auth_session).get_json()['status_url']
+    with auth_session.session_transaction() as sess:
+        sess['user_id'] = 'someone-else'
+    assert auth_session.get(status_url).status_code == 404
+
+
+@pytest.mark.integration
+def test_unknown_job_returns_404(auth_session):
+    assert auth_session.get('/jobs/does-not-exist').status_code == 404
+
+
+@pytest.mark.integration
+def test_job_status_requires_auth(client):
+    assert client.get('/jobs/anything').status_code == 401
+
+
+def parse_sse(body):
+    events = []
+    for block in body.decode().strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+@pytest.mark.integration
+def test_job_events_stream_every_stage(auth_session, mock_supabase, mock_storage):
+    rows = b''.join(b'Aisle-%02d,SKU%03d\n' % (i % 7, i) for i in range(45))
+    events_url = upload(auth_session, b"Location,Barcode\n" + rows).get_json()['events_url']
+    response = auth_session.get(events_url)
+    assert response.mimetype == 'text/event-stream'
+
+    events = parse_sse(response.data)
+    assert [seq for seq, _, _ in events] == list(range(1, len(events) + 1))
+    stages = [stage for _, stage, _ in events]
+    assert stages == ['queued', 'running', 'parsed', 'rendered', 'rendered', 'rendered',
+                      'zipped', 'metadata', 'succeeded']
+    assert events[2][2]['rows'] == 45
+    assert [data['sheet'] for _, stage, data in events if stage == 'rendered'] == [1, 2, 3]
+    assert events[-1][2]['result']['label_count'] == 45
+
+
+@pytest.mark.integration
+def test_job_events_resume_after_last_event_id(auth_session, mock_supabase, mock_storage):
+    events_url = upload(auth_session).get_json()['events_url']
+    response = auth_session.get(events_url, headers={'Last-Event-ID': '5'})
+    assert [seq for seq, _, _ in parse_sse(response.data)] == [6, 7]
+
+
+@pytest.mark.integration
+def test_job_events_end_with_the_outcome_once_the_broker_forgot_them(app, auth_session, mock_supabase, mock_storage):
+    from services.job_queue import get_job_backend
+
+    response = upload(auth_session)
+    with app.app_context():
+        get_job_backend().broker._events.clear()
+    events = parse_sse(auth_session.get(response.get_json()['events_url'], headers={'Last-Event-ID': '3'}).data)
+    assert [(seq, stage) for seq, stage, _ in events] == [(4, 'succeeded')]
+    assert events[0][2]['result']['label_count'] == 1
+
+
+@pytest.mark.integration
+def test_job_events_are_private_to_their_owner(auth_session, mock_supabase, mock_storage):
+    events_url = upload(auth_session).get_json()['events_url']
+    with auth_session.session_transaction() as sess:
+        sess['user_id'] = 'someone-else'
+    assert auth_session.get(events_url).status_code == 404
+
+
+def upload_batch(client, data):
+    return client.post('/upload/batch', data=data, content_type='multipart/form-data')
+
+
+def csv_file(name, rows=b"Aisle-01,SKU001\n"):
+    return (io.BytesIO(b"Location,Barcode\n" + rows), name)
+
+
+@pytest.mark.integration
+def test_batch_job_reports_every_file(auth_session, mock_supabase, mock_storage):
+    response = upload_batch(auth_session, {
+        'files': [csv_file('a.csv'), csv_file('b.csv', b''), csv_file('c.csv', b"A,1\nB,2\n")],
+        'column_mapping': VALID_COLUMN_MAPPING,
+    })
+    assert response.status_code == 202
+    job = auth_session.get(response.get_json()['status_url']).get_json()
+    assert job['kind'] == 'batch'
+    assert job['filename'] == '3 files'
+    assert job['status'] == 'succeeded'
+    result = job['result']
+    assert (result['succeeded'], result['failed']) == (2, 1)
+    assert [(f['filename'], f['success']) for f in result['files']] == [
+        ('a.csv', True), ('b.csv', False), ('c.csv', True)]
+    assert result['files'][1]['error'] == 'No valid data found in file'
+    assert result['files'][2]['label_count'] == 2
+    assert mock_storage.call_count == 2
+
+    events = parse_sse(auth_session.get(response.get_json()['events_url']).data)
+    done = [data for _, stage, data in events if stage == 'file_done']
+    assert sorted(d['file'] for d in done) == [0, 1, 2]
+    assert all('filename' in data for _, stage, data in events if stage in ('parsed', 'zipped'))
+    assert events[-1][1] == 'succeeded'
+
+
+@pytest.mark.integration
+def test_batch_job_fails_when_no_file_succeeds(auth_session, mock_supabase, mock_storage):
+    response = upload_batch(auth_session, {
+        'files': [csv_file('a.csv', b''), csv_file('b.csv', b'')],
+        'column_mapping': VALID_COLUMN_MAPPING,
+    })
+    job = auth_session.get(response.get_json()['status_url']).get_json()
+    assert job['status'] == 'failed'
+    assert job['error'] == 'None of the files could be processed'
+    assert job['result']['failed'] == 2
+
+
+@pytest.mark.integration
+def test_batch_from_archive_with_per_file_mappings(auth_session, mock_supabase, mock_storage):
+    import zipfile
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('a.csv', b"Location,Barcode\nAisle-01,SKU001\n")
+        zf.writestr('nested/b.csv', b"SKU002,Aisle-02\nSKU003,Aisle-03\n")
+        zf.writestr('__MACOSX/._b.csv', b'junk')
+    archive.seek(0)
+    b_mapping = {'barcode_column': 1, 'text_columns': [{'column': 2, 'label': 'Where'}], 'has_header_row': False}
+    response = upload_batch(auth_session, {
+        'archive': (archive, 'labels.zip'),
+        'column_mapping': VALID_COLUMN_MAPPING,
+        'column_mappings': json.dumps({'b.csv': b_mapping}),
+    })
+    assert response.status_code == 202
+    job = auth_session.get(response.get_json()['status_url']).get_json()
+    assert job['filename'] == 'labels.zip'
+    assert [(f['filename'], f['label_count']) for f in job['result']['files']] == [('a.csv', 1), ('b.csv', 2)]
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize('data, message', [
+    ({}, 'No files provided'),
+    ({'files': [csv_file('a.csv')], 'archive': (io.BytesIO(b'PK'), 'x.zip')}, 'not both'),
+    ({'archive': (io.BytesIO(b'x'), 'x.tar')}, 'must be a .zip'),
+    ({'archive': (io.BytesIO(b'not a zip'), 'x.zip')}, 'not a valid ZIP'),
+    ({'files': [csv_file('a.csv'), csv_file('a.csv')]}, 'Duplicate filename'),
+    ({'files': [csv_file('a.csv')], 'column_mappings': '{"z.csv": {"barcode_column": 1}}'}, 'unknown files: z.csv'),
+    ({'files': [csv_file('a.csv')], 'column_mappings': '{"a.csv": {"barcode_column": 0}}'}, 'barcode_column'),
+    ({'files': [csv_file('a.csv')], 'column_mappings': '{"a.csv": {}}'}, 'barcode_column'),
+    ({'files': [csv_file('a.csv')], 'column_mappings': 'nope'}, 'Invalid column_mappings'),
+    ({'files': [csv_file('a.csv'), (io.BytesIO(b'x'), 'evil.exe')]}, 'evil.exe'),
+    ({'files': [csv_file('a.csv')], 'output_format': 'gif'}, 'Invalid output_format'),
+])
+def test_batch_rejects_bad_requests(auth_session, mock_storage, data, message):
+    response = upload_batch(auth_session, data)
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
+    mock_storage.assert_not_called()
+
+
+@pytest.mark.integration
+def test_batch_enforces_file_limit(app, auth_session):
+    app.config['BATCH_MAX_FILES'] = 2
+    response = upload_batch(auth_session, {'files': [csv_file(f'{i}.csv') for i in range(3)]})
+    assert response.status_code == 400
+    assert 'Maximum: 2' in response.get_json()['error']
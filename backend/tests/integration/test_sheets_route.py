@@ -0,0 +1,150 @@
+import io
+import zipfile
+import pytest
+
+STORED_PATH = 'test-user-id/s1/sheets_s1.zip'
+
+
+def make_zip(sheet_count=3, sheet_size=1000):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_STORED) as zf:
+        for n in range(1, sheet_count + 1):
+            zf.writestr(f'sheet_{n:03d}.pdf', bytes([n % 256]) * sheet_size)
+    return buf.getvalue()
+
+
+def sheet_row(mock_supabase, user_id='test-user-id', output_format='pdf'):
+    mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [{
+        'storage_path': STORED_PATH, 'filename': 'sheets_s1.zip', 'sheet_number': 0,
+        'user_sheets': {'user_id': user_id, 'original_filename': 'stock.csv', 'sheet_count': 3,
+                        'output_format': output_format},
+    }]
+
+
+class FakeRedis:
+    """The string commands the ZIP cache uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.getrange_calls = 0
+
+    def strlen(self, key):
+        return len(self.data.get(key, b''))
+
+    def expire(self, key, ttl):
+        return key in self.data
+
+    def getrange(self, key, start, end):
+        self.getrange_calls += 1
+        return self.data.get(key, b'')[start:end + 1]
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def pipeline(self):
+        redis, calls = self, []
+
+        class Pipeline:
+            def __getattr__(self, name):
+                return lambda *args: calls.append((name, args))
+
+            def execute(self):
+                return [getattr(redis, name)(*args) for name, args in calls]
+
+        return Pipeline()
+
+
+@pytest.fixture
+def fake_redis(mocker):
+    redis = FakeRedis()
+    mocker.patch('services.redis_client.get_redis', return_value=redis)
+    return redis
+
+
+@pytest.mark.integration
+def test_download_streams_from_storage_and_caches(auth_session, mock_supabase, storage_server, fake_redis, mocker):
+    mocker.patch('services.sheet_service.DOWNLOAD_CHUNK_SIZE', 1024)
+    zip_data = make_zip()
+    storage_server.objects[STORED_PATH] = zip_data
+    sheet_row(mock_supabase)
+
+    response = auth_session.get('/download-sheet/s1', buffered=False)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.content_length == len(zip_data)
+    assert response.headers['Content-Disposition'] == 'attachment; filename=stock.csv_labels.zip'
+    chunks = list(response.response)
+    assert len(chunks) > 1 and max(len(c) for c in chunks) <= 1024
+    assert b''.join(chunks) == zip_data
+    response.close()
+    assert fake_redis.data['zip:s1'] == zip_data
+    mock_supabase.storage.from_.return_value.download.assert_not_called()
+
+
+@pytest.mark.integration
+def test_download_streams_cache_hit_in_ranges(auth_session, mock_supabase, storage_server, fake_redis, mocker):
+    mocker.patch('services.sheet_service.DOWNLOAD_CHUNK_SIZE', 1024)
+    zip_data = make_zip()
+    fake_redis.data['zip:s1'] = zip_data
+    sheet_row(mock_supabase)
+
+    response = auth_session.get('/download-sheet/s1')
+    assert response.data == zip_data
+    assert response.content_length == len(zip_data)
+    assert fake_redis.getrange_calls == -(-len(zip_data) // 1024)
+    assert storage_server.bytes_served == 0
+
+
+@pytest.mark.integration
+def test_download_too_large_to_cache_is_not_buffered(auth_session, mock_supabase, storage_server, fake_redis, mocker):
+    mocker.patch('services.zip_cache.ZIP_CACHE_MAX_BYTES', 100)
+    storage_server.objects[STORED_PATH] = zip_data = make_zip()
+    sheet_row(mock_supabase)
+
+    assert auth_session.get('/download-sheet/s1').data == zip_data
+    assert fake_redis.data == {}
+
+
+@pytest.mark.integration
+def test_download_of_missing_object_returns_404(auth_session, mock_supabase, storage_server, fake_redis):
+    sheet_row(mock_supabase)
+    response = auth_session.get('/download-sheet/s1')
+    assert response.status_code == 404
+    assert response.get_json()['error'] == 'Failed to download ZIP file'
+
+
+@pytest.mark.integration
+def test_download_of_someone_elses_sheet_returns_403(auth_session, mock_supabase, storage_server, fake_redis):
+    sheet_row(mock_supabase, user_id='someone-else')
+    assert auth_session.get('/download-sheet/s1').status_code == 403
+    assert storage_server.bytes_served == 0
+
+
+@pytest.mark.integration
+def test_cache_stats_endpoint(auth_session, mock_supabase, storage_server, fake_redis):
+    storage_server.objects[STORED_PATH] = make_zip()
+    sheet_row(mock_supabase)
+    zip_data = storage_server.objects[STORED_PATH]
+    assert auth_session.get('/download-sheet/s1').data == zip_data
+    assert auth_session.get('/download-sheet/s1').data == zip_data
+    stats = auth_session.get('/health/cache').get_json()['zip_cache']
+    assert set(stats) == {'memory', 'disk', 'redis'}
+    assert {'hits', 'misses', 'evictions'} <= set(stats['memory'])
+    assert stats['memory']['hits'] == 1
+    assert stats['disk']['misses'] == 1
+    assert stats['redis']['misses'] == 1
+
+
+@pytest.mark.integration
+def test_cache_stats_require_auth(client):
+    assert client.get('/health/cache').status_code == 401
+
+
+@pytest.mark.integration
+def test_sheet_downloads_of_zpl_job_return_400(auth_session, mock_supabase):
+    sheet_row(mock_supabase, output_format='zpl')
+    single = auth_session.get('/download-sheet/s1/sheet/1')
+    selected = auth_session.post('/download-sheet/s1/selected', json={'sheet_numbers': [1, 2]})
+    assert single.status_code == 400
+    assert selected.status_code == 400
+    assert 'ZPL' in single.get_json()['error']
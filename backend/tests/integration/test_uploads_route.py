@@ -1,4 +1,5 @@
 import io
+import os
 import json
 import pytest
 
@@ -16,7 +17,7 @@ VALID_COLUMN_MAPPING = json.dumps({
 
 
 @pytest.mark.integration
-def test_upload_happy_path_returns_200(auth_session, mock_supabase, mock_storage):
+def test_upload_happy_path_returns_202_with_job(auth_session, mock_supabase, mock_storage):
     file_data, filename = make_csv_file()
     response = auth_session.post(
         '/upload',
@@ -28,9 +29,13 @@ def test_upload_happy_path_returns_200(auth_session, mock_supabase, mock_storage
         },
         content_type='multipart/form-data',
     )
-    assert response.status_code == 200
+    assert response.status_code == 202
     data = response.get_json()
-    assert 'user_sheet_id' in data
+    assert data['status_url'] == f"/jobs/{data['job_id']}"
+
+    job = auth_session.get(data['status_url']).get_json()
+    assert job['status'] == 'succeeded'
+    assert 'user_sheet_id' in job['result']
 
 
 @pytest.mark.integration
@@ -61,6 +66,45 @@ def test_upload_invalid_barcode_type_returns_400(auth_session):
     assert response.status_code == 400
 
 
+@pytest.mark.integration
+def test_upload_invalid_output_format_returns_400(auth_session):
+    file_data, filename = make_csv_file()
+    response = auth_session.post(
+        '/upload',
+        data={'file': (file_data, filename), 'output_format': 'epl'},
+        content_type='multipart/form-data',
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.integration
+def test_upload_invalid_dpi_returns_400(auth_session):
+    file_data, filename = make_csv_file()
+    response = auth_session.post(
+        '/upload',
+        data={'file': (file_data, filename), 'output_format': 'png', 'dpi': '150'},
+        content_type='multipart/form-data',
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.integration
+def test_upload_zpl_output_format_job_succeeds(auth_session, mock_supabase, mock_storage):
+    file_data, filename = make_csv_file()
+    response = auth_session.post(
+        '/upload',
+        data={
+            'file': (file_data, filename),
+            'column_mapping': VALID_COLUMN_MAPPING,
+            'output_format': 'zpl',
+        },
+        content_type='multipart/form-data',
+    )
+    assert response.status_code == 202
+    job = auth_session.get(response.get_json()['status_url']).get_json()
+    assert job['result']['output_format'] == 'zpl'
+
+
 @pytest.mark.integration
 def test_upload_barcode_column_zero_returns_400(auth_session):
     file_data, filename = make_csv_file()
@@ -144,3 +188,30 @@ def test_upload_triggers_supabase_insert(auth_session, mock_supabase, mock_stora
         content_type='multipart/form-data',
     )
     assert mock_supabase.table.called
+
+
+@pytest.mark.integration
+def test_preview_does_not_write_to_upload_folder(app, auth_session):
+    upload_folder = app.config['UPLOAD_FOLDER']
+    before = set(os.listdir(upload_folder))
+    file_data, filename = make_csv_file()
+    response = auth_session.post(
+        '/preview',
+        data={'file': (file_data, filename), 'column_mapping': VALID_COLUMN_MAPPING},
+        content_type='multipart/form-data',
+    )
+    assert response.status_code == 200
+    assert set(os.listdir(upload_folder)) == before
+
+
+@pytest.mark.integration
+def test_preview_rejects_suspicious_content_past_header(auth_session):
+    rows = b''.join(b'Aisle-%02d,SKU%05d,Widget,EA\n' % (i % 40, i) for i in range(200))
+    file_data, filename = make_csv_file(b'Location,Barcode,Name,Unit\n' + rows + b'Aisle-99,<SCRIPT>x</script>,Bad,EA\n')
+    response = auth_session.post(
+        '/preview',
+        data={'file': (file_data, filename), 'column_mapping': VALID_COLUMN_MAPPING},
+        content_type='multipart/form-data',
+    )
+    assert response.status_code == 400
+    assert 'suspicious' in response.get_json()['error']
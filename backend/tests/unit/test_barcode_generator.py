@@ -1,4 +1,5 @@
 import io
+import re
 import pytest
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import LETTER
@@ -107,3 +108,121 @@ def test_draw_label_no_text_lines_does_not_raise():
     c, _ = make_canvas()
     gen.draw_label_to_canvas(c, 0, 0, 'SKU001', [])
     c.save()
+
+
+@pytest.mark.unit
+def test_calibrate_length_matches_calibrate():
+    values = ['SKU001', 'LONGSKU99999']
+    from_values = BarcodeGenerator(get_template(), barcode_type='code128')
+    from_values.calibrate(values)
+    from_length = BarcodeGenerator(get_template(), barcode_type='code128')
+    from_length.calibrate_length(len('LONGSKU99999'))
+    assert from_values.bar_width == from_length.bar_width
+
+
+def _content_stream(draw):
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=LETTER, pageCompression=0)
+    draw(c)
+    c.save()
+    data = buf.getvalue()
+    return data[data.index(b'stream'):data.index(b'endstream')].decode()
+
+
+def _absolute_rects(stream):
+    """Filled rects of a content stream in page space, applying the last cm."""
+    number = r'([\d.-]+) '
+    a, _, _, d, e, f = (float(v) for v in re.findall(number * 6 + 'cm', stream)[-1])
+    return [
+        (a * float(x) + e, d * float(y) + f, a * float(w), d * float(h))
+        for x, y, w, h in re.findall(r'([\d.-]+) ([\d.-]+) ([\d.-]+) ([\d.-]+) re', stream)
+    ]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('value', ['SKU001', '0123456789', 'mixed Case 42', 'x'])
+def test_code128_pattern_matches_reportlab_encoding(value):
+    from reportlab.graphics.barcode import code128
+    from utils.BarcodeGenerator import code128_pattern
+    widget = code128.Code128(value)
+    widget.validate()
+    widget.encode()
+    decomposed = widget.decompose()
+    expected = [ord(c) - (64 if c.isupper() else 96) for c in decomposed]
+    assert list(code128_pattern(value)) == expected
+
+
+@pytest.mark.unit
+def test_code128_fast_path_matches_widget_bars():
+    from reportlab.graphics.barcode import code128
+    gen = BarcodeGenerator(get_template(), barcode_type='code128')
+    gen.calibrate(['SKU0012345'])
+
+    def draw_widget(c):
+        widget = code128.Code128(value='SKU0012345', barHeight=gen.barcode_height_inches, barWidth=gen.bar_width)
+        widget.drawOn(c, 10 + (gen.label_width - widget.width) / 2, 20)
+
+    fast = _content_stream(lambda c: gen._draw_code128(c, 10, 20, 'SKU0012345'))
+    widget_rects = _absolute_rects(_content_stream(draw_widget))
+    fast_rects = _absolute_rects(fast)
+    assert fast.count(' re') == len(widget_rects)
+    assert fast.count(' f') == 1
+    assert len(fast_rects) == len(widget_rects)
+    for a, b in zip(fast_rects, widget_rects):
+        assert a == pytest.approx(b, abs=0.01)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('value', ['SKU001', 'https://example.com/item/123456', ''])
+def test_qr_fast_path_matches_widget_modules(value):
+    from reportlab.graphics import renderPDF
+    from reportlab.graphics.barcode.qr import QrCodeWidget
+    from reportlab.graphics.shapes import Drawing
+    gen = BarcodeGenerator(get_template(), barcode_type='qr')
+    qr_size = 90  # standard_20: limited by the height above the barcode offset
+
+    def draw_widget(c):
+        qr = QrCodeWidget(value)
+        x0, y0, x1, y1 = qr.getBounds()
+        d = Drawing(qr_size, qr_size, transform=[qr_size / (x1 - x0), 0, 0, qr_size / (y1 - y0), 0, 0])
+        d.add(qr)
+        renderPDF.draw(d, c, 10 + (gen.label_width - qr_size) / 2, 20)
+
+    widget = _content_stream(draw_widget)
+    number = r'([\d.-]+) '
+    _, _, _, _, tx, ty = (float(v) for v in re.findall(number * 6 + 'cm', widget)[1])
+    scale = float(re.findall(number * 6 + 'cm', widget)[2][0])
+    widget_rects = [
+        (tx + scale * float(x), ty + scale * float(y), scale * float(w), scale * float(h))
+        for x, y, w, h in re.findall('n ' + number * 4 + 're f', widget)
+    ]
+
+    fast = _content_stream(lambda c: gen._draw_qr(c, 10, 20, value))
+    fast_rects = _absolute_rects(fast)
+    assert fast.count(' f') == 1
+    assert len(fast_rects) == len(widget_rects)
+    for a, b in zip(fast_rects, widget_rects):
+        assert a == pytest.approx(b, abs=0.01)
+
+
+@pytest.mark.unit
+def test_repeated_qr_value_drawn_from_one_form():
+    from utils.BarcodeGenerator import FORM_REUSE_MIN_USES
+    gen = BarcodeGenerator(get_template(), barcode_type='qr')
+    values = ['REPEATED'] * FORM_REUSE_MIN_USES + ['ONCE']
+    gen.plan_forms(values)
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=LETTER, pageCompression=0)
+    for i, value in enumerate(values):
+        gen.draw_label_to_canvas(c, 10, 20 + i, value, [])
+    c.save()
+    pdf = buf.getvalue()
+    assert pdf.count(b'/Subtype /Form') == 1
+    assert len(re.findall(rb'/[\w.]+ Do', pdf)) == FORM_REUSE_MIN_USES
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('value', ['SKU001', 'https://example.com/item/123456', 'x' * 200, ''])
+def test_qr_symbol_size_matches_qr_path(value):
+    from utils.BarcodeGenerator import qr_path, qr_symbol_size
+    assert qr_symbol_size(value) == qr_path(value)[0]
@@ -0,0 +1,78 @@
+import io
+import pytest
+from utils.security import get_upload_scan
+from services.dataset_cache import (
+    _LocalCache,
+    dataset_cache_key,
+    encode_labels,
+    decode_labels,
+    cache_labels,
+    get_cached_labels,
+)
+
+MAPPING = {
+    'barcode_column': 1,
+    'text_columns': [{'column': 0, 'label': 'Location'}],
+    'has_header_row': True,
+}
+
+
+@pytest.mark.unit
+def test_encode_decode_round_trip():
+    labels = [
+        ('SKU001', [('Location', 'A-01'), ('Unit', 'EA')]),
+        ('Ünïcode-✓', []),
+        ('SKU003', [('Unit', 'PK')]),
+    ]
+    blob = encode_labels(labels)
+    assert isinstance(blob, bytes)
+    assert decode_labels(blob) == labels
+
+
+@pytest.mark.unit
+def test_encode_empty_dataset():
+    assert decode_labels(encode_labels([])) == []
+
+
+@pytest.mark.unit
+def test_encoding_is_smaller_than_repr():
+    labels = [(f'SKU{i:06d}', [('Location', f'Aisle-{i % 40}'), ('Unit', 'EA')]) for i in range(1000)]
+    assert len(encode_labels(labels)) < len(repr(labels)) // 4
+
+
+@pytest.mark.unit
+def test_key_depends_on_mapping_and_header_flag():
+    # Keyed by the upload's content hash, as the upload route computes it
+    h = get_upload_scan(io.BytesIO(b'a,b\n1,2\n')).sha256
+    base = dataset_cache_key(h, MAPPING)
+    assert base == dataset_cache_key(h, dict(MAPPING))
+    assert base != dataset_cache_key(h, {**MAPPING, 'has_header_row': False})
+    assert base != dataset_cache_key(h, {**MAPPING, 'barcode_column': 0})
+    assert base != dataset_cache_key(get_upload_scan(io.BytesIO(b'other')).sha256, MAPPING)
+
+
+@pytest.mark.unit
+def test_local_cache_evicts_least_recently_used_by_bytes():
+    cache = _LocalCache(max_bytes=10)
+    cache.set('a', b'12345', ttl=60)
+    cache.set('b', b'12345', ttl=60)
+    cache.get('a')
+    cache.set('c', b'12345', ttl=60)
+    assert cache.get('b') is None
+    assert cache.get('a') == b'12345'
+    assert cache.size == 10
+
+
+@pytest.mark.unit
+def test_local_cache_expires_entries():
+    cache = _LocalCache(max_bytes=100)
+    cache.set('a', b'x', ttl=-1)
+    assert cache.get('a') is None
+    assert cache.size == 0
+
+
+@pytest.mark.unit
+def test_cache_labels_falls_back_to_local_without_redis():
+    labels = [('SKU001', [('Location', 'A-01')])]
+    cache_labels('labels:test', labels)
+    assert get_cached_labels('labels:test') == labels
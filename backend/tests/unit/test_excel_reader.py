@@ -0,0 +1,111 @@
+import io
+import datetime
+import openpyxl
+import pandas as pd
+import pytest
+from services.excel_reader import is_legacy_xls, iter_excel_chunks, read_excel_columns
+
+
+def make_xlsx(rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for row in rows:
+        ws.append(row)
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+
+@pytest.mark.unit
+def test_reads_only_requested_columns():
+    buf = make_xlsx([['A', 'B', 'C', 'D'], [1, 'SKU1', 'x', 'EA']])
+    df = read_excel_columns(buf, [3, 1], has_header_row=True)
+    assert list(df.columns) == [1, 3]
+    assert df.iloc[0].tolist() == ['SKU1', 'EA']
+
+
+@pytest.mark.unit
+def test_values_match_pandas_read_excel_as_str():
+    rows = [[123, 1.5, 7.0, True, 'text', None, datetime.datetime(2024, 1, 2, 3, 4, 5)]]
+    buf = make_xlsx(rows)
+    ours = read_excel_columns(buf, list(range(7)))
+    buf.seek(0)
+    theirs = pd.read_excel(buf, header=None, dtype=str)
+    for c in range(7):
+        expected = theirs.iloc[0, c]
+        actual = ours.iloc[0, c]
+        assert (actual is None and pd.isna(expected)) or actual == expected
+
+
+@pytest.mark.unit
+def test_short_rows_pad_missing_columns_with_none():
+    buf = make_xlsx([['SKU1'], ['SKU2', 'A-2']])
+    df = read_excel_columns(buf, [0, 1])
+    assert df[1].tolist() == [None, 'A-2']
+
+
+@pytest.mark.unit
+def test_chunks_and_early_stop():
+    buf = make_xlsx([[f'SKU{i}'] for i in range(25)])
+    sizes = [len(df) for df in iter_excel_chunks(buf, [0], chunk_rows=10)]
+    assert sizes == [10, 10, 5]
+    sizes = [len(df) for df in iter_excel_chunks(buf, [0], chunk_rows=10, max_rows=12)]
+    assert sizes == [10, 2]
+
+
+@pytest.mark.unit
+def test_is_legacy_xls_detects_ole_signature():
+    assert is_legacy_xls(io.BytesIO(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + b'\x00' * 10))
+    assert not is_legacy_xls(make_xlsx([['a']]))
+
+
+def make_raw_xlsx(sheet_rows_xml):
+    """Hand-built workbook for XML shapes openpyxl never writes."""
+    ns = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    rel_ns = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    buf = io.BytesIO()
+    import zipfile
+    with zipfile.ZipFile(buf, 'w') as zf:
+        zf.writestr('[Content_Types].xml',
+                    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Override PartName="/xl/workbook.xml" ContentType="application/'
+                    'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+                    'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/></Types>')
+        zf.writestr('_rels/.rels',
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" Target="xl/workbook.xml" Type="http://schemas.openxmlformats.org/'
+                    'officeDocument/2006/relationships/officeDocument"/></Relationships>')
+        zf.writestr('xl/workbook.xml',
+                    f'<workbook xmlns="{ns}" xmlns:r="{rel_ns}"><sheets>'
+                    f'<sheet name="S" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        zf.writestr('xl/_rels/workbook.xml.rels',
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" Target="worksheets/sheet1.xml" Type="http://schemas.openxmlformats.org/'
+                    'officeDocument/2006/relationships/worksheet"/></Relationships>')
+        zf.writestr('xl/worksheets/sheet1.xml',
+                    f'<worksheet xmlns="{ns}"><sheetData>{sheet_rows_xml}</sheetData></worksheet>')
+    buf.seek(0)
+    return buf
+
+
+@pytest.mark.unit
+def test_inline_strings_unreferenced_cells_and_row_gaps():
+    buf = make_raw_xlsx(
+        '<row r="1"><c t="inlineStr"><is><t>SKU1</t></is></c><c><v>42</v></c></row>'
+        '<row r="3"><c r="B3" t="inlineStr"><is><r><t>A-</t></r><r><t>3</t></r></is></c></row>'
+    )
+    df = read_excel_columns(buf, [0, 1])
+    assert df[0].tolist() == ['SKU1', None, None]
+    assert df[1].tolist() == ['42', None, 'A-3']
+
+
+@pytest.mark.unit
+def test_iso_date_and_error_cells():
+    buf = make_raw_xlsx(
+        '<row r="1"><c r="A1" t="d"><v>2024-01-02T03:04:05</v></c>'
+        '<c r="B1" t="e"><v>#N/A</v></c><c r="C1" t="str"><v>SKU1</v></c></row>'
+    )
+    df = read_excel_columns(buf, [0, 1, 2])
+    assert df.iloc[0].tolist() == ['2024-01-02 03:04:05', '#N/A', 'SKU1']
@@ -0,0 +1,52 @@
+import io
+import zipfile
+import pytest
+from utils.file_utils import read_upload_archive
+
+
+def make_archive(entries):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+    buf.seek(0)
+    return buf
+
+
+@pytest.mark.unit
+def test_archive_files_in_order_skipping_metadata():
+    archive = make_archive([
+        ('b.csv', b'x,y\n'), ('folder/a.csv', b'1,2\n'), ('__MACOSX/._b.csv', b'junk'),
+        ('.DS_Store', b'junk'), ('folder/', b''),
+    ])
+    files = read_upload_archive(archive, max_files=10, max_entry_bytes=100, max_total_bytes=1000)
+    assert [f.filename for f in files] == ['b.csv', 'a.csv']
+    assert files[1].stream.read() == b'1,2\n'
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('limits, message', [
+    ({'max_files': 1, 'max_entry_bytes': 100, 'max_total_bytes': 1000}, 'Too many files'),
+    ({'max_files': 10, 'max_entry_bytes': 10, 'max_total_bytes': 1000}, 'too large'),
+    ({'max_files': 10, 'max_entry_bytes': 100, 'max_total_bytes': 30}, 'beyond the allowed size'),
+])
+def test_archive_limits(limits, message):
+    archive = make_archive([('a.csv', b'a' * 20), ('b.csv', b'b' * 20)])
+    with pytest.raises(ValueError, match=message):
+        read_upload_archive(archive, **limits)
+
+
+@pytest.mark.unit
+def test_archive_entry_lying_about_its_size_is_rejected():
+    data = bytearray(make_archive([('bomb.csv', b'0' * 10000)]).getvalue())
+    # Declare 5 bytes in both headers; the entry still inflates to 10000
+    for offset in (data.find(b'PK\x03\x04') + 22, data.find(b'PK\x01\x02') + 24):
+        data[offset:offset + 4] = (5).to_bytes(4, 'little')
+    with pytest.raises(ValueError, match='could not be read'):
+        read_upload_archive(io.BytesIO(bytes(data)), max_files=10, max_entry_bytes=100, max_total_bytes=1000)
+
+
+@pytest.mark.unit
+def test_not_a_zip_raises_value_error():
+    with pytest.raises(ValueError, match='not a valid ZIP'):
+        read_upload_archive(io.BytesIO(b'plain text'), max_files=10, max_entry_bytes=100, max_total_bytes=1000)
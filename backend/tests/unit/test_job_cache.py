@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import MagicMock
+from services.job_cache import count_storage_references, find_job_result, job_fingerprint
+
+MAPPING = {
+    'barcode_column': 1,
+    'text_columns': [{'column': 0, 'label': 'Location'}],
+    'has_header_row': True,
+}
+OPTIONS = {'output_format': 'pdf', 'dpi': None, 'zip_policy': 'adaptive'}
+
+
+@pytest.mark.unit
+def test_fingerprint_ignores_mapping_noise():
+    base = job_fingerprint('abc', 'standard_20', 'code128', MAPPING, OPTIONS)
+    noisy = {**MAPPING, 'has_header_row': 1, 'ui_state': 'ignored'}
+    assert base == job_fingerprint('abc', 'standard_20', 'code128', noisy, dict(OPTIONS))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('changed', [
+    ('def', 'standard_20', 'code128', MAPPING, OPTIONS),
+    ('abc', '5160', 'code128', MAPPING, OPTIONS),
+    ('abc', 'standard_20', 'qr', MAPPING, OPTIONS),
+    ('abc', 'standard_20', 'code128', {**MAPPING, 'barcode_column': 0}, OPTIONS),
+    ('abc', 'standard_20', 'code128', MAPPING, {**OPTIONS, 'output_format': 'zpl'}),
+])
+def test_fingerprint_changes_with_every_input(changed):
+    assert job_fingerprint(*changed) != job_fingerprint('abc', 'standard_20', 'code128', MAPPING, OPTIONS)
+
+
+def lookup_result(mock_supabase, rows):
+    (mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value
+     .order.return_value.limit.return_value.execute.return_value.data) = rows
+
+
+@pytest.mark.unit
+def test_find_job_result_returns_stored_zip(app, mock_supabase):
+    lookup_result(mock_supabase, [{
+        'label_count': 25, 'sheet_count': 2, 'total_size_bytes': 4096,
+        'sheet_files': [{'storage_path': 'u/s/sheets_s.zip', 'sheet_number': 0, 'zip_index': {'a': [30, 1, 1, 0, 0]}}],
+    }])
+    with app.app_context():
+        assert find_job_result('u', 'fp') == {
+            'storage_path': 'u/s/sheets_s.zip', 'zip_size': 4096, 'zip_index': {'a': [30, 1, 1, 0, 0]},
+            'label_count': 25, 'sheet_count': 2,
+        }
+
+
+@pytest.mark.unit
+def test_find_job_result_misses_without_zip_file(app, mock_supabase):
+    lookup_result(mock_supabase, [{'label_count': 25, 'sheet_count': 2, 'total_size_bytes': 0, 'sheet_files': []}])
+    with app.app_context():
+        assert find_job_result('u', 'fp') is None
+
+
+@pytest.mark.unit
+def test_find_job_result_is_best_effort(app, mock_supabase):
+    mock_supabase.table.side_effect = RuntimeError('db down')
+    with app.app_context():
+        assert find_job_result('u', 'fp') is None
+
+
+@pytest.mark.unit
+def test_count_storage_references_excludes_deleted_sheet(app, mock_supabase):
+    query = mock_supabase.table.return_value.select.return_value.eq.return_value
+    query.neq.return_value.execute.return_value.data = [{'user_sheet_id': 'other'}]
+    with app.app_context():
+        assert count_storage_references('u/s/sheets_s.zip', excluding_user_sheet_id='s') == 1
+    query.neq.assert_called_once_with('user_sheet_id', 's')
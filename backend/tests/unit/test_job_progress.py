@@ -0,0 +1,157 @@
+import io
+import threading
+import pytest
+from services.job_progress import JobProgress, LocalProgressBroker, report_sheets
+
+
+@pytest.mark.unit
+def test_progress_throttles_to_whole_percent_steps():
+    broker = LocalProgressBroker()
+    progress = JobProgress(broker, 'job-1')
+    list(report_sheets(range(500), 500, progress))
+    events = list(broker._events['job-1'])
+    assert len(events) == 101  # 0% through 100%
+    assert events[-1] == {'seq': 101, 'stage': 'rendered', 'sheet': 500, 'sheets': 500, 'percent': 100}
+
+
+@pytest.mark.unit
+def test_progress_publish_errors_never_reach_the_job():
+    class BrokenBroker:
+        def publish(self, job_id, stage, data):
+            raise ConnectionError('redis went away')
+
+    JobProgress(BrokenBroker(), 'job-1')('parsed', rows=10)
+
+
+@pytest.mark.unit
+def test_local_subscriber_follows_live_events_with_heartbeats():
+    broker = LocalProgressBroker()
+    broker.publish('job-1', 'queued', {})
+    stream = broker.subscribe('job-1', heartbeat=0.01)
+    assert next(stream)['stage'] == 'queued'
+    assert next(stream) is None  # nothing new yet: keep-alive
+
+    def finish():
+        broker.publish('job-1', 'running', {})
+        broker.publish('job-1', 'succeeded', {'result': {}})
+
+    threading.Thread(target=finish).start()
+    rest = [event['stage'] for event in stream if event is not None]
+    assert rest == ['running', 'succeeded']
+
+
+@pytest.mark.unit
+def test_local_broker_forgets_oldest_jobs():
+    broker = LocalProgressBroker(max_jobs=2)
+    for job_id in ('a', 'b', 'c'):
+        broker.publish(job_id, 'queued', {})
+    assert list(broker._events) == ['b', 'c']
+
+
+@pytest.mark.unit
+def test_local_subscriber_ends_for_unknown_or_evicted_jobs():
+    broker = LocalProgressBroker(max_jobs=1)
+    assert list(broker.subscribe('missing', heartbeat=0.01)) == []
+
+    broker.publish('job-1', 'queued', {})
+    stream = broker.subscribe('job-1', heartbeat=0.01)
+    assert next(stream)['stage'] == 'queued'
+    broker.publish('job-2', 'queued', {})  # evicts job-1
+    assert list(stream) == []
+
+
+@pytest.mark.unit
+def test_tus_upload_reports_bytes_per_chunk(mocker):
+    import services.storage_service as storage
+
+    class FakeUploader:
+        offset = 0
+
+        def upload(self, stop_at=None):
+            self.offset = stop_at
+
+    mocker.patch.object(storage, 'TUS_CHUNK_SIZE', 4)
+    mocker.patch.object(storage, 'create_tus_client').return_value.uploader.return_value = FakeUploader()
+    reported = []
+    result = storage.upload_zip_to_storage(
+        'u', 's', io.BytesIO(b'0123456789'), 'x.csv',
+        progress=lambda stage, **data: reported.append((stage, data['bytes'], data['total_bytes'])),
+    )
+    assert result['success']
+    assert reported == [('uploaded', 4, 10), ('uploaded', 8, 10), ('uploaded', 10, 10)]
+
+
+class FakePubSubRedis:
+    """List and pub/sub commands RedisProgressBroker uses, in one thread."""
+
+    def __init__(self):
+        self.lists = {}
+        self.subscribers = []
+
+    def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value.encode())
+        return len(self.lists[key])
+
+    def expire(self, key, ttl):
+        pass
+
+    def exists(self, key):
+        return int(key in self.lists)
+
+    def lrange(self, key, start, end):
+        return self.lists.get(key, [])[start:]
+
+    def publish(self, channel, message):
+        for pubsub in self.subscribers:
+            pubsub.messages.append({'type': 'message', 'data': message.encode()})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        redis = self
+
+        class PubSub:
+            def __init__(self):
+                self.messages = []
+
+            def subscribe(self, channel):
+                redis.subscribers.append(self)
+
+            def get_message(self, timeout=None):
+                return self.messages.pop(0) if self.messages else None
+
+            def close(self):
+                redis.subscribers.remove(self)
+
+        return PubSub()
+
+
+@pytest.mark.unit
+def test_redis_subscriber_replays_history_then_follows_channel():
+    from services.job_progress import RedisProgressBroker
+    redis = FakePubSubRedis()
+    broker = RedisProgressBroker(redis)
+    broker.publish('job-1', 'queued', {})
+    broker.publish('job-1', 'running', {})
+
+    stream = broker.subscribe('job-1', after=1)
+    assert next(stream) == {'seq': 2, 'stage': 'running'}
+    broker.publish('job-1', 'parsed', {'rows': 3})
+    assert next(stream) == {'seq': 3, 'stage': 'parsed', 'rows': 3}
+    assert next(stream) is None
+    broker.publish('job-1', 'failed', {'error': 'boom'})
+    assert [e['stage'] for e in stream] == ['failed']
+    assert redis.subscribers == []
+
+
+@pytest.mark.unit
+def test_redis_subscriber_ends_once_the_events_expired():
+    from services.job_progress import RedisProgressBroker
+    redis = FakePubSubRedis()
+    broker = RedisProgressBroker(redis)
+    assert list(broker.subscribe('missing')) == []
+
+    broker.publish('job-1', 'queued', {})
+    stream = broker.subscribe('job-1')
+    assert next(stream)['stage'] == 'queued'
+    redis.lists.clear()
+    assert list(stream) == []
+    assert redis.subscribers == []
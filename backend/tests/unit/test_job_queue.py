@@ -0,0 +1,225 @@
+import threading
+import time
+import pytest
+from services.job_queue import (
+    LocalJobBackend, RedisJobBackend, new_job, run_job, ORPHAN_GRACE_SECONDS, PROCESSING_KEY, QUEUE_KEY,
+)
+
+
+def wait_for(backend, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while backend.get(job_id)['status'] in ('queued', 'running'):
+        assert time.time() < deadline, 'job did not finish'
+        time.sleep(0.01)
+    return backend.get(job_id)
+
+
+@pytest.mark.unit
+def test_local_backend_runs_jobs_on_worker_threads(app, mocker):
+    process = mocker.patch('services.label_service.process_label_file', return_value={'success': True})
+    backend = LocalJobBackend(app, workers=2)
+    job = backend.submit(new_job('user-1', 'a.csv'), b'csv bytes', {'barcode_type': 'qr'})
+    finished = wait_for(backend, job['id'])
+    assert finished['status'] == 'succeeded'
+    assert finished['result'] == {'success': True}
+    stream, user_id, filename = process.call_args[0]
+    assert (stream.read(), user_id, filename) == (b'csv bytes', 'user-1', 'a.csv')
+    assert process.call_args[1]['barcode_type'] == 'qr'
+
+
+@pytest.mark.unit
+def test_run_job_records_value_errors(app, mocker):
+    mocker.patch('services.label_service.process_label_file', side_effect=ValueError('Too many labels'))
+    backend = LocalJobBackend(app, workers=0)
+    job = backend.submit(new_job('user-1', 'a.csv'), b'', {})
+    assert backend.get(job['id'])['status'] == 'failed'
+    assert backend.get(job['id'])['error'] == 'Too many labels'
+
+
+class FakeRedis:
+    """Just the commands RedisJobBackend uses."""
+
+    def __init__(self):
+        self.values = {}
+        self.lists = {}
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value.encode() if isinstance(value, str) else value
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def expire(self, key, ttl):
+        return key in self.values
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value.encode())
+
+    def brpoplpush(self, source, destination, timeout=0):
+        items = self.lists.get(source)
+        if not items:
+            return None
+        value = items.pop()
+        self.lists.setdefault(destination, []).insert(0, value)
+        return value
+
+    def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        if value in items:
+            items.remove(value)
+            return 1
+        return 0
+
+    def pipeline(self):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+            def execute(self):
+                return [getattr(redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+        return Pipeline()
+
+
+@pytest.mark.unit
+def test_redis_backend_round_trips_jobs_in_fifo_order(app, mocker):
+    process = mocker.patch('services.label_service.process_label_file', return_value={'user_sheet_id': 's1'})
+    backend = RedisJobBackend(FakeRedis())
+    first = backend.submit(new_job('user-1', 'a.csv'), b'first', {'template_id': '5160'})
+    backend.submit(new_job('user-1', 'b.csv'), b'second', {})
+    assert backend.get(first['id'])['status'] == 'queued'
+
+    job_id, content, args = backend.next_job(timeout=0)
+    assert (job_id, content, args) == (first['id'], b'first', {'template_id': '5160'})
+    assert backend.redis.get(f'job:{job_id}:file') is None
+    assert backend.redis.exists(f'job:{job_id}:lease')
+    assert len(backend.redis.lists[PROCESSING_KEY]) == 1
+
+    with app.app_context(), backend.lease(job_id):
+        run_job(backend, job_id, content, args)
+    assert backend.get(job_id)['status'] == 'succeeded'
+    assert backend.redis.lists[PROCESSING_KEY] == []
+    assert not backend.redis.exists(f'job:{job_id}:lease')
+    assert backend.get(job_id)['result'] == {'user_sheet_id': 's1'}
+    assert len(backend.redis.lists[QUEUE_KEY]) == 1
+
+
+@pytest.mark.unit
+def test_redis_backend_fails_jobs_whose_upload_expired():
+    backend = RedisJobBackend(FakeRedis())
+    job = backend.submit(new_job('user-1', 'a.csv'), b'data', {})
+    backend.redis.delete(f"job:{job['id']}:file")
+    assert backend.next_job(timeout=0) is None
+    assert backend.get(job['id'])['status'] == 'failed'
+
+
+@pytest.mark.unit
+def test_reaper_fails_jobs_whose_worker_died():
+    backend = RedisJobBackend(FakeRedis())
+    job = backend.submit(new_job('user-1', 'a.csv'), b'data', {})
+    backend.next_job(timeout=0)
+    backend.update(job['id'], status='running')
+    # The worker died: its lease lapses without being released
+    backend.redis.delete(f"job:{job['id']}:lease")
+
+    assert backend.reap_orphans(now=1000) == []
+    assert backend.get(job['id'])['status'] == 'running'
+    assert backend.reap_orphans(now=1000 + ORPHAN_GRACE_SECONDS) == [job['id']]
+    assert backend.get(job['id'])['status'] == 'failed'
+    assert backend.redis.lists[PROCESSING_KEY] == []
+
+
+@pytest.mark.unit
+def test_reaper_leaves_leased_and_finished_jobs_alone():
+    backend = RedisJobBackend(FakeRedis())
+    running = backend.submit(new_job('user-1', 'a.csv'), b'a', {})
+    done = backend.submit(new_job('user-1', 'b.csv'), b'b', {})
+    backend.next_job(timeout=0)
+    backend.next_job(timeout=0)
+    backend.update(done['id'], status='succeeded')
+    backend.redis.delete(f"job:{done['id']}:lease")
+
+    backend.reap_orphans(now=1000)
+    assert backend.reap_orphans(now=2000) == []
+    assert backend.get(running['id'])['status'] == 'queued'
+    assert backend.get(done['id'])['status'] == 'succeeded'
+    assert len(backend.redis.lists[PROCESSING_KEY]) == 1
+
+
+@pytest.mark.unit
+def test_worker_survives_redis_timeouts(app, mocker):
+    from redis.exceptions import TimeoutError as RedisTimeoutError
+    import services.job_queue as job_queue
+
+    stop = threading.Event()
+    backend = RedisJobBackend(FakeRedis())
+    calls = []
+
+    def next_job(timeout=None):
+        calls.append(timeout)
+        if len(calls) == 1:
+            raise RedisTimeoutError('Timeout reading from socket')
+        stop.set()
+        return None
+
+    backend.next_job = next_job
+    mocker.patch.object(job_queue, 'get_job_backend', return_value=backend)
+    mocker.patch.object(job_queue, 'WORKER_RETRY_SECONDS', 0)
+    job_queue.run_worker(app, stop)
+    assert len(calls) == 2
+
+
+@pytest.mark.unit
+def test_worker_survives_redis_loss_mid_job_and_leaves_job_to_reaper(app, mocker):
+    from redis.exceptions import ConnectionError as RedisConnectionError
+    import services.job_queue as job_queue
+
+    stop = threading.Event()
+    backend = RedisJobBackend(FakeRedis())
+    job = backend.submit(new_job('user-1', 'a.csv'), b'data', {})
+    taken = backend.next_job
+    calls = []
+
+    def next_job(timeout=None):
+        calls.append(timeout)
+        if len(calls) > 1:
+            stop.set()
+            return None
+        return taken(timeout=0)
+
+    def run_job(backend, job_id, content, args):
+        raise RedisConnectionError('Connection reset by peer')
+
+    backend.next_job = next_job
+    mocker.patch.object(job_queue, 'get_job_backend', return_value=backend)
+    mocker.patch.object(job_queue, 'run_job', run_job)
+    mocker.patch.object(job_queue, 'WORKER_RETRY_SECONDS', 0)
+    job_queue.run_worker(app, stop)
+
+    # Still taken, so once its lease lapses the reaper fails it
+    assert len(backend.redis.lists[PROCESSING_KEY]) == 1
+    backend.redis.delete(f"job:{job['id']}:lease")
+    backend.reap_orphans(now=1000)
+    assert backend.reap_orphans(now=1000 + ORPHAN_GRACE_SECONDS) == [job['id']]
+    assert backend.get(job['id'])['status'] == 'failed'
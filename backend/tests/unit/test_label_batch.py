@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+from utils.LabelBatch import LabelBatch, StringColumn
+
+LABELS = [
+    ('SKU001', [('Location', 'A-01'), ('Unit', 'EA')]),
+    ('SKU002', [('Location', 'A-02')]),
+    ('Ünïcode-✓', []),
+    ('SKU004', [('Unit', 'PK')]),
+]
+
+
+@pytest.mark.unit
+def test_from_labels_round_trip():
+    batch = LabelBatch.from_labels(LABELS)
+    assert len(batch) == 4
+    assert batch.field_labels == ('Location', 'Unit')
+    assert list(batch) == LABELS
+    assert batch[2] == ('Ünïcode-✓', [])
+    assert batch[-1] == ('SKU004', [('Unit', 'PK')])
+
+
+@pytest.mark.unit
+def test_repeated_field_labels_stay_distinct():
+    labels = [('SKU1', [('Note', 'a'), ('Note', 'b')]), ('SKU2', [('Note', 'c')])]
+    assert list(LabelBatch.from_labels(labels)) == labels
+
+
+@pytest.mark.unit
+def test_slicing_returns_batch():
+    batch = LabelBatch.from_labels(LABELS)
+    tail = batch[1:3]
+    assert isinstance(tail, LabelBatch)
+    assert list(tail) == LABELS[1:3]
+    assert list(batch[3:1]) == []
+    assert list(batch[::2]) == LABELS[::2]
+
+
+@pytest.mark.unit
+def test_concat_matching_and_mismatched_fields():
+    a = LabelBatch.from_labels(LABELS[:2])
+    b = LabelBatch.from_labels(LABELS[2:])
+    same = LabelBatch.concat([a, a])
+    assert same.field_labels == a.field_labels
+    assert list(same) == LABELS[:2] * 2
+    assert list(LabelBatch.concat([a, LabelBatch([]), b])) == LABELS
+    assert len(LabelBatch.concat([])) == 0
+
+
+@pytest.mark.unit
+def test_from_series_treats_nan_as_missing():
+    col = StringColumn.from_series(pd.Series(['ab', None, 'cde'], dtype=object))
+    assert list(col) == ['ab', None, 'cde']
+    assert col.max_length() == 3
+    assert col.data == 'abcde'
+
+
+@pytest.mark.unit
+def test_batch_is_smaller_than_tuple_list():
+    labels = [(f'SKU{i:07d}', [('Location', f'Aisle-{i % 40}'), ('Unit', 'EA')]) for i in range(2000)]
+    batch = LabelBatch.from_labels(labels)
+    assert batch == labels
+    assert batch.nbytes() < 2000 * 100
@@ -0,0 +1,112 @@
+import io
+import pytest
+from services.label_ingest import (
+    read_label_columns,
+    extract_labels,
+    scan_label_stats,
+    iter_label_chunks,
+    read_preview_labels,
+)
+
+COLUMN_MAPPING = {
+    'barcode_column': 1,
+    'text_columns': [
+        {'column': 0, 'label': 'Location'},
+        {'column': 3, 'label': 'Unit'},
+    ],
+    'has_header_row': True,
+}
+
+
+def load(content, column_mapping=COLUMN_MAPPING):
+    df = read_label_columns(io.BytesIO(content), column_mapping)
+    return extract_labels(df, column_mapping)
+
+
+@pytest.mark.unit
+def test_extracts_barcode_and_text_lines():
+    labels = load(b"Location,Barcode,Name,Unit\nAisle-01,SKU001,Widget,EA\n")
+    assert labels == [('SKU001', [('Location', 'Aisle-01'), ('Unit', 'EA')])]
+
+
+@pytest.mark.unit
+def test_reads_only_mapped_columns():
+    content = b"Location,Barcode,Name,Unit\nAisle-01,SKU001,Widget,EA\n"
+    df = read_label_columns(io.BytesIO(content), COLUMN_MAPPING)
+    assert list(df.columns) == [0, 1, 3]
+
+
+@pytest.mark.unit
+def test_numeric_barcodes_keep_leading_zeros():
+    labels = load(b"A,B\nx,000123\n", {'barcode_column': 1, 'text_columns': [], 'has_header_row': True})
+    assert labels[0][0] == '000123'
+
+
+@pytest.mark.unit
+def test_strips_and_truncates_values():
+    long_value = 'Y' * 150
+    content = f"Loc,Barcode\n  A-1  ,  {long_value}\n".encode()
+    labels = load(content, {'barcode_column': 1, 'text_columns': [{'column': 0, 'label': 'Loc'}], 'has_header_row': True})
+    assert labels == [('Y' * 100, [('Loc', 'A-1')])]
+
+
+@pytest.mark.unit
+def test_drops_blank_and_nan_cells():
+    content = b"Loc,Barcode,Unit\nnan,SKU001,\nA-2,,EA\nA-3,nan,EA\n"
+    labels = load(content, COLUMN_MAPPING)
+    assert labels == [('SKU001', [])]
+
+
+@pytest.mark.unit
+def test_out_of_range_columns_are_ignored():
+    content = b"Loc,Barcode\nA-1,SKU001\n"
+    mapping = {'barcode_column': 1, 'text_columns': [{'column': 7, 'label': 'Missing'}], 'has_header_row': True}
+    assert load(content, mapping) == [('SKU001', [])]
+    mapping = {'barcode_column': 9, 'text_columns': [], 'has_header_row': True}
+    assert load(content, mapping) == []
+
+
+@pytest.mark.unit
+def test_scan_label_stats_counts_valid_barcodes_and_longest():
+    content = b"Loc,Barcode\nA-1,SKU1\nA-2,\nA-3,LONGER-SKU\nA-4,nan\n"
+    count, longest = scan_label_stats(io.BytesIO(content), COLUMN_MAPPING, chunk_rows=2)
+    assert (count, longest) == (2, len('LONGER-SKU'))
+
+
+@pytest.mark.unit
+def test_iter_label_chunks_matches_full_extraction():
+    rows = ''.join(f'A-{i},SKU{i},x,EA\n' for i in range(25))
+    content = b"Location,Barcode,Name,Unit\n" + rows.encode()
+    chunks = list(iter_label_chunks(io.BytesIO(content), COLUMN_MAPPING, chunk_rows=10))
+    assert [len(c) for c in chunks] == [10, 10, 5]
+    assert [label for chunk in chunks for label in chunk] == load(content)
+
+
+def make_xlsx(rows):
+    import openpyxl
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for row in rows:
+        ws.append(row)
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+
+@pytest.mark.unit
+def test_read_preview_labels_stops_at_limit():
+    rows = ''.join(f'A-{i},SKU{i},x,EA\n' for i in range(500))
+    content = b"Location,Barcode,Name,Unit\n" + rows.encode()
+    labels = read_preview_labels(io.BytesIO(content), COLUMN_MAPPING, limit=20)
+    assert labels == load(content)[:20]
+
+
+@pytest.mark.unit
+def test_read_preview_labels_xlsx_skips_invalid_rows():
+    rows = [['Location', 'Barcode', 'Name', 'Unit']]
+    rows += [[f'A-{i}', None, 'x', 'EA'] for i in range(30)]
+    rows += [[f'B-{i}', f'SKU{i}', 'x', 'EA'] for i in range(30)]
+    labels = read_preview_labels(make_xlsx(rows), COLUMN_MAPPING, limit=20, is_excel=True)
+    assert len(labels) == 20
+    assert labels[0] == ('SKU0', [('Location', 'B-0'), ('Unit', 'EA')])
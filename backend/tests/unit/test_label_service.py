@@ -165,3 +165,232 @@ def test_process_label_file_calls_supabase_insert_once(app, mock_supabase, mock_
             column_mapping=COLUMN_MAPPING,
         )
     assert mock_supabase.table.call_count >= 1
+
+
+@pytest.mark.unit
+def test_process_label_file_streaming_mode(app, mock_supabase, mock_storage):
+    rows = ''.join(f'Loc{i},SKU{i},Name,EA\n' for i in range(45))
+    with app.app_context():
+        app.config['STREAMING_THRESHOLD_BYTES'] = 0
+        from services.label_service import process_label_file
+        result = process_label_file(
+            make_file(CSV_HEADER + rows.encode()), 'user-1', 'test.csv',
+            template_id='standard_20',
+            column_mapping=COLUMN_MAPPING,
+        )
+    assert result['label_count'] == 45
+    assert result['sheet_count'] == 3
+
+
+@pytest.mark.unit
+def test_preview_fast_path_counts_rows_without_full_parse(app, mocker):
+    # Blank barcodes are not labels, so /upload would accept this file
+    rows = ''.join(f'Loc{i},SKU{i},Name,EA\n' for i in range(95)) + 'Loc,,Name,EA\n' * 10
+    rows += 'Loc95,SKU-WITH-A-MUCH-LONGER-VALUE,Name,EA\n'
+    from utils.BarcodeGenerator import BarcodeGenerator
+    calibrate = mocker.spy(BarcodeGenerator, 'calibrate_length')
+    with app.app_context():
+        app.config['PREVIEW_FULL_SCAN_BYTES'] = 0
+        app.config['MAX_LABELS'] = 96
+        from services.label_service import generate_label_preview
+        result = generate_label_preview(
+            make_file(CSV_HEADER + rows.encode()), 'user-1', 'test.csv',
+            template_id='standard_20',
+            column_mapping=COLUMN_MAPPING,
+        )
+    assert result['label_count'] == 96
+    assert result['total_sheets'] == 5
+    assert result['labels_on_first_sheet'] == 20
+    # Calibrated for the longest barcode in the file, not just the first sheet
+    assert calibrate.call_args[0][1] == len('SKU-WITH-A-MUCH-LONGER-VALUE')
+
+
+@pytest.mark.unit
+def test_process_after_preview_skips_parsing(app, mock_supabase, mock_storage, mocker):
+    with app.app_context():
+        from services.label_service import generate_label_preview, process_label_file
+        generate_label_preview(
+            make_file(), 'user-1', 'test.csv',
+            template_id='standard_20',
+            column_mapping=COLUMN_MAPPING,
+        )
+        parse = mocker.patch('services.label_service.read_label_columns')
+        result = process_label_file(
+            make_file(), 'user-1', 'test.csv',
+            template_id='standard_20',
+            column_mapping=COLUMN_MAPPING,
+        )
+    parse.assert_not_called()
+    assert result['label_count'] == 3
+
+
+@pytest.mark.unit
+def test_process_label_file_combined_output(app, mock_supabase, mock_storage):
+    import zipfile
+    from services.sheet_service import _read_sheet
+    rows = ''.join(f'Loc{i},SKU{i},Name,EA\n' for i in range(45))
+    with app.app_context():
+        app.config['SHEET_OUTPUT_MODE'] = 'combined'
+        from services.label_service import process_label_file
+        result = process_label_file(
+            make_file(CSV_HEADER + rows.encode()), 'user-1', 'test.csv',
+            template_id='standard_20',
+            column_mapping=COLUMN_MAPPING,
+        )
+    assert result['sheet_count'] == 3
+    zip_buffer = mock_storage.call_args[0][2]
+    with zipfile.ZipFile(zip_buffer) as zf:
+        assert sorted(zf.namelist()) == ['sheets.pdf', 'sheets_index.json']
+        assert _read_sheet(zf, 3).startswith(b'%PDF-')
+        assert _read_sheet(zf, 4) is None
+
+
+@pytest.mark.unit
+def test_process_label_file_zpl_output(app, mock_supabase, mock_storage):
+    import zipfile
+    rows = ''.join(f'Loc{i},SKU{i},Name,EA\n' for i in range(45))
+    with app.app_context():
+        from services.label_service import process_label_file
+        result = process_label_file(
+            make_file(CSV_HEADER + rows.encode()), 'user-1', 'test.csv',
+            template_id='standard_20',
+            column_mapping=COLUMN_MAPPING,
+            output_format='zpl',
+        )
+    assert result['output_format'] == 'zpl'
+    zip_buffer = mock_storage.call_args[0][2]
+    with zipfile.ZipFile(zip_buffer) as zf:
+        assert zf.namelist() == ['labels.zpl']
+        assert zf.read('labels.zpl').count(b'^XZ') == 45
+
+
+@pytest.mark.unit
+def test_process_label_file_png_output(app, mock_supabase, mock_storage):
+    import zipfile
+    rows = ''.join(f'Loc{i},SKU{i},Name,EA\n' for i in range(25))
+    with app.app_context():
+        from services.label_service import process_label_file
+        process_label_file(
+            make_file(CSV_HEADER + rows.encode()), 'user-1', 'test.csv',
+            template_id='standard_20',
+            column_mapping=COLUMN_MAPPING,
+            output_format='png',
+            dpi=203,
+        )
+    zip_buffer = mock_storage.call_args[0][2]
+    with zipfile.ZipFile(zip_buffer) as zf:
+        assert zf.namelist() == ['sheet_001.png', 'sheet_002.png']
+        assert zf.read('sheet_001.png').startswith(b'\x89PNG')
+
+
+@pytest.mark.unit
+def test_process_label_file_reuses_identical_job(app, mock_supabase, mock_storage, mocker):
+    reused = {'storage_path': 'test-user/old-sheet/sheets_old-sheet.zip', 'zip_size': 4096,
+              'zip_index': {'sheet_001.pdf': [43, 4000, 9000, 8, 1234]}, 'label_count': 3, 'sheet_count': 1}
+    lookup = mocker.patch('services.label_service.find_job_result', return_value=reused)
+    exists = mocker.patch('services.label_service.storage_object_exists', return_value=True)
+    render = mocker.patch('services.label_service.PDFSheetGenerator.generate_pdf_sheets')
+    with app.app_context():
+        from services.label_service import process_label_file
+        result = process_label_file(make_file(), 'user-1', 'test.csv', column_mapping=COLUMN_MAPPING)
+
+    assert result['reused_result'] is True
+    assert result['storage_path'] == reused['storage_path']
+    render.assert_not_called()
+    mock_storage.assert_not_called()
+    assert lookup.call_args[0][0] == 'user-1'
+    sheet_file = mock_supabase.table.return_value.insert.call_args_list[1][0][0]
+    assert sheet_file['storage_path'] == reused['storage_path']
+    assert sheet_file['zip_index'] == reused['zip_index']
+    update = mock_supabase.table.return_value.update.call_args[0][0]
+    assert update['job_fingerprint'] == lookup.call_args[0][1]
+    exists.assert_called_once_with(reused['storage_path'])
+
+
+@pytest.mark.unit
+def test_reused_job_renders_when_its_zip_was_deleted_meanwhile(app, mock_supabase, mock_storage, mocker):
+    reused = {'storage_path': 'test-user/old-sheet/sheets_old-sheet.zip', 'zip_size': 4096,
+              'zip_index': {}, 'label_count': 3, 'sheet_count': 1}
+    mocker.patch('services.label_service.find_job_result', return_value=reused)
+    mocker.patch('services.label_service.storage_object_exists', return_value=False)
+    with app.app_context():
+        from services.label_service import process_label_file
+        result = process_label_file(make_file(), 'user-1', 'test.csv', column_mapping=COLUMN_MAPPING)
+
+    assert result['reused_result'] is False
+    assert result['storage_path'] == mock_storage.return_value['storage_path']
+    mock_storage.assert_called_once()
+    # The reference to the vanished ZIP is dropped before the fresh one is recorded
+    mock_supabase.table.return_value.delete.return_value.eq.assert_called_with('user_sheet_id', 'test-sheet-id')
+    sheet_files = [c[0][0] for c in mock_supabase.table.return_value.insert.call_args_list[1:3]]
+    assert [f['storage_path'] for f in sheet_files] == [reused['storage_path'], result['storage_path']]
+
+
+@pytest.mark.unit
+def test_process_label_file_fingerprint_tracks_output_settings(app, mock_supabase, mock_storage, mocker):
+    lookup = mocker.patch('services.label_service.find_job_result', return_value=None)
+    with app.app_context():
+        from services.label_service import process_label_file
+        process_label_file(make_file(), 'user-1', 'test.csv', column_mapping=COLUMN_MAPPING)
+        process_label_file(make_file(), 'user-1', 'test.csv', column_mapping=COLUMN_MAPPING)
+        process_label_file(make_file(), 'user-1', 'test.csv', column_mapping=COLUMN_MAPPING, output_format='zpl')
+    first, second, zpl = (c[0][1] for c in lookup.call_args_list)
+    assert first == second != zpl
+    assert mock_storage.call_count == 3
+
+
+def batch_item(content=VALID_CSV, filename='test.csv'):
+    return {'file': make_file(content, filename), 'filename': filename, 'column_mapping': COLUMN_MAPPING}
+
+
+@pytest.mark.unit
+def test_process_label_batch_records_each_file_in_order(app, mock_supabase, mock_storage):
+    events = []
+    items = [batch_item(filename='a.csv'), batch_item(CSV_HEADER, 'empty.csv'), batch_item(filename='c.csv')]
+    with app.app_context():
+        from services.label_service import process_label_batch
+        result = process_label_batch(items, 'user-1', progress=lambda stage, **data: events.append((stage, data)))
+
+    assert (result['succeeded'], result['failed']) == (2, 1)
+    assert [f['filename'] for f in result['files']] == ['a.csv', 'empty.csv', 'c.csv']
+    assert [f['success'] for f in result['files']] == [True, False, True]
+    assert result['files'][1]['error'] == 'No valid data found in file'
+    assert result['files'][0]['label_count'] == 3
+    assert mock_storage.call_count == 2
+    inserted = [c[0][0] for c in mock_supabase.table.return_value.insert.call_args_list]
+    assert [row['original_filename'] for row in inserted if 'original_filename' in row] == ['a.csv', 'c.csv']
+    done = [data for stage, data in events if stage == 'file_done']
+    assert sorted(d['file'] for d in done) == [0, 1, 2]
+    assert done[-1]['percent'] == 100
+    assert {data['file'] for stage, data in events if stage == 'parsed'} == {0, 2}
+
+
+@pytest.mark.unit
+def test_process_label_batch_overlaps_stages(app, mock_supabase, mock_storage, mocker):
+    import threading
+    import services.label_service as label_service
+
+    last_parsed = threading.Event()
+    parse = label_service.parse_label_job
+
+    def parse_and_signal(file, user_id, filename, **kwargs):
+        job = parse(file, user_id, filename, **kwargs)
+        if filename == 'c.csv':
+            last_parsed.set()
+        return job
+
+    uploads = []
+
+    def upload(*args, **kwargs):
+        # The first upload only finishes once the last file has been parsed
+        uploads.append((threading.current_thread().name, last_parsed.wait(5)))
+        return mock_storage.return_value
+
+    mocker.patch('services.label_service.parse_label_job', side_effect=parse_and_signal)
+    mock_storage.side_effect = upload
+    items = [batch_item(filename=name) for name in ('a.csv', 'b.csv', 'c.csv')]
+    with app.app_context():
+        result = label_service.process_label_batch(items, 'user-1')
+
+    assert result['succeeded'] == 3
+    assert uploads == [('batch-publish', True)] * 3
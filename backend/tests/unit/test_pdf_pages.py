@@ -0,0 +1,81 @@
+import io
+import re
+import zlib
+import base64
+import pytest
+from reportlab.pdfgen import canvas
+from utils.pdf_pages import PDFObjects, build_page_index, extract_pages, merge_documents
+
+
+def make_pdf(texts):
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    for text in texts:
+        c.drawString(72, 72, text)
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def page_texts(data):
+    """Decoded content stream of each page, in order."""
+    src = PDFObjects(data)
+    texts = []
+    for page in src.page_objects():
+        contents = int(re.search(rb'/Contents (\d+) 0 R', src.dictionary(page)).group(1))
+        body = src.body(contents)
+        length = int(re.search(rb'/Length (\d+)', body).group(1))
+        start = body.index(b'stream') + 6
+        start += 2 if body[start:start + 2] == b'\r\n' else 1
+        raw = body[start:start + length]
+        if b'ASCII85Decode' in src.dictionary(contents):
+            raw = base64.a85decode(raw, adobe=True)
+        texts.append(zlib.decompress(raw))
+    return texts
+
+
+def assert_xref_consistent(data):
+    src = PDFObjects(data)
+    for num, offset in src.offsets.items():
+        assert data[offset:].startswith(b'%d 0 obj' % num)
+
+
+@pytest.mark.unit
+def test_build_page_index_lists_pages_in_order():
+    data = make_pdf(['one', 'two', 'three'])
+    index = build_page_index(data)
+    assert len(index) == 3
+    assert index == PDFObjects(data).page_objects()
+
+
+@pytest.mark.unit
+def test_extract_single_page():
+    data = make_pdf(['one', 'two endobj stream', 'three'])
+    page = extract_pages(data, [2], build_page_index(data))
+    assert_xref_consistent(page)
+    texts = page_texts(page)
+    assert len(texts) == 1
+    assert b'two endobj stream' in texts[0]
+
+
+@pytest.mark.unit
+def test_extract_pages_shares_resources():
+    data = make_pdf(['one', 'two', 'three'])
+    out = extract_pages(data, [3, 1])
+    assert [b'three' in t for t in page_texts(out)] == [True, False]
+    assert out.count(b'/Type /Font') == 1
+
+
+@pytest.mark.unit
+def test_extract_missing_page_raises():
+    with pytest.raises(ValueError):
+        extract_pages(make_pdf(['one']), [2])
+
+
+@pytest.mark.unit
+def test_merge_documents_concatenates_pages():
+    merged = merge_documents([make_pdf(['a1', 'a2']), make_pdf(['b1'])])
+    assert_xref_consistent(merged)
+    texts = page_texts(merged)
+    assert len(texts) == 3
+    assert all(name in text for name, text in zip([b'a1', b'a2', b'b1'], texts))
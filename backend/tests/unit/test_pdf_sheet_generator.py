@@ -12,43 +12,39 @@ SAMPLE_LABELS = [
 ]
 
 
-def make_generator(template_id='standard_20', sheet_folder='/tmp/test_sheets'):
-    os.makedirs(sheet_folder, exist_ok=True)
+def make_generator(template_id='standard_20'):
     template = Config.LABEL_TEMPLATES[template_id]
-    return PDFSheetGenerator(sheet_folder, template)
+    return PDFSheetGenerator(template)
 
 
 @pytest.mark.unit
-def test_generate_pdf_sheets_single_label_returns_one_file(tmp_path):
-    gen = PDFSheetGenerator(str(tmp_path), Config.LABEL_TEMPLATES['standard_20'])
-    files = gen.generate_pdf_sheets([('SKU001', [('Loc', 'A-01')])])
-    assert len(files) == 1
+def test_generate_pdf_sheets_single_label_returns_one_sheet():
+    gen = make_generator()
+    sheets = list(gen.generate_pdf_sheets([('SKU001', [('Loc', 'A-01')])]))
+    assert len(sheets) == 1
 
 
 @pytest.mark.unit
-def test_generate_pdf_sheets_paginates_correctly(tmp_path):
-    gen = PDFSheetGenerator(str(tmp_path), Config.LABEL_TEMPLATES['standard_20'])
+def test_generate_pdf_sheets_paginates_correctly():
+    gen = make_generator()
     labels_per_sheet = gen.rows * gen.columns
     labels = [(f'SKU{i:03d}', []) for i in range(labels_per_sheet + 1)]
-    files = gen.generate_pdf_sheets(labels)
-    assert len(files) == 2
+    sheets = list(gen.generate_pdf_sheets(labels))
+    assert len(sheets) == 2
 
 
 @pytest.mark.unit
-def test_generated_pdf_has_valid_header(tmp_path):
-    gen = PDFSheetGenerator(str(tmp_path), Config.LABEL_TEMPLATES['standard_20'])
-    files = gen.generate_pdf_sheets([('SKU001', [])])
-    pdf_path = os.path.join(str(tmp_path), files[0])
-    with open(pdf_path, 'rb') as f:
-        header = f.read(4)
-    assert header == b'%PDF'
+def test_generated_pdf_has_valid_header():
+    gen = make_generator()
+    sheets = list(gen.generate_pdf_sheets([('SKU001', [])]))
+    assert sheets[0][:4] == b'%PDF'
 
 
 @pytest.mark.unit
 @pytest.mark.parametrize('template_id', TEMPLATE_IDS)
 def test_labels_per_sheet_matches_template(template_id):
     template = Config.LABEL_TEMPLATES[template_id]
-    gen = PDFSheetGenerator('/tmp/test_sheets', template)
+    gen = PDFSheetGenerator(template)
     expected = template['rows'] * template['columns']
     assert gen.rows * gen.columns == expected
 
@@ -94,9 +90,113 @@ def test_preview_calibrates_from_all_labels():
 
 
 @pytest.mark.unit
-def test_sheet_files_cleaned_up_in_tmp(tmp_path):
-    gen = PDFSheetGenerator(str(tmp_path), Config.LABEL_TEMPLATES['standard_20'])
-    files = gen.generate_pdf_sheets([('SKU001', [])])
-    for f in files:
-        full_path = os.path.join(str(tmp_path), f)
-        assert os.path.exists(full_path)
+def test_generate_pdf_sheets_writes_nothing_to_disk(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    gen = make_generator()
+    sheets = list(gen.generate_pdf_sheets([(f'SKU{i:03d}', []) for i in range(45)]))
+    assert len(sheets) == 3
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.unit
+def test_paginate_regroups_chunks_into_full_pages():
+    gen = make_generator('standard_20')
+    labels_per_sheet = gen.rows * gen.columns
+    chunks = [[(f'SKU{i}', [])] * 7 for i in range(6)]
+    pages = list(gen.paginate(chunks))
+    assert [len(p) for p in pages] == [labels_per_sheet, labels_per_sheet, 42 - 2 * labels_per_sheet]
+
+
+@pytest.mark.unit
+def test_streaming_sheets_match_list_sheet_count():
+    gen = make_generator()
+    labels = [(f'SKU{i:03d}', []) for i in range(45)]
+    chunks = iter([labels[:13], labels[13:30], labels[30:]])
+    sheets = list(gen.generate_pdf_sheets_streaming(chunks, longest_value=6))
+    assert len(sheets) == len(list(gen.generate_pdf_sheets(labels)))
+
+
+@pytest.mark.unit
+def test_generate_pdf_document_returns_bytes_with_page_index():
+    gen = make_generator()
+    labels_per_sheet = gen.rows * gen.columns
+    labels = [(f'SKU{i:03d}', [('Loc', 'A')]) for i in range(labels_per_sheet * 2 + 1)]
+    document, page_index = gen.generate_pdf_document(labels)
+    assert len(page_index) == 3
+    assert document[:5] == b'%PDF-'
+
+
+@pytest.mark.unit
+def test_parallel_render_matches_sequential_order():
+    from utils.pdf_pages import PDFObjects
+    template = Config.LABEL_TEMPLATES['standard_20']
+    labels = [(f'SKU{i:03d}', [('Loc', f'A-{i}')]) for i in range(20 * 25 + 3)]
+
+    sequential = PDFSheetGenerator(template)
+    parallel = PDFSheetGenerator(template, workers=2)
+    parallel.PAGES_PER_TASK = 4
+
+    seq_sheets = list(sequential.generate_pdf_sheets(labels))
+    par_sheets = list(parallel.generate_pdf_sheets(labels))
+    assert len(par_sheets) == len(seq_sheets) == 26
+    for seq, par in zip(seq_sheets, par_sheets):
+        seq_pdf, par_pdf = PDFObjects(seq), PDFObjects(par)
+        assert seq_pdf.body(max(seq_pdf.offsets)) == par_pdf.body(max(par_pdf.offsets))
+
+    _, seq_index = sequential.generate_pdf_document(labels)
+    _, par_index = parallel.generate_pdf_document(labels)
+    assert len(seq_index) == len(par_index) == 26
+
+
+@pytest.mark.unit
+def test_parallel_render_reuses_one_pool_without_forking():
+    import utils.PDFSheetGenerator as pdf_module
+    template = Config.LABEL_TEMPLATES['standard_20']
+    labels = [(f'SKU{i:03d}', []) for i in range(20 * 3)]
+    generator = PDFSheetGenerator(template, workers=2)
+    generator.PAGES_PER_TASK = 1
+
+    list(generator.generate_pdf_sheets(labels))
+    pool = pdf_module._render_pools[2]
+    list(generator.generate_pdf_sheets(labels))
+    assert pdf_module._render_pools[2] is pool
+    assert pool._mp_context.get_start_method() != 'fork'
+
+
+@pytest.mark.unit
+def test_page_compression_can_be_turned_off():
+    labels = [(f'SKU{i:03d}', [('Loc', 'A')]) for i in range(5)]
+    compressed = next(make_generator().generate_pdf_sheets(labels))
+    plain = next(PDFSheetGenerator(Config.LABEL_TEMPLATES['standard_20'], page_compression=False).generate_pdf_sheets(labels))
+    assert b'/FlateDecode' in compressed
+    assert b'/FlateDecode' not in plain
+    assert b'(Loc: A) Tj' in plain
+
+
+@pytest.mark.unit
+def test_binary_streams_leave_reportlab_global_alone():
+    from reportlab import rl_config
+    before = rl_config.useA85
+    rl_config.useA85 = 1
+    try:
+        sheet = next(make_generator().generate_pdf_sheets(SAMPLE_LABELS))
+        assert rl_config.useA85 == 1
+    finally:
+        rl_config.useA85 = before
+    assert b'/FlateDecode' in sheet
+    assert b'ASCII85Decode' not in sheet
+
+
+@pytest.mark.unit
+def test_binary_streams_hold_for_concurrent_saves():
+    from concurrent.futures import ThreadPoolExecutor
+    from reportlab import rl_config
+    before = rl_config.useA85
+    rl_config.useA85 = 1
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            sheets = list(pool.map(lambda _: next(make_generator().generate_pdf_sheets(SAMPLE_LABELS)), range(32)))
+        assert rl_config.useA85 == 1
+    finally:
+        rl_config.useA85 = before
+    assert not any(b'ASCII85Decode' in sheet for sheet in sheets)
@@ -0,0 +1,89 @@
+import io
+import numpy as np
+import pytest
+from PIL import Image
+from config.settings import Config
+from utils.RasterSheetGenerator import RasterSheetGenerator
+
+TEMPLATE_IDS = ['standard_20', '5163', '5160', '94233']
+
+SAMPLE_LABELS = [
+    ('SKU001', [('Location', 'A-01'), ('Unit', 'EA')]),
+    ('SKU002', [('Location', 'A-02'), ('Unit', 'PK')]),
+]
+
+
+def make_generator(template_id='standard_20', dpi=203, mode='1'):
+    return RasterSheetGenerator(Config.LABEL_TEMPLATES[template_id], dpi=dpi, mode=mode)
+
+
+def open_image(data):
+    return Image.open(io.BytesIO(data))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('dpi', [203, 300, 600])
+def test_sheet_is_letter_size_at_dpi(dpi):
+    image = open_image(next(make_generator(dpi=dpi).generate_sheets(SAMPLE_LABELS)))
+    assert image.size == (round(8.5 * dpi), 11 * dpi)
+    assert image.mode == '1'
+    assert round(image.info['dpi'][0]) == dpi
+
+
+@pytest.mark.unit
+def test_paginates_by_template():
+    gen = make_generator()
+    labels = [(f'SKU{i:03d}', []) for i in range(gen.rows * gen.columns + 1)]
+    assert len(list(gen.generate_sheets(labels))) == 2
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('template_id', TEMPLATE_IDS)
+@pytest.mark.parametrize('barcode_type', ['code128', 'qr'])
+def test_ink_stays_inside_label_positions(template_id, barcode_type):
+    gen = make_generator(template_id, mode='L')
+    image = open_image(next(gen.generate_sheets(SAMPLE_LABELS[:1], barcode_type=barcode_type)))
+    ink = np.argwhere(np.asarray(image) < 128)
+    x, y = gen.origins[0]
+    assert len(ink)
+    assert ink[:, 0].min() >= y and ink[:, 0].max() < y + gen.label_height
+    assert ink[:, 1].min() >= x and ink[:, 1].max() < x + gen.label_width
+
+
+@pytest.mark.unit
+def test_code128_bars_follow_pattern():
+    from utils.BarcodeGenerator import code128_pattern
+    gen = make_generator()
+    image = open_image(next(gen.generate_sheets([('SKU001', [])])))
+    x, y = gen.origins[0]
+    row = np.asarray(image)[y + gen.barcode_bottom - 1, x:x + gen.label_width]
+    dark = np.flatnonzero(~row)
+    runs = np.diff(np.concatenate(([True], row[dark[0]:dark[-1] + 1], [True])).astype(np.int8))
+    module_px = gen._code128_module(len('SKU001'))
+    widths = np.diff(np.flatnonzero(runs != 0))
+    assert list(widths // module_px) == list(code128_pattern('SKU001'))[:len(widths)]
+
+
+@pytest.mark.unit
+def test_tiff_output_uses_group4():
+    image = open_image(next(make_generator().generate_sheets(SAMPLE_LABELS, image_format='tiff')))
+    assert image.format == 'TIFF'
+    assert image.info['compression'] == 'group4'
+
+
+@pytest.mark.unit
+def test_streaming_matches_list_output():
+    gen = make_generator()
+    labels = [(f'SKU{i:03d}', [('Loc', f'A-{i}')]) for i in range(45)]
+    chunks = iter([labels[:13], labels[13:]])
+    assert list(gen.generate_sheets_streaming(chunks, longest_value=6)) == list(gen.generate_sheets(labels))
+
+
+@pytest.mark.unit
+def test_rejects_unsupported_settings():
+    with pytest.raises(ValueError):
+        make_generator(dpi=72)
+    with pytest.raises(ValueError):
+        make_generator(mode='RGB')
+    with pytest.raises(ValueError):
+        list(make_generator().generate_sheets(SAMPLE_LABELS, image_format='bmp'))
@@ -0,0 +1,51 @@
+import hashlib
+import io
+import pytest
+from utils.file_utils import ScannedSpool
+from utils.security import UploadScan, get_upload_scan
+
+CSV = b'Location,Barcode\n' + b'Aisle-01,SKU001\n' * 200
+
+
+@pytest.mark.unit
+def test_scan_collects_size_hash_and_header():
+    scan = UploadScan.from_stream(io.BytesIO(CSV))
+    assert scan.size == len(CSV)
+    assert scan.sha256 == hashlib.sha256(CSV).hexdigest()
+    assert scan.header == CSV[:1024]
+    assert not scan.suspicious
+
+
+@pytest.mark.unit
+def test_scan_finds_pattern_split_across_blocks():
+    scan = UploadScan()
+    scan.update(CSV + b'<scr')
+    scan.update(b'IPT>alert(1)')
+    assert scan.suspicious
+
+
+@pytest.mark.unit
+def test_from_stream_rewinds():
+    stream = io.BytesIO(CSV)
+    stream.read(10)
+    UploadScan.from_stream(stream)
+    assert stream.tell() == 0
+
+
+@pytest.mark.unit
+def test_spool_scans_while_written():
+    spool = ScannedSpool(max_size=64)
+    for i in range(0, len(CSV), 100):
+        spool.write(CSV[i:i + 100])
+    spool.seek(0)
+    assert get_upload_scan(spool).sha256 == hashlib.sha256(CSV).hexdigest()
+
+
+@pytest.mark.unit
+def test_spool_drops_scan_after_rewrite():
+    spool = ScannedSpool(max_size=64)
+    spool.write(CSV)
+    spool.seek(0)
+    spool.write(b'<?php')
+    spool.seek(0)
+    assert get_upload_scan(spool).suspicious
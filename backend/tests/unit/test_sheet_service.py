@@ -0,0 +1,134 @@
+import pytest
+
+
+def sheet_owned_by(mock_supabase, user_id, storage_paths):
+    table = mock_supabase.table.return_value
+    table.select.return_value.eq.return_value.maybe_single.return_value.execute.return_value.data = {'user_id': user_id}
+    table.select.return_value.eq.return_value.execute.return_value.data = [
+        {'storage_path': path} for path in storage_paths
+    ]
+
+
+@pytest.mark.unit
+def test_delete_user_sheet_removes_unshared_zip(app, mock_supabase, mocker):
+    sheet_owned_by(mock_supabase, 'user-1', ['user-1/s1/sheets_s1.zip'])
+    mocker.patch('services.sheet_service.count_storage_references', return_value=0)
+    with app.app_context():
+        from services.sheet_service import delete_user_sheet
+        delete_user_sheet('s1', 'user-1')
+    mock_supabase.storage.from_.return_value.remove.assert_called_once_with(['user-1/s1/sheets_s1.zip'])
+
+
+@pytest.mark.unit
+def test_delete_user_sheet_keeps_zip_shared_with_reused_job(app, mock_supabase, mocker):
+    sheet_owned_by(mock_supabase, 'user-1', ['user-1/s0/sheets_s0.zip'])
+    refs = mocker.patch('services.sheet_service.count_storage_references', return_value=1)
+    with app.app_context():
+        from services.sheet_service import delete_user_sheet
+        delete_user_sheet('s1', 'user-1')
+    refs.assert_called_once_with('user-1/s0/sheets_s0.zip', excluding_user_sheet_id='s1')
+    mock_supabase.storage.from_.return_value.remove.assert_not_called()
+    mock_supabase.table.return_value.delete.return_value.eq.assert_called_with('id', 's1')
+
+
+@pytest.mark.unit
+def test_delete_user_sheet_rejects_other_users(app, mock_supabase):
+    sheet_owned_by(mock_supabase, 'someone-else', [])
+    with app.app_context():
+        from services.sheet_service import delete_user_sheet
+        with pytest.raises(PermissionError):
+            delete_user_sheet('s1', 'user-1')
+
+
+STORED_PATH = 'user-1/s1/sheets_s1.zip'
+
+
+@pytest.fixture
+def stored_job(app, mock_supabase, storage_server, mocker):
+    """A 500-sheet job's ZIP behind a local Range server, with its sheet_files row."""
+    import os
+    from services.storage_service import create_zip_from_sheets, zip_entry_index
+    sheets = [b'%%PDF-1.4 sheet %d ' % n + os.urandom(8000) for n in range(1, 501)]
+    zip_buffer = create_zip_from_sheets(sheets, 'fast')
+    row = {
+        'storage_path': STORED_PATH, 'filename': 'sheets_s1.zip', 'sheet_number': 0,
+        'zip_index': zip_entry_index(zip_buffer),
+        'user_sheets': {'user_id': 'user-1', 'original_filename': 'big.csv', 'sheet_count': 500},
+    }
+    mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [row]
+    mocker.patch('services.sheet_service.get_cached_zip', return_value=None)
+    mocker.patch('services.sheet_service.cache_zip')
+    storage_server.objects[STORED_PATH] = zip_buffer.getvalue()
+    yield storage_server, sheets, row
+
+
+@pytest.mark.unit
+def test_single_sheet_is_read_with_one_range_request(app, mock_supabase, stored_job):
+    storage, sheets, _ = stored_job
+    with app.app_context():
+        from services.sheet_service import extract_single_sheet
+        pdf_buffer, filename, mimetype = extract_single_sheet('s1', 'user-1', 3)
+    assert pdf_buffer.read() == sheets[2]
+    assert (filename, mimetype) == ('big_sheet_3.pdf', 'application/pdf')
+    assert len(storage.ranges) == 1
+    assert storage.bytes_served < 10_000 < len(storage.objects[STORED_PATH]) // 100
+    mock_supabase.storage.from_.return_value.download.assert_not_called()
+
+
+@pytest.mark.unit
+def test_selected_sheets_coalesce_nearby_ranges(app, stored_job):
+    import zipfile
+    storage, sheets, _ = stored_job
+    with app.app_context():
+        from services.sheet_service import extract_selected_sheets
+        zip_buffer, _ = extract_selected_sheets('s1', 'user-1', [5, 4, 400, 6])
+    with zipfile.ZipFile(zip_buffer) as zf:
+        assert zf.namelist() == ['sheet_004.pdf', 'sheet_005.pdf', 'sheet_006.pdf', 'sheet_400.pdf']
+        assert zf.read('sheet_400.pdf') == sheets[399]
+    assert len(storage.ranges) == 2
+    assert storage.bytes_served < 5 * 10_000
+
+
+@pytest.mark.unit
+def test_sheet_without_index_falls_back_to_whole_zip(app, mock_supabase, stored_job):
+    storage, sheets, row = stored_job
+    row['zip_index'] = None
+    mock_supabase.storage.from_.return_value.download.return_value = storage.objects[STORED_PATH]
+    with app.app_context():
+        from services.sheet_service import extract_single_sheet
+        pdf_buffer, _, _ = extract_single_sheet('s1', 'user-1', 3)
+    assert pdf_buffer.read() == sheets[2]
+    assert storage.ranges == []
+    mock_supabase.storage.from_.return_value.download.assert_called_once_with(STORED_PATH)
+
+
+@pytest.mark.unit
+def test_failed_range_read_falls_back_to_whole_zip(app, mock_supabase, stored_job):
+    storage, sheets, _ = stored_job
+    storage.objects[STORED_PATH + '.moved'] = storage.objects.pop(STORED_PATH)
+    mock_supabase.storage.from_.return_value.download.return_value = storage.objects[STORED_PATH + '.moved']
+    with app.app_context():
+        from services.sheet_service import extract_single_sheet
+        pdf_buffer, _, _ = extract_single_sheet('s1', 'user-1', 3)
+    assert pdf_buffer.read() == sheets[2]
+
+
+@pytest.mark.unit
+def test_image_sheets_use_the_jobs_extension(app, mock_supabase, stored_job):
+    import zipfile
+    from services.storage_service import create_zip_from_sheets, zip_entry_index
+    storage, _, row = stored_job
+    images = [b'\x89PNG image %d' % n for n in range(1, 4)]
+    zip_buffer = create_zip_from_sheets(images, 'fast', extension='png')
+    storage.objects[STORED_PATH] = zip_buffer.getvalue()
+    row['zip_index'] = zip_entry_index(zip_buffer)
+    row['user_sheets'].update(sheet_count=3, output_format='png')
+    with app.app_context():
+        from services.sheet_service import extract_single_sheet, extract_selected_sheets
+        image_buffer, filename, mimetype = extract_single_sheet('s1', 'user-1', 2)
+        selected, _ = extract_selected_sheets('s1', 'user-1', [1, 3])
+    assert image_buffer.read() == images[1]
+    assert (filename, mimetype) == ('big_sheet_2.png', 'image/png')
+    with zipfile.ZipFile(selected) as zf:
+        assert zf.namelist() == ['sheet_001.png', 'sheet_003.png']
+    mock_supabase.storage.from_.return_value.download.assert_not_called()
@@ -0,0 +1,94 @@
+import os
+import zipfile
+import pytest
+from services.storage_service import (
+    COMBINED_PDF_NAME,
+    create_zip_from_document,
+    create_zip_from_sheets,
+    inflate_zip_entry,
+    pdf_page_compression,
+    storage_object_exists,
+    zip_entry_index,
+)
+
+PDF_LIKE = b'%PDF-1.4\n' + b'1 0 obj\n<< /Type /Page >>\nendobj\n' * 200
+
+
+def entry_types(zip_buffer):
+    with zipfile.ZipFile(zip_buffer) as zf:
+        return [info.compress_type for info in zf.infolist()]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('policy, expected', [
+    ('store', zipfile.ZIP_STORED),
+    ('fast', zipfile.ZIP_DEFLATED),
+    ('max', zipfile.ZIP_DEFLATED),
+    ('adaptive', zipfile.ZIP_DEFLATED),
+])
+def test_sheet_zip_policy_picks_compression(policy, expected):
+    zip_buffer = create_zip_from_sheets(iter([PDF_LIKE, PDF_LIKE]), policy)
+    assert entry_types(zip_buffer) == [expected, expected]
+    with zipfile.ZipFile(zip_buffer) as zf:
+        assert zf.read('sheet_002.pdf') == PDF_LIKE
+
+
+@pytest.mark.unit
+def test_adaptive_policy_stores_incompressible_sheets():
+    noise = os.urandom(64 * 1024)
+    zip_buffer = create_zip_from_sheets([noise, PDF_LIKE], 'adaptive')
+    # Decided once, from the first sheet
+    assert entry_types(zip_buffer) == [zipfile.ZIP_STORED, zipfile.ZIP_STORED]
+
+
+@pytest.mark.unit
+def test_document_zip_keeps_pdf_and_index():
+    zip_buffer = create_zip_from_document(PDF_LIKE, [3, 7], 'store')
+    with zipfile.ZipFile(zip_buffer) as zf:
+        assert zf.getinfo(COMBINED_PDF_NAME).compress_type == zipfile.ZIP_STORED
+        assert zf.read(COMBINED_PDF_NAME) == PDF_LIKE
+
+
+@pytest.mark.unit
+def test_only_max_policy_turns_off_page_compression():
+    assert [pdf_page_compression(p) for p in ('store', 'fast', 'max', 'adaptive')] == [True, True, False, True]
+
+
+@pytest.mark.unit
+def test_unknown_policy_raises():
+    with pytest.raises(ValueError):
+        create_zip_from_sheets([PDF_LIKE], 'brotli')
+    with pytest.raises(ValueError):
+        pdf_page_compression('brotli')
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('policy', ['store', 'fast'])
+def test_zip_entry_index_locates_every_entry(policy):
+    sheets = [PDF_LIKE, os.urandom(5000), PDF_LIKE[::-1]]
+    zip_buffer = create_zip_from_sheets(sheets, policy)
+    index = zip_entry_index(zip_buffer)
+    data = zip_buffer.getvalue()
+    assert list(index) == ['sheet_001.pdf', 'sheet_002.pdf', 'sheet_003.pdf']
+    for sheet, entry in zip(sheets, index.values()):
+        offset, size = entry[:2]
+        assert inflate_zip_entry(data[offset:offset + size], entry) == sheet
+    assert zip_buffer.tell() == 0
+
+
+@pytest.mark.unit
+def test_inflate_zip_entry_checks_crc():
+    zip_buffer = create_zip_from_sheets([PDF_LIKE], 'store')
+    entry = zip_entry_index(zip_buffer)['sheet_001.pdf']
+    raw = bytearray(zip_buffer.getvalue()[entry[0]:entry[0] + entry[1]])
+    raw[-1] ^= 0xFF
+    with pytest.raises(ValueError, match='corrupt'):
+        inflate_zip_entry(bytes(raw), entry)
+
+
+@pytest.mark.unit
+def test_storage_object_exists_asks_storage(app, storage_server):
+    storage_server.objects['u/s/sheets_s.zip'] = b'PK\x03\x04zip'
+    with app.app_context():
+        assert storage_object_exists('u/s/sheets_s.zip')
+        assert not storage_object_exists('u/s/missing.zip')
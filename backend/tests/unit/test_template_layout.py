@@ -0,0 +1,98 @@
+import pickle
+import pytest
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.units import inch
+from config.settings import Config
+from utils.TemplateLayout import TemplateLayout, compile_template, compile_templates, layout_for
+
+TEMPLATE_IDS = ['standard_20', '5163', '5160', '94233']
+
+
+def template_with(**overrides):
+    return {**Config.LABEL_TEMPLATES['standard_20'], **overrides}
+
+
+@pytest.mark.unit
+def test_compile_templates_covers_every_template():
+    layouts = compile_templates(Config.LABEL_TEMPLATES)
+    assert set(layouts) == set(Config.LABEL_TEMPLATES)
+    assert all(isinstance(layout, TemplateLayout) for layout in layouts.values())
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('template_id', TEMPLATE_IDS)
+def test_origins_follow_template_grid(template_id):
+    t = Config.LABEL_TEMPLATES[template_id]
+    layout = compile_template(t, template_id)
+    assert len(layout.origins) == layout.labels_per_sheet == t['rows'] * t['columns']
+    for slot, (x, y) in enumerate(layout.origins):
+        row, col = divmod(slot, t['columns'])
+        assert x == pytest.approx((t['margin_left_inches'] + col * (t['label_width_inches'] + t['x_gap_inches'])) * inch)
+        top = (t['margin_top_inches'] + row * (t['label_height_inches'] + t['y_gap_inches'])) * inch
+        assert y == pytest.approx(LETTER[1] - top - t['label_height_inches'] * inch)
+
+
+@pytest.mark.unit
+def test_pixel_origins_are_top_left():
+    layout = compile_template(Config.LABEL_TEMPLATES['standard_20'])
+    assert layout.pixel_origins(300)[0] == (120, 120)
+    assert layout.pixel_origins(300)[1] == (120 + 600, 120)
+
+
+@pytest.mark.unit
+def test_layout_is_immutable_and_picklable():
+    layout = compile_template(Config.LABEL_TEMPLATES['standard_20'])
+    with pytest.raises(AttributeError):
+        layout.rows = 1
+    restored = pickle.loads(pickle.dumps(layout))
+    assert restored.origins == layout.origins
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('overrides, message', [
+    ({'rows': 0}, 'rows must be a positive integer'),
+    ({'columns': 2.5}, 'columns must be a positive integer'),
+    ({'label_width_inches': -1}, 'label_width_inches must be a positive number'),
+    ({'x_gap_inches': 'wide'}, 'x_gap_inches must be a non-negative number'),
+    ({'font': 'Comic Sans'}, "unknown font 'Comic Sans'"),
+    ({'padding_x_inches': 1.0}, 'leaves no room for the barcode'),
+    ({'barcode_offset_y_inches': 1.5}, 'barcode extends past the top of the label'),
+    ({'columns': 5}, 'columns end'),
+    ({'rows': 6}, 'rows end'),
+])
+def test_invalid_templates_are_rejected(overrides, message):
+    with pytest.raises(ValueError, match="Invalid label template 'bad'") as excinfo:
+        compile_templates({'bad': template_with(**overrides)})
+    assert message in str(excinfo.value)
+
+
+@pytest.mark.unit
+def test_missing_keys_are_named():
+    template = template_with()
+    del template['rows']
+    with pytest.raises(ValueError, match='missing rows'):
+        compile_template(template)
+
+
+@pytest.mark.unit
+def test_layout_for_accepts_layouts_dicts_and_default():
+    layout = compile_template(Config.LABEL_TEMPLATES['5160'])
+    assert layout_for(layout) is layout
+    assert layout_for(Config.LABEL_TEMPLATES['5160']).origins == layout.origins
+    assert layout_for(None).labels_per_sheet == 20
+
+
+@pytest.mark.unit
+def test_app_startup_fails_on_bad_template(monkeypatch):
+    from app import create_app
+    from config.settings import TestingConfig
+    monkeypatch.setattr(TestingConfig, 'LABEL_TEMPLATES', {
+        **Config.LABEL_TEMPLATES, 'broken': template_with(rows=0),
+    })
+    with pytest.raises(ValueError, match="Invalid label template 'broken'"):
+        create_app('testing')
+
+
+@pytest.mark.unit
+def test_app_exposes_compiled_layouts(app):
+    assert set(app.config['LABEL_LAYOUTS']) == set(app.config['LABEL_TEMPLATES'])
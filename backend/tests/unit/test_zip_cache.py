@@ -0,0 +1,191 @@
+import os
+import pytest
+from services.zip_cache import DiskTier, FrequencySketch, MemoryTier, ZipCache, create_zip_cache
+
+
+class NoRedis:
+    """Redis tier stand-in that holds nothing."""
+    name = 'redis'
+
+    def __init__(self):
+        self.puts = []
+
+    def get(self, key):
+        return None
+
+    def stream(self, key, chunk_size):
+        return None
+
+    def put(self, key, data):
+        self.puts.append(key)
+        return True
+
+    def invalidate(self, key):
+        pass
+
+    def stats(self):
+        return {}
+
+
+def hot(sketch, key, times=3):
+    for _ in range(times):
+        sketch.record(key)
+
+
+@pytest.mark.unit
+def test_sketch_counts_and_ages():
+    sketch = FrequencySketch(width=64, depth=4)
+    hot(sketch, 'a', 8)
+    sketch.record('b')
+    assert sketch.estimate('a') == 8
+    assert sketch.estimate('b') == 1
+    # The sample_size-th record halves every counter
+    for i in range(sketch.sample_size - 9):
+        sketch.record('b')
+    assert sketch.estimate('a') == 4
+    assert sketch.estimate('b') == min(15, sketch.sample_size - 8) // 2
+
+
+@pytest.mark.unit
+def test_memory_tier_evicts_least_recently_used_by_bytes():
+    sketch = FrequencySketch()
+    tier = MemoryTier(100, sketch)
+    assert tier.put('a', b'a' * 40) and tier.put('b', b'b' * 40)
+    assert tier.get('a') == b'a' * 40  # 'b' is now least recently used
+    assert tier.put('c', b'c' * 40)
+    assert tier.get('b') is None
+    assert tier.get('c') == b'c' * 40
+    assert tier.stats() == {'hits': 2, 'misses': 1, 'evictions': 1, 'rejections': 0,
+                            'entries': 2, 'bytes': 80, 'max_bytes': 100}
+
+
+@pytest.mark.unit
+def test_admission_keeps_hot_entries_from_one_off_large_zip():
+    sketch = FrequencySketch()
+    tier = MemoryTier(100, sketch)
+    for key in ('hot-1', 'hot-2'):
+        hot(sketch, key)
+        tier.put(key, b'x' * 45)
+    sketch.record('one-off')
+    assert not tier.put('one-off', b'y' * 90)
+    assert tier.get('hot-1') and tier.get('hot-2')
+    assert tier.stats()['rejections'] == 1
+    # Larger than the whole tier is never admitted
+    hot(sketch, 'huge', 10)
+    assert not tier.put('huge', b'z' * 101)
+    # As hot as what it would displace, it gets in
+    hot(sketch, 'one-off', 3)
+    assert tier.put('one-off', b'y' * 90)
+    assert tier.stats()['evictions'] == 2
+
+
+@pytest.mark.unit
+def test_disk_tier_persists_and_evicts_files(tmp_path):
+    sketch = FrequencySketch()
+    tier = DiskTier(str(tmp_path), 100, sketch)
+    assert tier.put('sheet-a', b'a' * 60)
+    assert tier.get('sheet-a') == b'a' * 60
+
+    reopened = DiskTier(str(tmp_path), 100, FrequencySketch())
+    assert reopened.size_of('sheet-a') == 60
+    assert reopened.put('sheet-b', b'b' * 60)
+    assert not (tmp_path / 'sheet-a.zip').exists()
+    assert reopened.get('sheet-b') == b'b' * 60
+    assert reopened.stats()['evictions'] == 1
+    assert [p.name for p in tmp_path.iterdir()] == ['sheet-b.zip']
+
+
+@pytest.mark.unit
+def test_disk_budget_covers_every_process_sharing_the_directory(tmp_path):
+    # Two processes' tiers over one directory, each having loaded it empty
+    first = DiskTier(str(tmp_path), 100, FrequencySketch())
+    second = DiskTier(str(tmp_path), 100, FrequencySketch())
+    assert first.size_of('sheet-a') is None and second.size_of('sheet-b') is None
+    assert first.put('sheet-a', b'a' * 60)
+    assert second.put('sheet-b', b'b' * 60)
+    assert [p.name for p in tmp_path.iterdir()] == ['sheet-b.zip']
+    assert second.stats()['bytes'] == 60
+
+
+@pytest.mark.unit
+def test_disk_tier_refuses_unsafe_keys(tmp_path):
+    tier = DiskTier(str(tmp_path / 'cache'), 100, FrequencySketch())
+    assert not tier.put('../escape', b'x')
+    assert not (tmp_path / 'escape.zip').exists()
+
+
+@pytest.mark.unit
+def test_disk_write_through_spools_without_buffering(tmp_path):
+    tier = DiskTier(str(tmp_path), 1000, FrequencySketch())
+    chunks = tier.write_through('s1', 9, iter([b'abc', b'def', b'ghi']))
+    assert next(chunks) == b'abc'
+    assert tier.size_of('s1') is None
+    assert list(chunks) == [b'def', b'ghi']
+    assert tier.get('s1') == b'abcdefghi'
+
+    # A download cut short leaves nothing behind
+    partial = tier.write_through('s2', 9, iter([b'abc', b'def', b'ghi']))
+    next(partial)
+    partial.close()
+    assert tier.size_of('s2') is None
+    assert sorted(os.listdir(tmp_path)) == ['s1.zip']
+
+
+@pytest.mark.unit
+def test_lookups_fall_through_tiers_and_promote(tmp_path):
+    sketch = FrequencySketch()
+    cache = ZipCache(MemoryTier(1000, sketch), DiskTier(str(tmp_path), 1000, sketch), NoRedis(), sketch)
+    cache.disk.put('s1', b'zip-bytes')
+    assert cache.get('s1') == b'zip-bytes'
+    assert cache.memory.stats()['misses'] == 1 and cache.disk.stats()['hits'] == 1
+    assert cache.get('s1') == b'zip-bytes'
+    assert cache.memory.stats()['hits'] == 1
+
+    cache.invalidate('s1')
+    assert cache.get('s1') is None
+    assert not (tmp_path / 's1.zip').exists()
+
+
+@pytest.mark.unit
+def test_stream_reads_disk_in_chunks_when_memory_will_not_take_it(tmp_path):
+    sketch = FrequencySketch()
+    cache = ZipCache(MemoryTier(4, sketch), DiskTier(str(tmp_path), 1000, sketch), NoRedis(), sketch)
+    cache.disk.put('s1', b'0123456789')
+    size, chunks = cache.stream('s1', 4)
+    assert size == 10
+    assert list(chunks) == [b'0123', b'4567', b'89']
+    assert cache.memory.stats()['entries'] == 0
+    assert cache.stream('missing', 4) is None
+
+
+@pytest.mark.unit
+def test_cache_through_fills_every_tier(tmp_path):
+    cache = create_zip_cache(str(tmp_path), 1000, 1000)
+    cache.redis = NoRedis()
+    assert b''.join(cache.cache_through('s1', 6, iter([b'abc', b'def']))) == b'abcdef'
+    assert cache.memory.get('s1') == b'abcdef'
+    assert cache.disk.get('s1') == b'abcdef'
+    assert cache.redis.puts == ['s1']
+    assert set(cache.stats()) == {'memory', 'disk', 'redis'}
+
+
+@pytest.mark.unit
+def test_job_worker_cache_writes_only_to_redis(tmp_path):
+    cache = create_zip_cache(str(tmp_path), 1000, 1000, local_writes=False)
+    cache.redis = NoRedis()
+    cache.put('s1', b'abcdef')
+    assert cache.redis.puts == ['s1']
+    assert cache.memory.stats()['entries'] == 0
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.unit
+def test_init_zip_cache_reads_app_config(tmp_path, monkeypatch):
+    from flask import Flask
+    import services.zip_cache as zc
+    app = Flask(__name__)
+    app.config.update(ZIP_DISK_CACHE_DIR=str(tmp_path), ZIP_MEMORY_CACHE_MAX_BYTES=10, ZIP_DISK_CACHE_MAX_BYTES=20)
+    monkeypatch.setattr(zc, '_cache', None)
+    zc.init_zip_cache(app, local_writes=False)
+    assert (zc._cache.disk.directory, zc._cache.memory.max_bytes, zc._cache.disk.max_bytes) == (str(tmp_path), 10, 20)
+    assert not zc._cache.local_writes
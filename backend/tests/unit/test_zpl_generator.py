@@ -0,0 +1,75 @@
+import re
+import pytest
+from config.settings import Config
+from utils.ZPLGenerator import ZPLGenerator
+
+TEMPLATE_IDS = ['standard_20', '5163', '5160', '94233']
+
+SAMPLE_LABELS = [
+    ('SKU001', [('Location', 'A-01'), ('Unit', 'EA')]),
+    ('SKU002', [('Location', 'A-02'), ('Unit', 'PK')]),
+]
+
+
+def make_generator(template_id='standard_20', dpi=203):
+    return ZPLGenerator(Config.LABEL_TEMPLATES[template_id], dpi=dpi)
+
+
+@pytest.mark.unit
+def test_one_format_per_label():
+    zpl = make_generator().generate_zpl(SAMPLE_LABELS).decode()
+    assert zpl.count('^XA') == zpl.count('^XZ') == 2
+    assert '^FDSKU002^FS' in zpl
+    assert '^FDLocation: A-02^FS' in zpl
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('template_id', TEMPLATE_IDS)
+def test_label_size_follows_template(template_id):
+    template = Config.LABEL_TEMPLATES[template_id]
+    zpl = make_generator(template_id, dpi=300).generate_zpl(SAMPLE_LABELS).decode()
+    assert f"^PW{round(template['label_width_inches'] * 300)}" in zpl
+    assert f"^LL{round(template['label_height_inches'] * 300)}" in zpl
+    assert zpl.count('^FB') == 2 * min(2, template['max_text_lines'])
+
+
+@pytest.mark.unit
+def test_code128_fields_fit_within_label():
+    gen = make_generator()
+    zpl = gen.generate_zpl([('X' * 20, []), ('Y', [])]).decode()
+    modules = set(re.findall(r'\^BY(\d+)', zpl))
+    assert len(modules) == 1  # uniform bar width across the job
+    for x, y in re.findall(r'\^FO(\d+),(\d+)\^BY', zpl):
+        assert 0 <= int(x) < gen.width
+        assert 0 <= int(y) < gen.height
+    assert '^BCN' in zpl
+
+
+@pytest.mark.unit
+def test_code128_too_wide_for_label_is_rejected():
+    with pytest.raises(ValueError, match='too long for a Code128 barcode'):
+        make_generator(dpi=203).generate_zpl([('X' * 60, [])])
+    # The same value fits once the printer has enough dots
+    assert b'^BY1^BCN' in make_generator(dpi=600).generate_zpl([('X' * 60, [])])
+
+
+@pytest.mark.unit
+def test_qr_uses_bq_with_level_l():
+    zpl = make_generator().generate_zpl(SAMPLE_LABELS, barcode_type='qr').decode()
+    assert re.search(r'\^BQN,2,\d+\^FDLA,SKU001\^FS', zpl)
+    assert '^BC' not in zpl
+
+
+@pytest.mark.unit
+def test_special_characters_are_hex_escaped():
+    zpl = make_generator().generate_zpl([('A^B~C_D', [('Note', 'x^y')])]).decode()
+    assert '^FH^FDA_5EB_7EC_5FD^FS' in zpl
+    assert '^FH^FDNote: x_5Ey^FS' in zpl
+
+
+@pytest.mark.unit
+def test_streaming_matches_list_output():
+    gen = make_generator()
+    labels = [(f'SKU{i:03d}', [('Loc', f'A-{i}')]) for i in range(45)]
+    chunks = iter([labels[:13], labels[13:]])
+    assert gen.generate_zpl_streaming(chunks, longest_value=6) == gen.generate_zpl(labels)
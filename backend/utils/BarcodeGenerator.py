@@ -1,57 +1,211 @@
+from collections import Counter
+from functools import lru_cache
+from itertools import groupby
 from reportlab.graphics.barcode import code128
 from reportlab.graphics.barcode.qr import QrCodeWidget
-from reportlab.graphics import renderPDF
-from reportlab.graphics.shapes import Drawing
 from reportlab.lib.units import inch
+from utils.TemplateLayout import layout_for
+
+CODE128_CACHE_SIZE = 8192
+# Quiet zone either side of a Code128 symbol, as reportlab's widget sizes it
+CODE128_MIN_QUIET = 0.25 * inch
+QR_CACHE_SIZE = 4096
+# Uses of a QR value within one document before it is drawn from a form XObject
+FORM_REUSE_MIN_USES = 12
+
+
+@lru_cache(maxsize=CODE128_CACHE_SIZE)
+def code128_pattern(value):
+    """
+    Module widths of value's Code128 symbol as bytes, alternating bar,
+    space, bar, ... and starting with a bar. Encoded once per value by
+    reportlab's own encoder so the bars match its widget exactly.
+    """
+    widget = code128.Code128(value)
+    widget.validate()
+    widget.encode()
+    runs = bytearray()
+    for c in widget.decompose():
+        # Uppercase letters are bars, lowercase spaces; the letter is the width
+        bar = c.isupper()
+        width = ord(c) - (64 if bar else 96)
+        if bar == (len(runs) % 2 == 0):
+            runs.append(width)
+        elif runs:
+            runs[-1] += width  # same kind as the previous run
+        else:
+            runs.extend((0, width))  # leading space
+    return bytes(runs)
+
+
+@lru_cache(maxsize=CODE128_CACHE_SIZE)
+def code128_path(value):
+    """PDF path operators filling value's bars, in units of one module by the bar height."""
+    ops = []
+    left = 0
+    for i, modules in enumerate(code128_pattern(value)):
+        if not i % 2:
+            ops.append(f'{left} 0 {modules} 1 re')
+        left += modules
+    ops.append('f')
+    return ' '.join(ops)
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def qr_modules(value):
+    """
+    (border, rows) for value's QR symbol, rows being tuples of dark (True)
+    modules from the top, without the quiet border. The matrix comes from
+    reportlab's encoder, with QrCodeWidget's defaults.
+    """
+    widget = QrCodeWidget(value)
+    widget.qr.make()
+    return widget.barBorder, tuple(tuple(map(bool, row)) for row in widget.qr.modules)
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def qr_path(value):
+    """
+    (size, ops) for value's QR symbol: size is the side in modules including
+    the widget's quiet border, ops the PDF path operators filling each row's
+    dark runs, in module units from the symbol's bottom-left corner.
+    """
+    border, rows = qr_modules(value)
+    size = len(rows) + 2 * border
+
+    ops = []
+    for r, row in enumerate(rows):
+        y = size - border - 1 - r
+        c = 0
+        for dark, run in groupby(row):
+            length = len(list(run))
+            if dark:
+                ops.append(f'{c + border} {y} {length} 1 re')
+            c += length
+    ops.append('f')
+    return size, ' '.join(ops)
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def qr_symbol_size(value):
+    """qr_path(value)'s size, from the symbol version alone without building the matrix."""
+    widget = QrCodeWidget(value)
+    return widget.qr.calculate_version() * 4 + 17 + 2 * widget.barBorder
+
 
 class BarcodeGenerator:
+    REUSE_FORMS = True  # Draw often-repeated QR values from one form XObject per document
+
     def __init__(self, template=None, barcode_type='code128'):
-        self.template = template
+        self.layout = layout_for(template)
         self.barcode_type = barcode_type
-        self.barcode_height_inches = self.template['barcode_height_inches'] * inch
-        self.barcode_offset_y = self.template['barcode_offset_y_inches'] * inch
-        self.text_start_y = self.template['text_start_y_inches'] * inch
-        self.text_line_spacing = self.template['text_line_spacing_inches'] * inch
-        self.font = self.template['font']
-        self.font_size = self.template['font_size']
-        self.label_width = self.template['label_width_inches'] * inch
-        self.label_height = self.template['label_height_inches'] * inch
-        self.padding_x = self.template.get('padding_x_inches', 0.1) * inch
-        self.max_text_lines = self.template.get('max_text_lines', 2)
+        self.barcode_height_inches = self.layout.barcode_height
+        self.barcode_offset_y = self.layout.barcode_offset_y
+        self.text_start_y = self.layout.text_start_y
+        self.text_line_spacing = self.layout.text_line_spacing
+        self.font = self.layout.font
+        self.font_size = self.layout.font_size
+        self.label_width = self.layout.label_width
+        self.label_height = self.layout.label_height
+        self.padding_x = self.layout.padding_x
+        self.max_text_lines = self.layout.max_text_lines
+        # Side of the square every QR symbol is scaled to fill
+        self.qr_size = min(
+            self.label_height - self.barcode_offset_y - (0.05 * inch),
+            self.label_width - (2 * self.padding_x),
+        )
         self.bar_width = None
+        self._form_values = frozenset()
+        self._form_canvas = None
+        self._forms = {}
 
     def calibrate(self, values):
         if self.barcode_type != 'code128':
             return
-        longest = max(len(v) for v in values)
+        self.calibrate_length(max(len(v) for v in values))
+
+    def calibrate_length(self, longest):
+        # Streaming jobs only know the longest value, not the full list
+        if self.barcode_type != 'code128':
+            return
         num_modules = 11 + (longest * 11) + 11 + 13
         usable_width = self.label_width - (2 * self.padding_x)
         self.bar_width = usable_width / num_modules
 
+    def plan_forms(self, values):
+        """
+        Pick the QR values worth a form XObject in the next document: those
+        used at least FORM_REUSE_MIN_USES times in values. Without a plan
+        every symbol is drawn inline.
+        """
+        if self.barcode_type != 'qr' or not self.REUSE_FORMS:
+            return
+        self._form_values = frozenset(
+            value for value, uses in Counter(values).items() if uses >= FORM_REUSE_MIN_USES
+        )
+
     def draw_label_to_canvas(self, canvas, x, y, barcode_value, text_lines):
         if self.barcode_type == 'qr':
-            usable_width = self.label_width - (2 * self.padding_x)
-            available_height = self.label_height - self.barcode_offset_y - (0.05 * inch)
-            qr_size = min(available_height, usable_width)
-
-            qr = QrCodeWidget(barcode_value)
-            bounds = qr.getBounds()
-            raw_w = bounds[2] - bounds[0]
-            raw_h = bounds[3] - bounds[1]
-
-            d = Drawing(qr_size, qr_size, transform=[qr_size / raw_w, 0, 0, qr_size / raw_h, 0, 0])
-            d.add(qr)
-
-            qr_x = x + (self.label_width - qr_size) / 2
-            renderPDF.draw(d, canvas, qr_x, y + self.barcode_offset_y)
+            self._draw_qr(canvas, x, y + self.barcode_offset_y, barcode_value)
         else:
-            barcode = code128.Code128(value=barcode_value,
-                                      barHeight=self.barcode_height_inches,
-                                      barWidth=self.bar_width)
-            barcode_x = x + (self.label_width - barcode.width) / 2
-            barcode.drawOn(canvas, barcode_x, y + self.barcode_offset_y)
+            self._draw_code128(canvas, x, y + self.barcode_offset_y, barcode_value)
 
         canvas.setFont(self.font, self.font_size)
         label_center_x = x + self.label_width / 2
         for i, (label, value) in enumerate(text_lines[:self.max_text_lines]):
             canvas.drawCentredString(label_center_x, y + self.text_start_y - (i * self.text_line_spacing), f"{label}: {value}")
+
+    def _draw_code128(self, canvas, x, y, barcode_value):
+        """
+        Draw the bars centred in the label as a single filled path, laid out
+        exactly as code128.Code128(barWidth=self.bar_width).drawOn would.
+        The path is cached per value in module units and placed with one
+        transform, so no per-bar coordinates are formatted for each label.
+        """
+        bar_width = self.bar_width or code128.Code128.barWidth
+        quiet = max(CODE128_MIN_QUIET, bar_width * 10.0)
+        symbol_width = sum(code128_pattern(barcode_value)) * bar_width + 2 * quiet
+
+        left = x + (self.label_width - symbol_width) / 2 + quiet
+        canvas.saveState()
+        canvas.transform(bar_width, 0, 0, self.barcode_height_inches, left, y)
+        canvas._code.append(code128_path(barcode_value))
+        canvas.restoreState()
+
+    def _draw_qr(self, canvas, x, y, barcode_value):
+        """
+        Draw the QR symbol centred in the label as one path of dark runs,
+        at the size and position the scaled QrCodeWidget drawing had.
+        """
+        size, ops = qr_path(barcode_value)
+        module = self.qr_size / size
+
+        canvas.saveState()
+        canvas.transform(module, 0, 0, module, x + (self.label_width - self.qr_size) / 2, y)
+        name = self._form_name(canvas, barcode_value, size) if barcode_value in self._form_values else None
+        if name is None:
+            canvas._code.append(ops)
+        else:
+            canvas.doForm(name)
+        canvas.restoreState()
+
+    def _form_name(self, canvas, value, size):
+        """
+        Name of the form XObject holding value's QR path on this canvas,
+        defined on first use. A form costs ~500 bytes (its own dictionary
+        plus a small, poorly compressing stream) against ~150 for an inline
+        QR once the page stream is deflated, hence the plan's minimum use
+        count. Code128 paths are too cheap inline to ever pay off.
+        """
+        if canvas is not self._form_canvas:
+            # Forms belong to one document; start over for each new canvas
+            self._form_canvas = canvas
+            self._forms = {}
+
+        name = self._forms.get(value)
+        if name is None:
+            name = self._forms[value] = f'qr{len(self._forms)}'
+            canvas.beginForm(name, 0, 0, size, size)
+            canvas._code.append(qr_path(value)[1])
+            canvas.endForm()
+        return name
@@ -0,0 +1,190 @@
+import sys
+from array import array
+from itertools import accumulate
+
+
+class StringColumn:
+    """
+    Immutable column of short strings stored as one joined str plus an
+    offsets array, instead of one Python object per cell. Missing cells
+    are stored as '' (cleaned label data never contains empty values) and
+    read back as None.
+    """
+    __slots__ = ('_data', '_offsets')
+
+    def __init__(self, values=()):
+        values = ['' if v is None else v for v in values]
+        self._data = ''.join(values)
+        self._offsets = array('I', [0])
+        self._offsets.extend(accumulate(len(v) for v in values))
+
+    @classmethod
+    def from_parts(cls, data, offsets):
+        col = cls.__new__(cls)
+        col._data = data
+        col._offsets = offsets
+        return col
+
+    @classmethod
+    def from_series(cls, series):
+        """Build from a pandas Series of str / NaN without a per-cell loop."""
+        filled = series.fillna('').astype(object)
+        offsets = array('I', [0])
+        if len(filled):
+            offsets.extend(filled.str.len().cumsum().astype('uint32').tolist())
+        return cls.from_parts(''.join(filled.tolist()), offsets)
+
+    @classmethod
+    def concat(cls, columns):
+        parts = []
+        offsets = array('I', [0])
+        base = 0
+        for col in columns:
+            parts.append(col._data)
+            offsets.extend(o + base for o in col._offsets[1:])
+            base += len(col._data)
+        return cls.from_parts(''.join(parts), offsets)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                return StringColumn([self[i] for i in range(start, stop, step)])
+            stop = max(start, stop)
+            base = self._offsets[start]
+            offsets = array('I', (o - base for o in self._offsets[start:stop + 1]))
+            return StringColumn.from_parts(self._data[base:self._offsets[stop]], offsets)
+        if idx < 0:
+            idx += len(self)
+        return self._data[self._offsets[idx]:self._offsets[idx + 1]] or None
+
+    def __iter__(self):
+        data = self._data
+        offsets = self._offsets
+        for i in range(len(offsets) - 1):
+            yield data[offsets[i]:offsets[i + 1]] or None
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def offsets(self):
+        return self._offsets
+
+    def max_length(self):
+        offsets = self._offsets
+        return max((offsets[i + 1] - offsets[i] for i in range(len(offsets) - 1)), default=0)
+
+    def nbytes(self):
+        return sys.getsizeof(self._data) + sys.getsizeof(self._offsets)
+
+
+class LabelBatch:
+    """
+    Columnar set of labels: one StringColumn of barcode values plus one per
+    text field, with the field labels held once for the whole batch.
+    Iterating yields (barcode_value, [(label, value), ...]) tuples on the
+    fly, so renderers written against plain label lists work unchanged.
+    """
+    __slots__ = ('barcodes', 'field_labels', 'text_columns')
+
+    def __init__(self, barcodes, field_labels=(), text_columns=()):
+        self.barcodes = barcodes if isinstance(barcodes, StringColumn) else StringColumn(barcodes)
+        self.field_labels = tuple(sys.intern(label) for label in field_labels)
+        self.text_columns = tuple(
+            col if isinstance(col, StringColumn) else StringColumn(col) for col in text_columns
+        )
+
+    @classmethod
+    def from_labels(cls, labels):
+        """Build from [(barcode_value, [(label, value), ...]), ...]."""
+        if isinstance(labels, LabelBatch):
+            return labels
+        labels = list(labels)
+        # A field is (label, n-th use of that label) so repeated labels stay distinct
+        fields = {}
+        rows = []
+        for _, text_lines in labels:
+            seen = {}
+            row = {}
+            for label, value in text_lines:
+                key = (label, seen.get(label, 0))
+                seen[label] = key[1] + 1
+                fields.setdefault(key, len(fields))
+                row[fields[key]] = value
+            rows.append(row)
+        columns = [[row.get(i) for row in rows] for i in range(len(fields))]
+        return cls([bv for bv, _ in labels], [label for label, _ in fields], columns)
+
+    @classmethod
+    def concat(cls, batches):
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls([])
+        if len(batches) == 1:
+            return batches[0]
+        field_labels = batches[0].field_labels
+        if any(b.field_labels != field_labels for b in batches):
+            return cls.from_labels(label for batch in batches for label in batch)
+        return cls(
+            StringColumn.concat(b.barcodes for b in batches),
+            field_labels,
+            [StringColumn.concat(b.text_columns[i] for b in batches) for i in range(len(field_labels))],
+        )
+
+    def __len__(self):
+        return len(self.barcodes)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def text_lines(self, idx):
+        lines = []
+        for label, col in zip(self.field_labels, self.text_columns):
+            value = col[idx]
+            if value is not None:
+                lines.append((label, value))
+        return lines
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return LabelBatch(self.barcodes[idx], self.field_labels, [col[idx] for col in self.text_columns])
+        return self.barcodes[idx], self.text_lines(idx)
+
+    def __iter__(self):
+        field_labels = self.field_labels
+        for barcode_value, *values in zip(self.barcodes, *self.text_columns):
+            yield barcode_value, [(label, v) for label, v in zip(field_labels, values) if v is not None]
+
+    def __eq__(self, other):
+        if isinstance(other, LabelBatch):
+            other = list(other)
+        return list(self) == other
+
+    def __repr__(self):
+        return f"LabelBatch({len(self)} labels, fields={list(self.field_labels)})"
+
+    def nbytes(self):
+        """Approximate memory held by the batch."""
+        return (
+            sys.getsizeof(self)
+            + self.barcodes.nbytes()
+            + sum(col.nbytes() for col in self.text_columns)
+        )
+
+
+def paginate(label_chunks, labels_per_page):
+    """Regroup label chunks of any size into LabelBatches of full pages (last may be partial)."""
+    carry = LabelBatch([])
+    for chunk in label_chunks:
+        chunk = LabelBatch.concat([carry, LabelBatch.from_labels(chunk)])
+        full = len(chunk) - len(chunk) % labels_per_page
+        for start in range(0, full, labels_per_page):
+            yield chunk[start:start + labels_per_page]
+        carry = chunk[full:]
+    if carry:
+        yield carry
@@ -1,101 +1,248 @@
+import atexit
 import io
+import multiprocessing
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from reportlab import rl_config
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import LETTER
-from reportlab.lib.units import inch
 from reportlab.lib.colors import lightgrey
-from datetime import datetime
 from utils.BarcodeGenerator import BarcodeGenerator
+from utils.LabelBatch import LabelBatch, paginate
+from utils.TemplateLayout import layout_for
+from utils.pdf_pages import build_page_index, merge_documents
+
+
+# Held across the useA85 switch and the save, see _binary_streams
+_use_a85_lock = threading.Lock()
+
+
+@contextmanager
+def _binary_streams():
+    """
+    Compressed pages as binary Flate streams: ASCII85 on top adds 25% to
+    each one and, without reportlab's C accelerator, a third of the render
+    time. rl_config.useA85 is process-wide and only read while a canvas
+    is saved, so it is switched off for our saves alone, one at a time:
+    concurrent jobs' threads would otherwise restore each other's value
+    mid-save.
+    """
+    with _use_a85_lock:
+        previous = rl_config.useA85
+        rl_config.useA85 = 0
+        try:
+            yield
+        finally:
+            rl_config.useA85 = previous
+
+
+# Render pools shared by every job in this process, one per worker count.
+# Web and job processes run threads, which fork would copy mid-lock, so
+# workers come from a forkserver (spawn where there is none).
+_render_pools = {}
+_render_pools_lock = threading.Lock()
+
+
+def _render_pool(workers):
+    with _render_pools_lock:
+        pool = _render_pools.get(workers)
+        if pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            pool = _render_pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return pool
+
+
+def _discard_render_pool(workers, pool):
+    # A pool whose worker died refuses all further work; the next job starts a fresh one
+    with _render_pools_lock:
+        if _render_pools.get(workers) is pool:
+            del _render_pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def _shutdown_render_pools():
+    with _render_pools_lock:
+        pools = list(_render_pools.values())
+        _render_pools.clear()
+    for pool in pools:
+        pool.shutdown(cancel_futures=True)
+
+
+def _render_page_range(layout, page_compression, barcode_type, bar_width, pages, as_document):
+    """Process pool entry point: render one contiguous range of pages."""
+    sheet_gen = PDFSheetGenerator(layout, page_compression=page_compression)
+    barcode_gen = BarcodeGenerator(layout, barcode_type=barcode_type)
+    barcode_gen.bar_width = bar_width
+    if as_document:
+        barcode_gen.plan_forms(value for page in pages for value in page.barcodes)
+        return sheet_gen._document_bytes(pages, barcode_gen)
+    return list(sheet_gen._sheet_pdfs(pages, barcode_gen))
+
 
 class PDFSheetGenerator:
     DEBUG_GRID = False  # Set to False to hide label boundaries
-
-    def __init__(self, output_folder, template=None):
-        self.output_folder = output_folder
-        self.template = template or self._get_default_template()
-        self.label_width = self.template['label_width_inches'] * inch
-        self.label_height = self.template['label_height_inches'] * inch
-        self.x_gap = self.template['x_gap_inches'] * inch
-        self.y_gap = self.template['y_gap_inches'] * inch
-        self.margin_left = self.template['margin_left_inches'] * inch
-        self.margin_top = self.template['margin_top_inches'] * inch
-        self.rows = self.template['rows']
-        self.columns = self.template['columns']
+    PAGES_PER_TASK = 10  # Pages handed to a worker process at a time
+
+    def __init__(self, template=None, workers=1, page_compression=True):
+        self.workers = max(1, workers)
+        # Off when the ZIP layer deflates the PDFs anyway; see storage_service
+        self.page_compression = page_compression
+        # template: a compiled TemplateLayout, a LABEL_TEMPLATES entry, or None for the default
+        self.layout = layout_for(template)
+        self.label_width = self.layout.label_width
+        self.label_height = self.layout.label_height
+        self.rows = self.layout.rows
+        self.columns = self.layout.columns
         
     def generate_pdf_sheets(self, labels, barcode_type='code128'):
-        # labels: list of (barcode_value, [(label, value), ...]) tuples
-
-        # Calculate sheets needed
-        labels_per_sheet = self.rows * self.columns
-        num_sheets = (len(labels) + labels_per_sheet - 1) // labels_per_sheet
-
-        sheet_files = []
-        barcode_gen = BarcodeGenerator(self.template, barcode_type=barcode_type)
+        # labels: LabelBatch, or list of (barcode_value, [(label, value), ...]) tuples.
+        # Returns an iterator of one PDF (bytes) per sheet, rendered as it is
+        # consumed, so sheets can go straight into a ZIP without touching disk.
+        labels = LabelBatch.from_labels(labels)
+        barcode_gen = BarcodeGenerator(self.layout, barcode_type=barcode_type)
 
         # Calibrate uniform barWidth based on longest barcode value
-        all_parts = [bv for bv, _ in labels]
-        barcode_gen.calibrate(all_parts)
-
-        # Generate each sheet
-        for sheet_idx in range(num_sheets):
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            pdf_filename = f"label_sheet_{timestamp}_{sheet_idx + 1}.pdf"
-            pdf_path = f"{self.output_folder}/{pdf_filename}"
-
-            c = canvas.Canvas(pdf_path, pagesize=LETTER)
-
-            start = sheet_idx * labels_per_sheet
-            end = min(start + labels_per_sheet, len(labels))
-
-            if self.DEBUG_GRID:
-                self._draw_debug_grid(c)
-
-            for i in range(start, end):
-                barcode_value, text_lines = labels[i]
-
-                position_in_sheet = i - start
-                row = position_in_sheet // self.columns
-                col = position_in_sheet % self.columns
-
-                x = self.margin_left + col * (self.label_width + self.x_gap)
-                y = LETTER[1] - self.margin_top - (row + 1) * self.label_height - row * self.y_gap
-
-                barcode_gen.draw_label_to_canvas(c, x, y, barcode_value, text_lines)
-
+        barcode_gen.calibrate(labels.barcodes)
+
+        return self._render_sheets(self.paginate([labels]), barcode_gen)
+
+    def generate_pdf_sheets_streaming(self, label_chunks, longest_value, barcode_type='code128'):
+        # label_chunks: iterable of label lists, consumed lazily so only the
+        # current chunk and the page being drawn are held in memory.
+        # longest_value comes from a first pass so bar widths stay uniform.
+        barcode_gen = BarcodeGenerator(self.layout, barcode_type=barcode_type)
+        barcode_gen.calibrate_length(longest_value)
+
+        return self._render_sheets(self.paginate(label_chunks), barcode_gen)
+
+    def paginate(self, label_chunks):
+        """Regroup label chunks of any size into full pages (last may be partial)."""
+        return paginate(label_chunks, self.layout.labels_per_sheet)
+
+    def generate_pdf_document(self, labels, barcode_type='code128'):
+        """
+        Render every sheet as one page of a single PDF, so the header, font
+        resources and xref are written once for the whole job.
+        Returns (pdf_bytes, page_index); see utils.pdf_pages.
+        """
+        labels = LabelBatch.from_labels(labels)
+        barcode_gen = BarcodeGenerator(self.layout, barcode_type=barcode_type)
+        barcode_gen.calibrate(labels.barcodes)
+        barcode_gen.plan_forms(labels.barcodes)
+
+        return self._render_document(self.paginate([labels]), barcode_gen)
+
+    def generate_pdf_document_streaming(self, label_chunks, longest_value, barcode_type='code128'):
+        barcode_gen = BarcodeGenerator(self.layout, barcode_type=barcode_type)
+        barcode_gen.calibrate_length(longest_value)
+
+        return self._render_document(self.paginate(label_chunks), barcode_gen)
+
+    def _render_sheets(self, pages, barcode_gen):
+        if self.workers > 1:
+            results = self._map_page_ranges(pages, barcode_gen, as_document=False)
+            return (pdf for sheet_pdfs in results for pdf in sheet_pdfs)
+        return self._sheet_pdfs(pages, barcode_gen)
+
+    def _sheet_pdfs(self, pages, barcode_gen):
+        for page in pages:
+            buf = io.BytesIO()
+            c = self._canvas(buf)
+            barcode_gen.plan_forms(page.barcodes)
+            self._draw_page(c, page, barcode_gen)
+            self._save(c)
+            yield buf.getvalue()
+
+    def _render_document(self, pages, barcode_gen):
+        if self.workers > 1:
+            pdf_bytes = merge_documents(self._map_page_ranges(pages, barcode_gen, as_document=True))
+        else:
+            pdf_bytes = self._document_bytes(pages, barcode_gen)
+        return pdf_bytes, build_page_index(pdf_bytes)
+
+    def _document_bytes(self, pages, barcode_gen):
+        buf = io.BytesIO()
+        c = self._canvas(buf)
+        for page in pages:
+            self._draw_page(c, page, barcode_gen)
+            c.showPage()
+        self._save(c)
+        return buf.getvalue()
+
+    def _canvas(self, buf):
+        return canvas.Canvas(buf, pagesize=LETTER, pageCompression=int(self.page_compression))
+
+    @staticmethod
+    def _save(c):
+        with _binary_streams():
             c.save()
-            sheet_files.append(pdf_filename)
 
-        return sheet_files
-    
+    def _map_page_ranges(self, pages, barcode_gen, as_document):
+        """
+        Render pages in PAGES_PER_TASK ranges across a process pool, yielding
+        each range's result in page order. Ranges are submitted as pages
+        arrive, with at most two per worker queued, so streaming jobs stay
+        bounded in memory. bar_width is already calibrated and travels with
+        every range, so all workers draw identical barcodes. The pool is
+        shared with other jobs and outlives this one.
+        """
+        pages = iter(pages)
+        in_flight = deque()
+        pool = _render_pool(self.workers)
+        try:
+            while True:
+                page_range = list(islice(pages, self.PAGES_PER_TASK))
+                if not page_range:
+                    break
+                in_flight.append(pool.submit(
+                    _render_page_range, self.layout, self.page_compression, barcode_gen.barcode_type,
+                    barcode_gen.bar_width, page_range, as_document,
+                ))
+                if len(in_flight) >= self.workers * 2:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+        except BrokenProcessPool:
+            _discard_render_pool(self.workers, pool)
+            raise
+        finally:
+            # An abandoned or failed job leaves nothing queued for the next one
+            for future in in_flight:
+                future.cancel()
+
+    def _draw_page(self, c, page, barcode_gen):
+        if self.DEBUG_GRID:
+            self._draw_debug_grid(c)
+
+        for (x, y), (barcode_value, text_lines) in zip(self.layout.origins, page):
+            barcode_gen.draw_label_to_canvas(c, x, y, barcode_value, text_lines)
+
     def _draw_debug_grid(self, c):
         c.setStrokeColor(lightgrey)
         c.setLineWidth(0.5)
-        for row in range(self.rows):
-            for col in range(self.columns):
-                x = self.margin_left + col * (self.label_width + self.x_gap)
-                y = LETTER[1] - self.margin_top - (row + 1) * self.label_height - row * self.y_gap
-                c.rect(x, y, self.label_width, self.label_height)
+        for x, y in self.layout.origins:
+            c.rect(x, y, self.label_width, self.label_height)
 
-    def generate_preview_sheet(self, labels, barcode_type='code128'):
-        labels_per_sheet = self.rows * self.columns
-        preview_labels = labels[:labels_per_sheet]
+    def generate_preview_sheet(self, labels, barcode_type='code128', longest_value=None):
+        labels = LabelBatch.from_labels(labels)
+        preview_labels = labels[:self.layout.labels_per_sheet]
 
-        barcode_gen = BarcodeGenerator(self.template, barcode_type=barcode_type)
-        barcode_gen.calibrate([bv for bv, _ in labels])
+        barcode_gen = BarcodeGenerator(self.layout, barcode_type=barcode_type)
+        # Callers previewing part of a file pass the whole file's longest value
+        if longest_value is not None:
+            barcode_gen.calibrate_length(longest_value)
+        else:
+            barcode_gen.calibrate(labels.barcodes)
 
         buf = io.BytesIO()
         c = canvas.Canvas(buf, pagesize=LETTER)
-
-        for i, (barcode_value, text_lines) in enumerate(preview_labels):
-            row = i // self.columns
-            col = i % self.columns
-            x = self.margin_left + col * (self.label_width + self.x_gap)
-            y = LETTER[1] - self.margin_top - (row + 1) * self.label_height - row * self.y_gap
-            barcode_gen.draw_label_to_canvas(c, x, y, barcode_value, text_lines)
-
-        c.save()
+        self._draw_page(c, preview_labels, barcode_gen)
+        self._save(c)
         buf.seek(0)
-        return buf.read()
-
-    def _get_default_template(self):
-        from config.settings import Config
-        return Config.LABEL_TEMPLATES[Config.DEFAULT_TEMPLATE]
\ No newline at end of file
+        return buf.read()
\ No newline at end of file
@@ -0,0 +1,173 @@
+import io
+import os
+from functools import lru_cache
+import numpy as np
+import reportlab
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.units import inch
+from utils.BarcodeGenerator import code128_pattern, qr_modules
+from utils.LabelBatch import LabelBatch, paginate
+from utils.TemplateLayout import layout_for
+
+SUPPORTED_DPIS = (203, 300, 600)
+# '1': bilevel, for thermal and laser printers; 'L': 8-bit grayscale with antialiased text
+RASTER_MODES = ('1', 'L')
+IMAGE_FORMATS = ('png', 'tiff')
+TEXT_CACHE_SIZE = 4096
+# Sans-serif stand-in for the templates' Helvetica, shipped with reportlab
+TEXT_FONT_PATH = os.path.join(os.path.dirname(reportlab.__file__), 'fonts', 'Vera.ttf')
+
+
+def _paper(mode):
+    """White pixel value for a sheet buffer of mode; ink is always 0 / False."""
+    return True if mode == '1' else 255
+
+
+@lru_cache(maxsize=64)
+def _font(size_px):
+    return ImageFont.truetype(TEXT_FONT_PATH, size_px)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _text_tile(text, size_px, mode):
+    """
+    (tile, dx, dy): text rendered once as a paper-valued array, offset from
+    its left baseline point.
+    """
+    font = _font(size_px)
+    x0, y0, x1, y1 = font.getbbox(text, anchor='ls')
+    image = Image.new('L', (max(1, x1 - x0), max(1, y1 - y0)), 255)
+    ImageDraw.Draw(image).text((-x0, -y0), text, font=font, fill=0, anchor='ls')
+    tile = np.asarray(image)
+    if mode == '1':
+        tile = tile >= 128
+    return tile, x0, y0
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _code128_row(value, module_px, mode):
+    """One pixel row of value's bars at module_px per module; every row of the symbol is identical."""
+    pattern = np.frombuffer(code128_pattern(value), dtype=np.uint8)
+    # Runs alternate bar, space, bar, ... so even runs are ink
+    colors = np.arange(len(pattern)) % 2 == 1
+    row = np.repeat(colors, pattern.astype(np.intp) * module_px)
+    return row if mode == '1' else row.astype(np.uint8) * 255
+
+
+class RasterSheetGenerator:
+    """
+    Renders label sheets as bitmaps for printers without PDF support. Each
+    sheet is drawn into one preallocated buffer at the target DPI: Code128
+    bars are pasted as a cached pixel row broadcast over the bar height,
+    QR modules are scaled up from the cached matrix, and text lines come
+    from a cache of rendered strings. Only the finished sheet is encoded.
+    """
+
+    def __init__(self, template=None, dpi=300, mode='1'):
+        if dpi not in SUPPORTED_DPIS:
+            raise ValueError(f'Unsupported DPI: {dpi}')
+        if mode not in RASTER_MODES:
+            raise ValueError(f'Unsupported raster mode: {mode}')
+        self.layout = layout_for(template)
+        self.dpi = dpi
+        self.mode = mode
+        self.rows = self.layout.rows
+        self.columns = self.layout.columns
+        self.label_width = self._px(self.layout.label_width)
+        self.label_height = self._px(self.layout.label_height)
+        self.padding_x = self._px(self.layout.padding_x)
+        self.barcode_height = self._px(self.layout.barcode_height)
+        # Distances from the label's top edge, the PDF's offsets being from its bottom
+        self.barcode_bottom = self.label_height - self._px(self.layout.barcode_offset_y)
+        self.text_baselines = [
+            self.label_height - self._px(self.layout.text_start_y - i * self.layout.text_line_spacing)
+            for i in range(self.layout.max_text_lines)
+        ]
+        self.font_px = max(1, round(self.layout.font_size / 72 * dpi))
+        # Square the QR symbol must fit, as BarcodeGenerator._draw_qr sizes it
+        self.qr_area = min(self.label_width - 2 * self.padding_x, self.barcode_bottom - self._px(0.05 * inch))
+        self.origins = self.layout.pixel_origins(dpi)
+        self.buffer = np.empty(
+            (round(LETTER[1] / 72 * dpi), round(LETTER[0] / 72 * dpi)),
+            dtype=bool if mode == '1' else np.uint8,
+        )
+
+    def _px(self, points):
+        return round(points / inch * self.dpi)
+
+    def generate_sheets(self, labels, barcode_type='code128', image_format='png'):
+        # Returns an iterator of one encoded image (bytes) per sheet
+        labels = LabelBatch.from_labels(labels)
+        return self._render(paginate([labels], len(self.origins)), barcode_type,
+                            labels.barcodes.max_length(), image_format)
+
+    def generate_sheets_streaming(self, label_chunks, longest_value, barcode_type='code128', image_format='png'):
+        # longest_value comes from a first pass so bar widths stay uniform
+        return self._render(paginate(label_chunks, len(self.origins)), barcode_type, longest_value, image_format)
+
+    def _render(self, pages, barcode_type, longest_value, image_format):
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f'Unsupported image format: {image_format}')
+        if barcode_type == 'qr':
+            draw_barcode = self._draw_qr
+        else:
+            module_px = self._code128_module(longest_value)
+            draw_barcode = lambda x, y, value: self._draw_code128(x, y, value, module_px)
+
+        for page in pages:
+            self.buffer.fill(_paper(self.mode))
+            for (x, y), (barcode_value, text_lines) in zip(self.origins, page):
+                draw_barcode(x, y, barcode_value)
+                for baseline, (label, value) in zip(self.text_baselines, text_lines):
+                    self._draw_text(x + self.label_width // 2, y + baseline, f"{label}: {value}")
+            yield self._encode(image_format)
+
+    def _code128_module(self, longest_value):
+        """Whole-pixel module width fitting the longest value, as BarcodeGenerator.calibrate_length sizes it."""
+        num_modules = 11 + (longest_value * 11) + 11 + 13
+        return max(1, (self.label_width - 2 * self.padding_x) // num_modules)
+
+    def _draw_code128(self, x, y, value, module_px):
+        row = _code128_row(value, module_px, self.mode)
+        left = x + (self.label_width - len(row)) // 2
+        self._paste(row[np.newaxis, :], left, y + self.barcode_bottom - self.barcode_height, self.barcode_height)
+
+    def _draw_qr(self, x, y, value):
+        border, rows = qr_modules(value)
+        size = len(rows) + 2 * border
+        module_px = max(1, self.qr_area // size)
+        dark = np.array(rows, dtype=bool).repeat(module_px, axis=0).repeat(module_px, axis=1)
+        tile = ~dark if self.mode == '1' else np.where(dark, 0, 255).astype(np.uint8)
+        left = x + (self.label_width - size * module_px) // 2 + border * module_px
+        top = y + self.barcode_bottom - size * module_px + border * module_px
+        self._paste(tile, left, top)
+
+    def _draw_text(self, center_x, baseline_y, text):
+        tile, dx, dy = _text_tile(text, self.font_px, self.mode)
+        self._paste(tile, center_x - tile.shape[1] // 2, baseline_y + dy)
+
+    def _paste(self, tile, left, top, height=None):
+        """Darken the buffer with tile at (left, top), clipped to the sheet. height repeats a one-row tile."""
+        height = tile.shape[0] if height is None else height
+        buf_h, buf_w = self.buffer.shape
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(left + tile.shape[1], buf_w), min(top + height, buf_h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        region = self.buffer[y0:y1, x0:x1]
+        if tile.shape[0] == 1:
+            tile = tile[:, x0 - left:x1 - left]
+        else:
+            tile = tile[y0 - top:y1 - top, x0 - left:x1 - left]
+        np.minimum(region, tile, out=region)
+
+    def _encode(self, image_format):
+        image = Image.fromarray(self.buffer)
+        out = io.BytesIO()
+        if image_format == 'tiff':
+            compression = 'group4' if self.mode == '1' else 'tiff_lzw'
+            image.save(out, format='TIFF', compression=compression, dpi=(self.dpi, self.dpi))
+        else:
+            image.save(out, format='PNG', compress_level=1, dpi=(self.dpi, self.dpi))
+        return out.getvalue()
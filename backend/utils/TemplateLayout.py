@@ -0,0 +1,138 @@
+from functools import cache
+from numbers import Real
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.units import inch
+from reportlab.pdfbase import pdfmetrics
+
+# Float slack when checking that a template's grid fits on the page, in points
+FIT_TOLERANCE = 1e-6
+
+POSITIVE_INCHES = ('label_width_inches', 'label_height_inches', 'barcode_height_inches')
+NON_NEGATIVE_INCHES = (
+    'margin_top_inches', 'margin_left_inches', 'x_gap_inches', 'y_gap_inches',
+    'barcode_offset_y_inches', 'text_start_y_inches', 'text_line_spacing_inches',
+)
+REQUIRED_KEYS = POSITIVE_INCHES + NON_NEGATIVE_INCHES + ('rows', 'columns', 'font', 'font_size')
+
+
+class TemplateLayout:
+    """
+    Immutable, validated form of one LABEL_TEMPLATES entry: every distance
+    converted to points once, plus the bottom-left corner of each label
+    position on the page (in page order), so renderers look positions up
+    instead of recomputing them per label.
+    """
+    __slots__ = (
+        'rows', 'columns', 'labels_per_sheet',
+        'label_width', 'label_height', 'x_gap', 'y_gap', 'margin_left', 'margin_top', 'padding_x',
+        'barcode_height', 'barcode_offset_y', 'text_start_y', 'text_line_spacing',
+        'font', 'font_size', 'max_text_lines', 'origins',
+    )
+
+    def __init__(self, template):
+        self.rows = template['rows']
+        self.columns = template['columns']
+        self.labels_per_sheet = self.rows * self.columns
+        self.label_width = template['label_width_inches'] * inch
+        self.label_height = template['label_height_inches'] * inch
+        self.x_gap = template['x_gap_inches'] * inch
+        self.y_gap = template['y_gap_inches'] * inch
+        self.margin_left = template['margin_left_inches'] * inch
+        self.margin_top = template['margin_top_inches'] * inch
+        self.padding_x = template.get('padding_x_inches', 0.1) * inch
+        self.barcode_height = template['barcode_height_inches'] * inch
+        self.barcode_offset_y = template['barcode_offset_y_inches'] * inch
+        self.text_start_y = template['text_start_y_inches'] * inch
+        self.text_line_spacing = template['text_line_spacing_inches'] * inch
+        self.font = template['font']
+        self.font_size = template['font_size']
+        self.max_text_lines = template.get('max_text_lines', 2)
+        self.origins = tuple(
+            (
+                self.margin_left + col * (self.label_width + self.x_gap),
+                LETTER[1] - self.margin_top - (row + 1) * self.label_height - row * self.y_gap,
+            )
+            for row in range(self.rows) for col in range(self.columns)
+        )
+
+    def pixel_origins(self, dpi):
+        """Top-left pixel of every label position on a LETTER bitmap at dpi, in page order."""
+        return tuple(
+            (round(x / inch * dpi), round((LETTER[1] - y - self.label_height) / inch * dpi))
+            for x, y in self.origins
+        )
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f'TemplateLayout is immutable; cannot set {name}')
+        super().__setattr__(name, value)
+
+
+def _template_problems(template):
+    """Every reason template cannot be laid out, as short messages."""
+    missing = [key for key in REQUIRED_KEYS if key not in template]
+    if missing:
+        return [f"missing {', '.join(missing)}"]
+
+    problems = []
+    for key in ('rows', 'columns'):
+        if not isinstance(template[key], int) or template[key] < 1:
+            problems.append(f'{key} must be a positive integer')
+    max_text_lines = template.get('max_text_lines', 2)
+    if not isinstance(max_text_lines, int) or max_text_lines < 0:
+        problems.append('max_text_lines must be a non-negative integer')
+    for key in POSITIVE_INCHES + ('font_size',):
+        if not isinstance(template[key], Real) or template[key] <= 0:
+            problems.append(f'{key} must be a positive number')
+    for key in NON_NEGATIVE_INCHES + ('padding_x_inches',):
+        value = template.get(key, 0)
+        if not isinstance(value, Real) or value < 0:
+            problems.append(f'{key} must be a non-negative number')
+    if template['font'] not in pdfmetrics.standardFonts + tuple(pdfmetrics.getRegisteredFontNames()):
+        problems.append(f"unknown font '{template['font']}'")
+    if problems:
+        return problems
+
+    layout = TemplateLayout(template)
+    if 2 * layout.padding_x >= layout.label_width:
+        problems.append('padding_x_inches leaves no room for the barcode')
+    if layout.barcode_offset_y + layout.barcode_height > layout.label_height + FIT_TOLERANCE:
+        problems.append('barcode extends past the top of the label')
+    right = layout.margin_left + layout.columns * layout.label_width + (layout.columns - 1) * layout.x_gap
+    if right > LETTER[0] + FIT_TOLERANCE:
+        problems.append(f'columns end {(right - LETTER[0]) / inch:.2f}" past the page edge')
+    if min(y for _, y in layout.origins) < -FIT_TOLERANCE:
+        problems.append(f'rows end {-min(y for _, y in layout.origins) / inch:.2f}" past the page edge')
+    return problems
+
+
+def compile_template(template, template_id='template'):
+    """TemplateLayout for template, or ValueError naming everything wrong with it."""
+    problems = _template_problems(template)
+    if problems:
+        raise ValueError(f"Invalid label template '{template_id}': {'; '.join(problems)}")
+    return TemplateLayout(template)
+
+
+def compile_templates(templates):
+    """Compile every LABEL_TEMPLATES entry up front, so a bad one fails at startup."""
+    return {template_id: compile_template(template, template_id) for template_id, template in templates.items()}
+
+
+@cache
+def default_layout():
+    from config.settings import Config
+    return compile_template(Config.LABEL_TEMPLATES[Config.DEFAULT_TEMPLATE], Config.DEFAULT_TEMPLATE)
+
+
+def layout_for(template):
+    """
+    The layout renderers draw from: template itself when already compiled
+    (as the services pass from app.config['LABEL_LAYOUTS']), the default
+    template's for None, or a raw template dict compiled on the spot.
+    """
+    if isinstance(template, TemplateLayout):
+        return template
+    if template is None:
+        return default_layout()
+    return compile_template(template)
@@ -0,0 +1,115 @@
+from utils.BarcodeGenerator import code128_pattern, qr_symbol_size
+from reportlab.lib.units import inch
+from utils.LabelBatch import LabelBatch
+from utils.TemplateLayout import layout_for
+
+# ZPL field data treats ^ and ~ as commands; under ^FH they are written as
+# _XX hex escapes, so the indicator itself has to be escaped too
+_FIELD_ESCAPES = str.maketrans({'_': '_5F', '^': '_5E', '~': '_7E'})
+_FIELD_SPECIALS = frozenset('_^~')
+# Quiet border qr_symbol_size includes around each QR symbol, in modules
+QR_BORDER_MODULES = 4
+# ^BY and ^BQ accept whole-dot module sizes from 1 to 10
+MAX_MODULE_DOTS = 10
+
+
+def _field(value):
+    """^FD command for value, hex-escaped only when it holds ZPL specials."""
+    if _FIELD_SPECIALS.isdisjoint(value):
+        return f'^FD{value}^FS'
+    return f'^FH^FD{value.translate(_FIELD_ESCAPES)}^FS'
+
+
+class ZPLGenerator:
+    """
+    Renders labels as ZPL for Zebra thermal printers: one ^XA...^XZ format
+    per label, laid out from the same template geometry PDFSheetGenerator
+    uses for a single label, with ^BC (Code128) or ^BQ (QR) barcodes and
+    the text fields as scalable-font text. The printer draws everything,
+    so no page description is built at all.
+    """
+
+    def __init__(self, template=None, dpi=203):
+        self.layout = layout_for(template)
+        self.dpi = dpi
+        self.width = self._dots(self.layout.label_width)
+        self.height = self._dots(self.layout.label_height)
+        self.padding_x = self._dots(self.layout.padding_x)
+        self.barcode_height = self._dots(self.layout.barcode_height)
+        self.barcode_bottom = self.height - self._dots(self.layout.barcode_offset_y)
+        # Square the QR symbol must fit, as BarcodeGenerator._draw_qr sizes it
+        self.qr_area = min(
+            self.width - 2 * self.padding_x,
+            self.barcode_bottom - self._dots(0.05 * inch),
+        )
+        self.font_height = max(1, round(self.layout.font_size / 72 * dpi))
+        self.max_text_lines = self.layout.max_text_lines
+        # The PDF's text positions are baselines; ^FO places the top of the text
+        self.text_tops = [
+            self.height - self._dots(
+                self.layout.text_start_y - i * self.layout.text_line_spacing
+            ) - self.font_height
+            for i in range(self.max_text_lines)
+        ]
+        self.header = f'^XA^CI28^PW{self.width}^LL{self.height}^LH0,0'
+
+    def _dots(self, points):
+        return round(points / inch * self.dpi)
+
+    def generate_zpl(self, labels, barcode_type='code128'):
+        """ZPL (bytes) for every label, in order."""
+        labels = LabelBatch.from_labels(labels)
+        return self._render([labels], barcode_type, labels.barcodes.max_length())
+
+    def generate_zpl_streaming(self, label_chunks, longest_value, barcode_type='code128'):
+        # longest_value comes from a first pass so bar widths stay uniform
+        return self._render(label_chunks, barcode_type, longest_value)
+
+    def _render(self, label_chunks, barcode_type, longest_value):
+        if barcode_type == 'qr':
+            draw_barcode = self._qr
+        else:
+            module = self._code128_module(longest_value)
+            draw_barcode = lambda value: self._code128(value, module)
+
+        parts = []
+        for chunk in label_chunks:
+            for barcode_value, text_lines in LabelBatch.from_labels(chunk):
+                parts.append(self.header)
+                parts.append(draw_barcode(barcode_value))
+                for top, (label, value) in zip(self.text_tops, text_lines):
+                    parts.append(
+                        f'^FO0,{top}^A0N,{self.font_height},{self.font_height}'
+                        f'^FB{self.width},1,0,C{_field(f"{label}: {value}")}'
+                    )
+                parts.append('^XZ\n')
+        return ''.join(parts).encode('utf-8')
+
+    def _code128_module(self, longest_value):
+        """Whole-dot module width fitting the longest value, as BarcodeGenerator.calibrate_length sizes it."""
+        num_modules = 11 + (longest_value * 11) + 11 + 13
+        usable_width = self.width - 2 * self.padding_x
+        return max(1, min(MAX_MODULE_DOTS, usable_width // num_modules))
+
+    def _code128(self, value, module):
+        symbol_width = sum(code128_pattern(value)) * module
+        if symbol_width > self.width:
+            # Already at the narrowest bar the printer draws; ^PW would cut it off
+            raise ValueError(
+                f"Barcode value of {len(value)} characters is too long for a Code128 barcode "
+                f"on this label at {self.dpi} dpi; use shorter values, a higher dpi or QR codes"
+            )
+        x = (self.width - symbol_width) // 2
+        y = self.barcode_bottom - self.barcode_height
+        # Mode A lets the printer pick subsets the way reportlab's encoder does
+        return f'^FO{x},{y}^BY{module}^BCN,{self.barcode_height},N,N,N,A{_field(value)}'
+
+    def _qr(self, value):
+        size = qr_symbol_size(value)
+        magnification = max(1, min(MAX_MODULE_DOTS, self.qr_area // size))
+        symbol = size * magnification
+        border = QR_BORDER_MODULES * magnification
+        x = (self.width - symbol) // 2 + border
+        y = self.barcode_bottom - symbol + border
+        # Error correction L, automatic input mode: the symbol reportlab would draw
+        return f'^FO{x},{y}^BQN,2,{magnification}{_field("LA," + value)}'
@@ -1,9 +1,51 @@
+import io
 import os
 import mimetypes
 import threading
 import glob
+import zipfile
+from tempfile import SpooledTemporaryFile
+from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
-from flask import current_app
+from flask import current_app, Request
+from utils.security import UploadScan
+
+
+class ScannedSpool(SpooledTemporaryFile):
+    """
+    Spool that feeds every byte written to it through an UploadScan, so the
+    upload is sized, hashed and content-scanned while it is being received.
+    A write anywhere but the end (never done by the form parser) drops the
+    scan, and get_upload_scan then falls back to reading the body.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_scan = UploadScan()
+
+    def write(self, s):
+        if self.upload_scan is not None and self.tell() != self.upload_scan.size:
+            self.upload_scan = None
+        if self.upload_scan is not None:
+            self.upload_scan.update(s)
+        return super().write(s)
+
+
+class SpooledUploadRequest(Request):
+    """
+    Request class whose file uploads stay in memory up to
+    UPLOAD_SPOOL_MAX_BYTES and only then spill to UPLOAD_FOLDER.
+    Services parse the spooled stream directly, so typical uploads never
+    touch disk.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return ScannedSpool(
+            max_size=current_app.config['UPLOAD_SPOOL_MAX_BYTES'],
+            mode='rb+',
+            dir=current_app.config['UPLOAD_FOLDER'],
+        )
+
 
 def validate_upload_file(file):
     if not file or not file.filename:
@@ -59,6 +101,43 @@ def validate_upload_file(file):
     
     return True, filename
 
+def read_upload_archive(stream, max_files, max_entry_bytes, max_total_bytes):
+    """
+    A FileStorage for every file in an uploaded ZIP, in archive order,
+    ready for validate_file_security. Folders, macOS metadata and
+    hidden files are skipped; entries are read with their declared and
+    actual sizes capped, so a zip bomb stops at the limit. Raises
+    ValueError for anything unacceptable.
+    """
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile:
+        raise ValueError('Archive is not a valid ZIP file')
+
+    files = []
+    total = 0
+    with archive:
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or not name or name.startswith('.') or info.filename.startswith('__MACOSX/'):
+                continue
+            if len(files) == max_files:
+                raise ValueError(f'Too many files in archive. Maximum: {max_files}')
+            if info.file_size > max_entry_bytes:
+                raise ValueError(f'{name} is too large. Maximum size: {max_entry_bytes // (1024 * 1024)}MB')
+            try:
+                with archive.open(info) as entry:
+                    data = entry.read(max_entry_bytes + 1)
+            except (zipfile.BadZipFile, RuntimeError, NotImplementedError):
+                # Corrupt, encrypted or unsupported-compression entries
+                raise ValueError(f'{name} could not be read from the archive')
+            total += len(data)
+            if len(data) > max_entry_bytes or total > max_total_bytes:
+                raise ValueError('Archive expands beyond the allowed size')
+            files.append(FileStorage(stream=io.BytesIO(data), filename=name))
+    return files
+
+
 def cleanup_images_async(image_folder):
     def cleanup():
         try:
@@ -0,0 +1,181 @@
+"""
+Page-level split and merge for the PDFs reportlab writes (single classic
+xref table, direct /Length on streams). Pages are copied as raw objects
+with their references renumbered, so content streams are never decoded
+and no PDF library is needed.
+"""
+import re
+
+_XREF = re.compile(rb'xref\s+(\d+)\s+(\d+)\s+')
+_XREF_ENTRY = re.compile(rb'(\d{10}) (\d{5}) ([nf])')
+_STARTXREF = re.compile(rb'startxref\s+(\d+)')
+_OBJ_HEADER = re.compile(rb'\s*(\d+) 0 obj\s*')
+_STREAM_START = re.compile(rb'>>\s*stream(\r\n|\n)')
+_LENGTH = re.compile(rb'/Length (\d+)\b(?! \d+ R)')
+_REF = re.compile(rb'(\d+) 0 R')
+_PARENT = re.compile(rb'/Parent \d+ 0 R')
+_ROOT = re.compile(rb'/Root (\d+) 0 R')
+_PAGES = re.compile(rb'/Pages (\d+) 0 R')
+_KIDS = re.compile(rb'/Kids\s*\[([^\]]*)\]')
+
+_HEADER = b'%PDF-1.4\n%\x93\x8c\x8b\x9e\n'
+_CATALOG_NUM = 1
+_PAGES_NUM = 2
+
+
+class PDFObjects:
+    """Random access to the objects of one reportlab PDF."""
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self.offsets = self._read_xref()
+        self.root = int(_ROOT.search(self.data, self._trailer_start).group(1))
+
+    def _read_xref(self):
+        start = int(list(_STARTXREF.finditer(self.data))[-1].group(1))
+        m = _XREF.match(self.data, start)
+        if m is None:
+            raise ValueError('PDF has no classic xref table')
+        first, count = int(m.group(1)), int(m.group(2))
+        offsets = {}
+        pos = m.end()
+        for num in range(first, first + count):
+            entry = _XREF_ENTRY.match(self.data, pos)
+            if entry.group(3) == b'n':
+                offsets[num] = int(entry.group(1))
+            pos = entry.end() + 2
+        self._trailer_start = pos
+        return offsets
+
+    def body(self, num):
+        """Object bytes between 'N 0 obj' and 'endobj', stream data included."""
+        header = _OBJ_HEADER.match(self.data, self.offsets[num])
+        if header is None or int(header.group(1)) != num:
+            raise ValueError(f'Object {num} not found at its xref offset')
+        start = header.end()
+        end = self.data.index(b'endobj', start)
+        stream = _STREAM_START.search(self.data, start, end)
+        if stream is not None:
+            length = _LENGTH.search(self.data, start, stream.start())
+            if length is not None:
+                data_end = stream.end() + int(length.group(1))
+                end = self.data.index(b'endobj', self.data.index(b'endstream', data_end))
+        return self.data[start:end].rstrip()
+
+    def dictionary(self, num):
+        """Object bytes up to (not including) any stream data."""
+        return _dictionary(self.body(num))
+
+    def page_objects(self):
+        """Object numbers of the pages, in document order."""
+        pages_num = int(_PAGES.search(self.dictionary(self.root)).group(1))
+        return self._kids(pages_num)
+
+    def _kids(self, num):
+        kids = _KIDS.search(self.dictionary(num))
+        if kids is None:
+            return [num]
+        pages = []
+        for ref in _REF.finditer(kids.group(1)):
+            pages.extend(self._kids(int(ref.group(1))))
+        return pages
+
+
+def _dictionary(body):
+    stream = _STREAM_START.search(body)
+    return body if stream is None else body[:stream.start() + 2]
+
+
+def build_page_index(data):
+    """Page object numbers of a rendered multi-page PDF, one per sheet."""
+    return PDFObjects(data).page_objects()
+
+
+class _PDFWriter:
+    def __init__(self):
+        self.objects = {}
+        self.pages = []
+        self._next_num = _PAGES_NUM + 1
+
+    def reserve(self):
+        num = self._next_num
+        self._next_num += 1
+        return num
+
+    def copy_page(self, src, page_num, renumbered):
+        """
+        Copy a page and everything it references (except its old parent)
+        from src. renumbered maps src object numbers to ours and is shared
+        across pages of the same source, so fonts and forms are copied once.
+        """
+        pending = [page_num]
+        added = []
+        while pending:
+            num = pending.pop()
+            if num in renumbered:
+                continue
+            renumbered[num] = self.reserve()
+            added.append(num)
+            head = src.dictionary(num)
+            if num == page_num:
+                head = _PARENT.sub(b'', head)
+            pending.extend(int(r.group(1)) for r in _REF.finditer(head))
+
+        for num in added:
+            body = src.body(num)
+            head = _dictionary(body)
+            if num == page_num:
+                head = _PARENT.sub(b'', head)
+            head = _REF.sub(lambda m: b'%d 0 R' % renumbered[int(m.group(1))], head)
+            if num == page_num:
+                head = head.replace(b'<<', b'<< /Parent %d 0 R' % _PAGES_NUM, 1)
+            self.objects[renumbered[num]] = head + body[len(_dictionary(body)):]
+        self.pages.append(renumbered[page_num])
+
+    def tobytes(self):
+        kids = b' '.join(b'%d 0 R' % num for num in self.pages)
+        self.objects[_CATALOG_NUM] = b'<< /Type /Catalog /Pages %d 0 R >>' % _PAGES_NUM
+        self.objects[_PAGES_NUM] = b'<< /Type /Pages /Count %d /Kids [ %s ] >>' % (len(self.pages), kids)
+
+        out = [_HEADER]
+        pos = len(_HEADER)
+        offsets = []
+        for num in range(1, self._next_num):
+            chunk = b'%d 0 obj\n%s\nendobj\n' % (num, self.objects[num])
+            offsets.append(pos)
+            out.append(chunk)
+            pos += len(chunk)
+
+        out.append(b'xref\n0 %d\n0000000000 65535 f \n' % (len(offsets) + 1))
+        out.extend(b'%010d 00000 n \n' % offset for offset in offsets)
+        out.append(b'trailer\n<< /Root %d 0 R /Size %d >>\nstartxref\n%d\n%%%%EOF\n' % (
+            _CATALOG_NUM, len(offsets) + 1, pos,
+        ))
+        return b''.join(out)
+
+
+def extract_pages(data, page_numbers, page_index=None):
+    """
+    New PDF holding the given 1-based pages of data, in the order given.
+    page_index (from build_page_index) skips walking the page tree.
+    """
+    src = PDFObjects(data)
+    pages = page_index or src.page_objects()
+    writer = _PDFWriter()
+    renumbered = {}
+    for n in page_numbers:
+        if n < 1 or n > len(pages):
+            raise ValueError(f'Page {n} does not exist (total: {len(pages)})')
+        writer.copy_page(src, pages[n - 1], renumbered)
+    return writer.tobytes()
+
+
+def merge_documents(documents):
+    """Concatenate the pages of several PDFs into one document."""
+    writer = _PDFWriter()
+    for data in documents:
+        src = PDFObjects(data)
+        renumbered = {}
+        for page_num in src.page_objects():
+            writer.copy_page(src, page_num, renumbered)
+    return writer.tobytes()
@@ -1,4 +1,5 @@
 import os
+import hashlib
 import mimetypes
 from werkzeug.utils import secure_filename
 from flask import current_app, request
@@ -9,6 +10,73 @@ from collections import defaultdict
 # Simple in-memory rate limiting (use Redis in production)
 rate_limit_storage = defaultdict(list)
 
+SUSPICIOUS_PATTERNS = (b'<script', b'javascript:', b'vbscript:', b'<?php')
+_HEADER_BYTES = 1024
+_SCAN_BLOCK_SIZE = 1024 * 1024
+# Bytes carried between blocks so a pattern split across a boundary is still seen
+_SCAN_OVERLAP = max(len(p) for p in SUSPICIOUS_PATTERNS) - 1
+
+
+class UploadScan:
+    """
+    Everything validation needs from an upload body, gathered in one pass:
+    size, sha256 (reused as the parsed-dataset cache key), the first 1KB
+    for magic-byte checks, and a case-insensitive suspicious pattern scan
+    over the whole body. Fed block by block, either as the request body is
+    spooled or by from_stream().
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.header = b''
+        self.suspicious = False
+        self._digest = hashlib.sha256()
+        self._tail = b''
+
+    @classmethod
+    def from_stream(cls, stream):
+        """Scan a seekable stream from the start; leaves it rewound."""
+        scan = cls()
+        stream.seek(0)
+        for block in iter(lambda: stream.read(_SCAN_BLOCK_SIZE), b''):
+            scan.update(block)
+        stream.seek(0)
+        return scan
+
+    def update(self, block):
+        if not block:
+            return
+        self.size += len(block)
+        self._digest.update(block)
+        if len(self.header) < _HEADER_BYTES:
+            self.header += block[:_HEADER_BYTES - len(self.header)]
+        if not self.suspicious:
+            window = self._tail + bytes(block).lower()
+            self.suspicious = any(pattern in window for pattern in SUSPICIOUS_PATTERNS)
+            self._tail = window[-_SCAN_OVERLAP:]
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+
+def get_upload_scan(file):
+    """
+    UploadScan for a FileStorage or stream. Uploads spooled by
+    SpooledUploadRequest were scanned while being received; anything else
+    is scanned once here and the result kept on the stream.
+    """
+    stream = getattr(file, 'stream', file)
+    scan = getattr(stream, 'upload_scan', None)
+    if scan is None:
+        scan = UploadScan.from_stream(stream)
+        try:
+            stream.upload_scan = scan
+        except AttributeError:
+            pass
+    return scan
+
+
 def validate_file_security(file):
     if not file or not file.filename:
         return False, "No file provided"
@@ -18,10 +86,9 @@ def validate_file_security(file):
     if not filename:
         return False, "Invalid filename"
     
-    # File size validation
-    file.seek(0, 2)
-    file_size = file.tell()
-    file.seek(0)
+    # Size, magic bytes and content scan all come from a single pass over the body
+    scan = get_upload_scan(file)
+    file_size = scan.size
     
     max_size = current_app.config.get('MAX_FILE_SIZE', 50 * 1024 * 1024)
     if file_size > max_size:
@@ -52,17 +119,15 @@ def validate_file_security(file):
         return False, "Invalid file format detected"
     
     # Content validation (magic bytes)
-    file_header = file.read(1024)  # Read more for better detection
-    file.seek(0)
+    file_header = scan.header
     
     if ext == '.csv':
         # Check for CSV delimiters
         if not any(sep.encode() in file_header for sep in [',', ';', '\t']):
             return False, "File doesn't appear to be a valid CSV"
         
-        # Check for suspicious content
-        suspicious_patterns = [b'<script', b'javascript:', b'vbscript:', b'<?php']
-        if any(pattern in file_header.lower() for pattern in suspicious_patterns):
+        # Check for suspicious content anywhere in the file, not just the header
+        if scan.suspicious:
             return False, "File contains suspicious content"
     
     elif ext in ['.xlsx', '.xls']:
@@ -0,0 +1,67 @@
+"""
+Label job worker: runs the jobs /upload queues in Redis, in JOB_WORKERS
+processes, so web workers only validate and enqueue. A worker process
+that dies is replaced.
+
+Usage (from backend/, with JOB_QUEUE_BACKEND=redis and REDIS_URL set):
+    python worker.py
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from app import create_app
+from services.job_queue import run_worker
+from services.zip_cache import init_zip_cache
+
+logger = logging.getLogger(__name__)
+
+# Pause before replacing a dead worker, so one that dies on startup cannot spin
+RESPAWN_DELAY_SECONDS = 5
+
+
+def work(config_name, stop):
+    # The parent handles Ctrl-C and sets stop; workers finish their current job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    app = create_app(config_name)
+    # Downloads are served by the web processes; a worker only fills Redis for them
+    init_zip_cache(app, local_writes=False)
+    run_worker(app, stop)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    config_name = os.getenv('FLASK_ENV', 'production')
+    workers = create_app(config_name).config['JOB_WORKERS']
+    ctx = multiprocessing.get_context('spawn')
+    stop = ctx.Event()
+
+    def start(i):
+        process = ctx.Process(target=work, args=(config_name, stop), name=f'label-worker-{i}')
+        process.start()
+        return process
+
+    processes = [start(i) for i in range(workers)]
+
+    def shutdown(signum, frame):
+        stop.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    while not stop.is_set():
+        wait([process.sentinel for process in processes], timeout=1)
+        for i, process in enumerate(processes):
+            if process.is_alive() or stop.is_set():
+                continue
+            logger.warning("%s exited with code %s; restarting it", process.name, process.exitcode)
+            time.sleep(RESPAWN_DELAY_SECONDS)
+            if not stop.is_set():
+                processes[i] = start(i)
+    for process in processes:
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 import { test, expect } from '@playwright/test';
 import { setupApiMocks } from './fixtures/api-mocks';
-import { VALID_CSV } from './fixtures/test-data';
+import { MOCK_UPLOAD_JOB, VALID_CSV } from './fixtures/test-data';
 
 test.beforeEach(async ({ page }) => {
   await setupApiMocks(page);
@@ -25,7 +25,7 @@ test('barcode type is included in the upload request', async ({ page }) => {
   await page.route('**/upload', async (route) => {
     const postData = route.request().postData();
     capturedFormData = postData;
-    await route.fulfill({ status: 200, contentType: 'application/json', body: JSON.stringify({ success: true, user_sheet_id: 'abc', label_count: 3, sheet_count: 1, message: 'done' }) });
+    await route.fulfill({ status: 202, contentType: 'application/json', body: JSON.stringify(MOCK_UPLOAD_JOB) });
   });
 
   const fileInput = page.locator('input[type="file"]');
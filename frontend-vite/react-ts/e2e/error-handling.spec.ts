@@ -72,3 +72,16 @@ test('preview 429 response shows rate limit message', async ({ page }) => {
   ]);
   await expect(page.getByText(/Preview limit|wait/i)).toBeVisible();
 });
+
+test('failed job shows the job error message', async ({ page }) => {
+  await setupApiMocks(page, {
+    job: { body: { job_id: 'job-abc', kind: 'file', status: 'failed', filename: 'test.csv', result: null, error: 'No valid data rows found' } },
+  });
+  await page.goto('/upload');
+  await uploadFile(page);
+  await Promise.all([
+    page.waitForResponse(r => r.url().includes('/jobs/')),
+    page.getByRole('button', { name: 'Generate Label Sheets' }).click(),
+  ]);
+  await expect(page.getByText('No valid data rows found')).toBeVisible();
+});
@@ -1,7 +1,7 @@
 import type { Page } from '@playwright/test';
-import { MOCK_PDF_BASE64, MOCK_SHEETS } from './test-data';
+import { MOCK_JOB_RESULT, MOCK_PDF_BASE64, MOCK_SHEETS, MOCK_UPLOAD_JOB } from './test-data';
 
-type RouteKey = 'mySheets' | 'upload' | 'preview' | 'download' | 'delete';
+type RouteKey = 'mySheets' | 'upload' | 'job' | 'preview' | 'download' | 'delete';
 
 type RouteOverrides = Partial<Record<RouteKey, {
   status?: number;
@@ -14,13 +14,18 @@ const DEFAULT_RESPONSES: Record<RouteKey, { status: number; body: unknown }> = {
     body: { sheets: MOCK_SHEETS },
   },
   upload: {
+    status: 202,
+    body: MOCK_UPLOAD_JOB,
+  },
+  job: {
     status: 200,
     body: {
-      success: true,
-      user_sheet_id: 'new-sheet-abc',
-      label_count: 3,
-      sheet_count: 1,
-      message: 'Successfully processed 3 labels and uploaded as ZIP',
+      job_id: MOCK_UPLOAD_JOB.job_id,
+      kind: 'file',
+      status: 'succeeded',
+      filename: 'test.csv',
+      result: MOCK_JOB_RESULT,
+      error: null,
     },
   },
   preview: {
@@ -63,6 +68,11 @@ export async function setupApiMocks(page: Page, overrides: RouteOverrides = {})
     await route.fulfill({ status: r.status, contentType: 'application/json', body: JSON.stringify(r.body) });
   });
 
+  await page.route('**/jobs/*', async (route) => {
+    const r = resolve('job');
+    await route.fulfill({ status: r.status, contentType: 'application/json', body: JSON.stringify(r.body) });
+  });
+
   await page.route('**/preview', async (route) => {
     if (route.request().method() !== 'POST') return route.continue();
     const r = resolve('preview');
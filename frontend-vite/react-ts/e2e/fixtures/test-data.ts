@@ -18,6 +18,23 @@ export const ERROR_PAYLOADS = {
   500: { error: 'An internal error occurred' },
 } as const;
 
+// /upload answers 202 with the queued job; the mocked /jobs/<id> reports it done
+export const MOCK_UPLOAD_JOB = {
+  job_id: 'job-abc',
+  status: 'queued',
+  status_url: '/jobs/job-abc',
+  events_url: '/jobs/job-abc/events',
+};
+
+export const MOCK_JOB_RESULT = {
+  success: true,
+  user_sheet_id: 'new-sheet-abc',
+  zip_size: 2048,
+  label_count: 3,
+  sheet_count: 1,
+  message: 'Successfully processed 3 labels and uploaded as ZIP',
+};
+
 export const MOCK_SHEETS = [
   {
     id: 'sheet-001',
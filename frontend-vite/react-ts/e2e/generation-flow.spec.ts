@@ -1,6 +1,6 @@
 import { test, expect } from '@playwright/test';
 import { setupApiMocks } from './fixtures/api-mocks';
-import { VALID_CSV } from './fixtures/test-data';
+import { MOCK_UPLOAD_JOB, VALID_CSV } from './fixtures/test-data';
 
 async function uploadFile(page: import('@playwright/test').Page) {
   const fileInput = page.locator('input[type="file"]');
@@ -17,9 +17,9 @@ test('Generate button shows loading state during upload', async ({ page }) => {
   await page.route('**/upload', async (route) => {
     await new Promise(r => setTimeout(r, 300));
     await route.fulfill({
-      status: 200,
+      status: 202,
       contentType: 'application/json',
-      body: JSON.stringify({ success: true, user_sheet_id: 'abc', label_count: 3, sheet_count: 1, message: 'Done' }),
+      body: JSON.stringify(MOCK_UPLOAD_JOB),
     });
   });
 
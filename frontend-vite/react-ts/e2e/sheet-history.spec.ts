@@ -51,3 +51,16 @@ test('confirmed delete removes the row from the table', async ({ page }) => {
   ]);
   await expect(page.getByText('inventory.csv')).not.toBeVisible();
 });
+
+test('single sheet download is saved with the extension of the served type', async ({ page }) => {
+  await page.route('**/download-sheet/*/sheet/*', async (route) => {
+    await route.fulfill({ status: 200, contentType: 'image/png', body: Buffer.from('\x89PNG\r\n\x1a\nfake-png') });
+  });
+
+  await page.getByRole('row', { name: /inventory\.csv/ }).getByRole('button').first().click();
+  const [download] = await Promise.all([
+    page.waitForEvent('download'),
+    page.getByTitle('Download sheet').first().click({ force: true }),
+  ]);
+  expect(download.suggestedFilename()).toBe('inventory_sheet_1.png');
+});
@@ -17,6 +17,13 @@ interface UserSheet {
   barcode_type?: string;
 }
 
+// Single sheets come back as PDF or, for image jobs, PNG/TIFF
+const SHEET_EXTENSIONS: Record<string, string> = {
+  'application/pdf': 'pdf',
+  'image/png': 'png',
+  'image/tiff': 'tiff',
+};
+
 interface LabelItem {
   id: string;
   user_sheet_id: string;
@@ -119,7 +126,9 @@ function Inventory() {
         `${API_URL}/download-sheet/${_userSheetId}/sheet/${_sheetNumber}`,
         { withCredentials: true, responseType: 'blob' },
       );
-      triggerBlobDownload(response.data, 'application/pdf', `${_filename.split('.')[0]}_sheet_${_sheetNumber}.pdf`);
+      const contentType = String(response.headers['content-type'] || 'application/pdf').split(';')[0];
+      const extension = SHEET_EXTENSIONS[contentType] ?? 'pdf';
+      triggerBlobDownload(response.data, contentType, `${_filename.split('.')[0]}_sheet_${_sheetNumber}.${extension}`);
     } catch {
       setError('Failed to download sheet');
       setTimeout(() => setError(''), 5000);
@@ -486,7 +495,7 @@ function Inventory() {
                                       <button
                                         onClick={() => downloadSingleSheet(sheet.id, sheetNum, sheet.original_filename)}
                                         disabled={isDownloading}
-                                        title={isDownloading ? 'Downloading...' : 'Download PDF'}
+                                        title={isDownloading ? 'Downloading...' : 'Download sheet'}
                                         className="p-1.5 rounded-[8px] text-muted-foreground hover:text-primary hover:bg-primary/10 transition-colors cursor-pointer bg-transparent border-none opacity-0 group-hover:opacity-100 disabled:cursor-not-allowed"
                                       >
                                         {isDownloading
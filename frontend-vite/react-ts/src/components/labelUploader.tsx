@@ -1,4 +1,4 @@
-import { useState, useRef } from 'react';
+import { useState, useRef, useEffect } from 'react';
 import type { ChangeEvent } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
@@ -14,13 +14,27 @@ import { BARCODE_COLUMN_HELP, TEXT_FIELDS_HELP, HEADER_ROW_HELP } from './column
 interface BackendUploadResponse {
   success: boolean;
   user_sheet_id: string;
-  files_uploaded: number;
-  total_size: number;
+  zip_size: number;
   label_count: number;
   sheet_count: number;
   message: string;
 }
 
+// /upload queues the job and answers 202; the result arrives on /jobs/<job_id>
+interface UploadJob {
+  job_id: string;
+  status: string;
+  status_url: string;
+  events_url: string;
+}
+
+interface JobStatus {
+  job_id: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  result: BackendUploadResponse | null;
+  error: string | null;
+}
+
 interface PreviewData {
   preview_pdf: string;
   label_count: number;
@@ -29,6 +43,9 @@ interface PreviewData {
 }
 
 const MAX_FILE_SIZE = 50 * 1024 * 1024
+const JOB_POLL_INTERVAL_MS = 1000
+// Give up waiting on a job after this long; it stays listed under My Sheets if it finishes
+const JOB_POLL_TIMEOUT_MS = 10 * 60 * 1000
 
 function LabelUploader() {
   const navigate = useNavigate();
@@ -38,6 +55,7 @@ function LabelUploader() {
   const [error, setError] = useState('');
   const [success, setSuccess] = useState('');
   const fileInputRef = useRef<HTMLInputElement>(null);
+  const jobPoll = useRef<AbortController | null>(null);
   const [uploadProgress, setUploadProgress] = useState<number>(0);
   const [processingStatus, setProcessingStatus] = useState<string>('');
   const [isDragOver, setIsDragOver] = useState(false);
@@ -94,6 +112,22 @@ function LabelUploader() {
     if (droppedFile) { setFile(droppedFile); setError(''); setSuccess(''); }
   };
 
+  // Stop polling when the page is left mid-job
+  useEffect(() => () => jobPoll.current?.abort(), []);
+
+  // The finished job, or null if it did not finish within JOB_POLL_TIMEOUT_MS
+  const waitForJob = async (statusUrl: string, signal: AbortSignal) => {
+    const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      const { data } = await axios.get<JobStatus>(`${API_URL}${statusUrl}`, { withCredentials: true, signal });
+      if (data.status === 'succeeded' || data.status === 'failed') return data;
+      setProcessingStatus(data.status === 'queued' ? 'Waiting to start...' : 'Generating label sheets...');
+      await new Promise(r => setTimeout(r, JOB_POLL_INTERVAL_MS));
+      if (signal.aborted) throw new axios.CanceledError();
+    }
+    return null;
+  };
+
   const handleUpload = async () => {
     const startTime = Date.now();
     if (!file) { setError('Please select a file first.'); return; }
@@ -110,20 +144,33 @@ function LabelUploader() {
     setLoading(true); setError(''); setSuccess(''); setUploadProgress(0); setProcessingStatus('Uploading file...');
 
     try {
-      const response = await axios.post<BackendUploadResponse>(`${API_URL}/upload`, formData, {
+      const response = await axios.post<UploadJob>(`${API_URL}/upload`, formData, {
         withCredentials: true,
         onUploadProgress: (e) => {
           if (e.total) { setUploadProgress(Math.round((e.loaded * 100) / e.total)); setProcessingStatus('Uploading file...'); }
         },
       });
+      setProcessingStatus('Generating label sheets...');
+      jobPoll.current = new AbortController();
+      const job = await waitForJob(response.data.status_url, jobPoll.current.signal);
+      if (!job) {
+        setUploadProgress(0); setProcessingStatus('');
+        setError('Label generation is taking longer than expected. Check My Sheets later, or try again.');
+        return;
+      }
+      if (job.status === 'failed' || !job.result) {
+        setUploadProgress(0); setProcessingStatus('');
+        setError(job.error || 'Failed to process the file.');
+        return;
+      }
       setProcessingStatus('Processing complete!');
       setUploadProgress(100);
-      setSuccess(response.data.message);
+      setSuccess(job.result.message);
       posthog.capture('label_generation_completed', {
         duration_ms: Date.now() - startTime,
-        label_count: response.data.label_count,
-        sheet_count: response.data.sheet_count,
-        total_size_bytes: response.data.total_size,
+        label_count: job.result.label_count,
+        sheet_count: job.result.sheet_count,
+        total_size_bytes: job.result.zip_size,
         template_id: selectedTemplate,
         barcode_type: barcodeType,
         file_size_bytes: file.size,
@@ -132,6 +179,7 @@ function LabelUploader() {
       if (fileInputRef.current) fileInputRef.current.value = '';
       setUploadProgress(0); setProcessingStatus('');
     } catch (err) {
+      if (axios.isCancel(err)) return;
       setUploadProgress(0); setProcessingStatus('');
       if (axios.isAxiosError(err)) {
         if (err.response?.status === 401) setError('Authentication failed. Please log in again.');